@@ -1,3 +1,32 @@
-from . import _version
+def __getattr__(name):
+    """
+    Resolves the `__version__` attribute of the package on first access.
+    """
+    # The version is resolved on first access, so that importing the package
+    # never shells out to git in source or editable installs.
+    if name == "__version__":
+        version = _get_version()
+        globals()["__version__"] = version
+        return version
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__version__ = _version.get_versions()["version"]
+
+def _get_version():
+    """
+    Returns the version of the installed distribution, falling back to
+    the version computed by versioneer in source or editable installs.
+    """
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # Python < 3.8
+        PackageNotFoundError, version = Exception, None
+
+    if version is not None:
+        try:
+            return version("prefect-metricflow")
+        except PackageNotFoundError:
+            pass
+
+    from . import _version
+
+    return _version.get_versions()["version"]
@@ -0,0 +1,252 @@
+"""
+Utils to hand off MetricFlow results as Apache Arrow tables and files
+"""
+import os
+import tempfile
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from pyarrow import Schema, Table
+
+RESULT_FORMATS = ("pandas", "arrow")
+IPC_FILE_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+
+def import_pyarrow() -> Any:
+    """
+    Imports pyarrow, an optional dependency of prefect-metricflow.
+
+    Raises:
+        `MetricFlowFailureException` if pyarrow is not installed.
+
+    Returns:
+        The `pyarrow` module.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        msg = (
+            "pyarrow is required to handle results in the Arrow format, "
+            'install it with `pip install "prefect-metricflow[arrow]"`'
+        )
+        raise MetricFlowFailureException(msg)
+
+    return pyarrow
+
+
+def validate_result_format(result_format: str) -> None:
+    """
+    Validates the format of a query result.
+
+    Args:
+        result_format: The format, one of `pandas` or `arrow`.
+
+    Raises:
+        `MetricFlowFailureException` if the format is not supported,
+        or if pyarrow is required but not installed.
+    """
+    if result_format not in RESULT_FORMATS:
+        msg = f"Invalid result format {result_format}, expected one of {RESULT_FORMATS}"
+        raise MetricFlowFailureException(msg)
+    if result_format == "arrow":
+        import_pyarrow()
+
+
+def to_arrow_table(df: "DataFrame") -> "Table":
+    """
+    Converts a pandas DataFrame to an Arrow table, dropping its index.
+
+    Args:
+        df: The pandas DataFrame.
+
+    Returns:
+        The Arrow table.
+    """
+    pa = import_pyarrow()
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def is_ipc_file(file_path: str) -> bool:
+    """
+    Returns whether a file is an Arrow IPC file rather than a Parquet file,
+    based on its extension.
+    """
+    return file_path.lower().endswith(IPC_FILE_EXTENSIONS)
+
+
+def unify_schemas(tables: List["Table"]) -> "Schema":
+    """
+    Returns a schema every table can be cast to, promoting the types
+    of their columns, e.g. an all-null column to the type of its values
+    or integers to floats.
+
+    Args:
+        tables: Arrow tables with the same columns.
+
+    Raises:
+        `MetricFlowFailureException` if the types of a column cannot be unified.
+
+    Returns:
+        The Arrow schema.
+    """
+    pa = import_pyarrow()
+    try:
+        return pa.unify_schemas(
+            [table.schema for table in tables], promote_options="permissive"
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        msg = f"Incompatible batches of results: {e}"
+        raise MetricFlowFailureException(msg)
+
+
+def cast_table(table: "Table", schema: "Schema") -> "Table":
+    """
+    Casts an Arrow table to a schema, reordering its columns.
+
+    Args:
+        table: The Arrow table.
+        schema: The Arrow schema, with the same columns as the table.
+
+    Raises:
+        `MetricFlowFailureException` if the table does not have the columns
+        of the schema, or if a column cannot be cast without losing data.
+
+    Returns:
+        The Arrow table with the schema.
+    """
+    pa = import_pyarrow()
+    if sorted(table.column_names) != sorted(schema.names):
+        msg = (
+            f"Batch of results with columns {table.column_names}, "
+            f"expected {schema.names}"
+        )
+        raise MetricFlowFailureException(msg)
+
+    try:
+        return table.select(schema.names).cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        msg = f"Batch of results not matching the schema {schema}: {e}"
+        raise MetricFlowFailureException(msg)
+
+
+def write_batches(
+    batches: Iterable["DataFrame"],
+    file_path: str,
+    compression: Optional[str] = "snappy",
+    schema: Optional["Schema"] = None,
+) -> int:
+    """
+    Atomically writes pandas DataFrames to a Parquet or Arrow IPC file,
+    one batch at a time so that a single batch is held in memory.
+
+    Every batch is cast to the schema of the file. If it is not provided,
+    the schema is inferred from the batches: the batches are held in memory
+    until the type of every column is known, i.e. until each column has
+    a non-null value, so that a column null in the first batch gets the
+    type of its values.
+
+    Args:
+        batches: The batches of rows to write, all with the same columns.
+        file_path: Path of the file. Files ending with `.arrow`, `.feather` or
+            `.ipc` are written in the Arrow IPC format, others in Parquet.
+        compression: The Parquet compression codec.
+        schema: The Arrow schema of the file.
+
+    Raises:
+        `MetricFlowFailureException` if the batches do not have the same columns,
+        or if a batch cannot be cast to the schema of the file.
+
+    Returns:
+        The number of rows written.
+    """
+    pa = import_pyarrow()
+    import pyarrow.parquet as pq
+
+    def open_writer(file_schema: "Schema") -> Any:
+        """
+        Opens the writer of the temporary file.
+        """
+        if is_ipc_file(file_path):
+            return pa.ipc.new_file(tmp_file_path, file_schema)
+        return pq.ParquetWriter(tmp_file_path, file_schema, compression=compression)
+
+    def is_typed(unified_schema: "Schema") -> bool:
+        """
+        Returns whether the type of every column of a schema is known.
+        """
+        return not any(pa.types.is_null(field.type) for field in unified_schema)
+
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_file_path = tempfile.mkstemp(dir=dir_path, prefix=".result-", suffix=".tmp")
+    os.close(fd)
+
+    writer = None
+    pending: List["Table"] = []
+    num_rows = 0
+    try:
+        for batch in batches:
+            table = to_arrow_table(batch)
+            num_rows += table.num_rows
+            if writer is not None:
+                writer.write_table(cast_table(table, schema))
+                continue
+
+            pending.append(table)
+            if schema is None:
+                unified_schema = unify_schemas(pending)
+                if not is_typed(unified_schema):
+                    continue
+                schema = unified_schema
+            writer = open_writer(schema)
+            for pending_table in pending:
+                writer.write_table(cast_table(pending_table, schema))
+            pending = []
+
+        if writer is None:
+            # Columns without any value are written as null columns,
+            # and a file without batch has no column
+            if schema is None:
+                schema = unify_schemas(pending) if pending else pa.schema([])
+            writer = open_writer(schema)
+            for pending_table in pending:
+                writer.write_table(cast_table(pending_table, schema))
+
+        writer.close()
+        os.replace(tmp_file_path, file_path)
+    except BaseException:
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+        raise
+
+    return num_rows
+
+
+def read_arrow_file(file_path: str) -> "Table":
+    """
+    Reads a Parquet or Arrow IPC file written by `write_batches`.
+
+    Arrow IPC files are uncompressed and memory-mapped, so that the columns
+    of the table point to the pages of the file instead of copies. Parquet
+    files are encoded, their columns are always decoded in memory.
+
+    Args:
+        file_path: Path of the file.
+
+    Returns:
+        The Arrow table.
+    """
+    pa = import_pyarrow()
+    import pyarrow.parquet as pq
+
+    if is_ipc_file(file_path):
+        return pa.ipc.open_file(pa.memory_map(file_path, "r")).read_all()
+    return pq.read_table(file_path, memory_map=True)
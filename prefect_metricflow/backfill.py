@@ -0,0 +1,302 @@
+"""
+Utils to run resumable backfills of MetricFlow materializations
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple, Union
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.materializations import (
+    DEFAULT_MAX_PARALLELISM,
+    build_partition,
+    drop_tables,
+    get_materialization,
+    get_materialization_table,
+    get_partition_table,
+    merge_partitions,
+    validate_partitioning,
+)
+from prefect_metricflow.partitions import split_time_range
+from prefect_metricflow.utils import get_cache_root
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from metricflow.dataflow.sql_table import SqlTable
+
+BACKFILLS_DB_FILE_NAME = "backfills.db"
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_DELAY_SECONDS = 10.0
+
+
+def get_backfills_db_path(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the path of the default SQLite backfill checkpoints database.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the checkpoints database in the cache root directory.
+    """
+    return os.path.join(get_cache_root(cache_root=cache_root), BACKFILLS_DB_FILE_NAME)
+
+
+def get_backfill_key(
+    materialization_name: str,
+    config: Dict[str, Any],
+    start_time: str,
+    end_time: str,
+    partition_grain: str,
+) -> str:
+    """
+    Returns the key of the checkpoint of a backfill.
+
+    Args:
+        materialization_name: The name of the materialization.
+        config: The MetricFlow configuration the materialization is built with.
+        start_time: The start of the backfilled time range.
+        end_time: The end of the backfilled time range.
+        partition_grain: The partition grain of the backfill.
+
+    Returns:
+        A key identifying the backfill, so that only a run of the very same
+        backfill resumes from its checkpoint.
+    """
+    serialized = json.dumps(
+        {
+            "config": config,
+            "start_time": start_time,
+            "end_time": end_time,
+            "partition_grain": partition_grain,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+    return f"{materialization_name}:{digest}"
+
+
+def get_backfill_run_id(checkpoint_key: str) -> str:
+    """
+    Returns the identifier appended to the names of the partition tables
+    of a backfill, see `new_run_id`.
+
+    It is derived from the checkpoint key, so that a run resuming a backfill
+    finds the partition tables of the previous run, while backfills with
+    another key never use, nor drop, these tables.
+
+    Args:
+        checkpoint_key: The key of the backfill, see `get_backfill_key`.
+
+    Returns:
+        A short hex digest of the key.
+    """
+    return hashlib.sha256(checkpoint_key.encode("utf-8")).hexdigest()[:8]
+
+
+class SQLiteBackfillCheckpoint:
+    """
+    Records the partitions of backfills that finished in a local SQLite database.
+
+    Args:
+        path: Path of the SQLite database. If not provided, a database
+            in the prefect-metricflow cache root directory is used.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_backfills_db_path()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connects to the database, creating its table if needed.
+        """
+        dir_path = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dir_path, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS backfill_partitions "
+            "(key TEXT NOT NULL, partition_start TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL, error TEXT, "
+            "updated_at TEXT NOT NULL, PRIMARY KEY (key, partition_start))"
+        )
+        return connection
+
+    def get_completed(self, key: str) -> Set[str]:
+        """
+        Returns the partitions of a backfill that finished.
+
+        Args:
+            key: The key of the backfill.
+
+        Returns:
+            The start of each finished partition, as an ISO 8601 timestamp.
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT partition_start FROM backfill_partitions "
+                "WHERE key = ? AND status = 'completed'",
+                (key,),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def record(
+        self,
+        key: str,
+        partition_start: str,
+        status: str,
+        attempts: int,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Records the outcome of a partition of a backfill.
+
+        Args:
+            key: The key of the backfill.
+            partition_start: The start of the partition, as an ISO 8601 timestamp.
+            status: Either `completed` or `failed`.
+            attempts: The number of attempts made to build the partition.
+            error: The last error raised while building the partition.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO backfill_partitions "
+                "(key, partition_start, status, attempts, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    partition_start,
+                    status,
+                    attempts,
+                    error,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+
+    def clear(self, key: str) -> None:
+        """
+        Removes the checkpoint of a backfill.
+
+        Args:
+            key: The key of the backfill.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM backfill_partitions WHERE key = ?", (key,))
+
+
+def run_backfill(
+    client: "MetricFlowClient",
+    materialization_name: str,
+    start_time: str,
+    end_time: str,
+    partition_grain: str,
+    checkpoint: SQLiteBackfillCheckpoint,
+    checkpoint_key: str,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay_seconds: float = DEFAULT_RETRY_DELAY_SECONDS,
+) -> "SqlTable":
+    """
+    Backfills a materialization partition by partition, checkpointing the
+    partitions that finished so that a new run only builds the others.
+
+    Partition tables are kept until every partition finished,
+    then merged into the materialization table. Checkpointed partitions
+    whose table no longer exists are built again. The partition tables are
+    named after the checkpoint key, see `get_backfill_run_id`, so runs of
+    the same backfill must not overlap, while other backfills can run
+    concurrently.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_name: The name of the materialization.
+        start_time: The start of the backfilled time range.
+        end_time: The end of the backfilled time range.
+        partition_grain: The partition grain, one of `day`, `week` or `month`.
+        checkpoint: The checkpoint of the backfills.
+        checkpoint_key: The key of the backfill in `checkpoint`.
+        max_workers: Maximum number of partitions built at the same time.
+        max_retries: Number of times a failing partition is retried.
+        retry_delay_seconds: Delay between two attempts to build a partition.
+
+    Raises:
+        `MetricFlowFailureException` if the materialization cannot be partitioned,
+        see `validate_partitioning`, or if any partition still fails after
+        `max_retries` retries.
+
+    Returns:
+        The table of the materialization.
+    """
+    partitions = split_time_range(start_time, end_time, partition_grain)
+    materialization = get_materialization(client, materialization_name)
+    table = get_materialization_table(client, materialization)
+    validate_partitioning(client, materialization, partition_grain)
+    run_id = get_backfill_run_id(checkpoint_key)
+    # A partition whose table was dropped since it was checkpointed is rebuilt
+    completed = {
+        partition_start
+        for partition_start in checkpoint.get_completed(checkpoint_key)
+        if client.sql_client.table_exists(
+            get_partition_table(table, partition_start, run_id=run_id)
+        )
+    }
+
+    def build(partition: Tuple[str, str]) -> Union["SqlTable", Exception]:
+        """
+        Builds a partition, retrying it on failure, and checkpoints it.
+        """
+        partition_start = partition[0]
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                # Drop any table left behind by an interrupted attempt
+                drop_tables(
+                    client, [get_partition_table(table, partition_start, run_id=run_id)]
+                )
+                partition_table = build_partition(
+                    client, materialization, partition, run_id=run_id
+                )
+            except Exception as e:
+                if attempts <= max_retries:
+                    time.sleep(retry_delay_seconds)
+                    continue
+                checkpoint.record(
+                    checkpoint_key, partition_start, "failed", attempts, str(e)
+                )
+                return e
+
+            checkpoint.record(checkpoint_key, partition_start, "completed", attempts)
+            return partition_table
+
+    pending = [partition for partition in partitions if partition[0] not in completed]
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        results = list(executor.map(build, pending))
+
+    errors = [
+        (partition, result)
+        for partition, result in zip(pending, results)
+        if isinstance(result, Exception)
+    ]
+    if errors:
+        msg = (
+            f"Failed to backfill {len(errors)} of {len(partitions)} partitions of "
+            f"materialization `{materialization_name}`, run the backfill again "
+            "to retry them: "
+            + ", ".join(f"{start} - {end}: {e}" for (start, end), e in errors)
+        )
+        raise MetricFlowFailureException(msg) from errors[0][1]
+
+    partition_tables = [
+        get_partition_table(table, partition_start, run_id=run_id)
+        for partition_start, _ in partitions
+    ]
+    merge_partitions(client, table, partition_tables, run_id=run_id)
+    drop_tables(client, partition_tables)
+    checkpoint.clear(checkpoint_key)
+    return table
@@ -0,0 +1,243 @@
+"""
+Caches of MetricFlow query results
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from prefect_metricflow.utils import get_cache_root, is_private_file, make_private_dir
+
+QUERY_RESULTS_DIR_NAME = "query_results"
+DEFAULT_QUERY_CACHE_MAX_SIZE = 128
+DEFAULT_QUERY_CACHE_TTL = 300.0
+DEFAULT_DISK_QUERY_CACHE_MAX_SIZE = 1024
+
+
+def get_query_results_dir(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the directory of the on-disk query result cache.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the query results directory in the cache root directory.
+    """
+    return os.path.join(get_cache_root(cache_root=cache_root), QUERY_RESULTS_DIR_NAME)
+
+
+def copy_result(result: Any) -> Any:
+    """
+    Returns a copy of a query result, so that callers mutating it
+    do not alter the cached result.
+    """
+    copy = getattr(result, "copy", None)
+    return copy() if callable(copy) else result
+
+
+class QueryResultCache:
+    """
+    Thread-safe in-memory LRU cache of query results.
+
+    Args:
+        max_size: Maximum number of results kept in the cache.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_QUERY_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._results: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of results in the cache.
+        """
+        with self._lock:
+            return len(self._results)
+
+    def get(self, key: str, ttl: float) -> Optional[Any]:
+        """
+        Returns the result cached under `key`.
+
+        Args:
+            key: The key of the query.
+            ttl: Maximum age in seconds of the cached result.
+
+        Returns:
+            A copy of the cached result, or `None` if no result younger
+            than `ttl` is cached.
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            result, created_at = entry
+            if time.time() - created_at > ttl:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+
+        return copy_result(result)
+
+    def set(self, key: str, result: Any, created_at: Optional[float] = None) -> None:
+        """
+        Caches a result under `key`, evicting the least recently used results.
+
+        Args:
+            key: The key of the query.
+            result: The result of the query.
+            created_at: The time the result was computed at,
+                defaults to the current time.
+        """
+        with self._lock:
+            self._results[key] = (copy_result(result), created_at or time.time())
+            self._results.move_to_end(key)
+            while len(self._results) > max(self.max_size, 0):
+                self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes every result from the cache.
+        """
+        with self._lock:
+            self._results.clear()
+
+
+class DiskQueryResultCache:
+    """
+    On-disk cache of query results, shared by the processes of a user on a host.
+
+    The results are stored in a directory only accessible by the current user,
+    and results written by other users are never unpickled.
+
+    Args:
+        cache_dir: Directory where the results are stored. If not provided,
+            a directory in the prefect-metricflow cache root directory is used.
+        max_size: Maximum number of results kept in the cache,
+            the least recently written ones being evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_size: int = DEFAULT_DISK_QUERY_CACHE_MAX_SIZE,
+    ):
+        self.cache_dir = cache_dir or get_query_results_dir()
+        self.max_size = max_size
+
+    def _get_file_path(self, key: str) -> str:
+        """
+        Returns the path of the file a result is cached in.
+        """
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str, ttl: float) -> Optional[Tuple[Any, float]]:
+        """
+        Returns the result cached under `key`.
+
+        Args:
+            key: The key of the query.
+            ttl: Maximum age in seconds of the cached result.
+
+        Returns:
+            The cached result and the time it was computed at, or `None`
+            if no readable result younger than `ttl` is cached.
+        """
+        file_path = self._get_file_path(key)
+        try:
+            if time.time() - os.path.getmtime(file_path) > ttl:
+                os.remove(file_path)
+                return None
+            with open(file_path, "rb") as cache_file:
+                if not is_private_file(cache_file):
+                    return None
+                entry = pickle.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupted cache entry is simply computed again
+            return None
+
+        return entry["result"], entry["created_at"]
+
+    def set(self, key: str, result: Any, created_at: Optional[float] = None) -> None:
+        """
+        Atomically caches a result under `key`.
+
+        Args:
+            key: The key of the query.
+            result: The result of the query.
+            created_at: The time the result was computed at,
+                defaults to the current time.
+        """
+        make_private_dir(self.cache_dir)
+        fd, tmp_file_path = tempfile.mkstemp(
+            dir=self.cache_dir, prefix=".query-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                pickle.dump(
+                    {"result": result, "created_at": created_at or time.time()},
+                    tmp_file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_file_path, self._get_file_path(key))
+        except BaseException:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
+
+        self.prune()
+
+    def prune(self) -> None:
+        """
+        Removes the least recently written results in excess of `max_size`.
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".pkl"):
+                continue
+            file_path = os.path.join(self.cache_dir, file_name)
+            try:
+                entries.append((os.path.getmtime(file_path), file_path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort()
+        for _, file_path in entries[: max(len(entries) - max(self.max_size, 0), 0)]:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                # Another process pruned the cache at the same time
+                pass
+
+
+_query_cache = QueryResultCache()
+_range_cache = QueryResultCache()
+
+
+def get_query_cache() -> QueryResultCache:
+    """
+    Returns the process-wide in-memory cache of query results.
+    """
+    return _query_cache
+
+
+def get_range_cache() -> QueryResultCache:
+    """
+    Returns the process-wide in-memory cache of query results over the union
+    of the time ranges queried, used to answer queries over narrower ranges.
+    """
+    return _range_cache
+
+
+def clear_query_cache() -> None:
+    """
+    Removes every result from the process-wide in-memory caches of query results.
+    """
+    _query_cache.clear()
+    _range_cache.clear()
@@ -0,0 +1,430 @@
+"""
+Cached catalog of the metrics and dimensions of a MetricFlow model
+"""
+import bisect
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.materializations import DEFAULT_MAX_PARALLELISM
+from prefect_metricflow.queries import normalize_query_spec
+from prefect_metricflow.routing import validate_column_name
+from prefect_metricflow.singleflight import get_call_key
+from prefect_metricflow.streaming import get_query_sql
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+
+DEFAULT_CATALOG_CACHE_MAX_SIZE = 16
+DEFAULT_DIMENSION_VALUES_CACHE_MAX_SIZE = 1024
+DEFAULT_MAX_DIMENSIONS_PER_QUERY = 32
+DIMENSION_INDEX_COLUMN = "dimension_index"
+DIMENSION_VALUE_COLUMN = "value"
+
+
+def search_prefix(sorted_names: List[str], prefix: str) -> List[str]:
+    """
+    Returns the names starting with a prefix.
+
+    Args:
+        sorted_names: Names sorted in ascending order.
+        prefix: The prefix, matched case-insensitively.
+
+    Returns:
+        The matching names, in ascending order.
+    """
+    prefix = prefix.lower()
+    start = bisect.bisect_left(sorted_names, prefix)
+    end = bisect.bisect_left(sorted_names, prefix + "\uffff")
+    return sorted_names[start:end]
+
+
+class Catalog:
+    """
+    In-memory index of the metrics of a MetricFlow model and their dimensions.
+
+    Args:
+        metric_dimensions: The names of the dimensions of each metric.
+    """
+
+    def __init__(self, metric_dimensions: Dict[str, Iterable[str]]):
+        self.metric_dimensions: Dict[str, List[str]] = {
+            metric.lower(): sorted({dimension.lower() for dimension in dimensions})
+            for metric, dimensions in metric_dimensions.items()
+        }
+        self.dimension_metrics: Dict[str, List[str]] = {}
+        for metric, dimensions in sorted(self.metric_dimensions.items()):
+            for dimension in dimensions:
+                self.dimension_metrics.setdefault(dimension, []).append(metric)
+
+        self.metrics = sorted(self.metric_dimensions)
+        self.dimensions = sorted(self.dimension_metrics)
+
+    @classmethod
+    def from_client(cls, client: "MetricFlowClient") -> "Catalog":
+        """
+        Builds the catalog of the model of a MetricFlow client.
+
+        Args:
+            client: The MetricFlow client.
+
+        Returns:
+            The catalog.
+        """
+        return cls(
+            {
+                metric.name: [
+                    getattr(dimension, "name", dimension)
+                    for dimension in metric.dimensions
+                ]
+                for metric in client.list_metrics()
+            }
+        )
+
+    def list_metrics(
+        self, prefix: Optional[str] = None, dimension: Optional[str] = None
+    ) -> List[str]:
+        """
+        Returns the names of the metrics.
+
+        Args:
+            prefix: If provided, only the metrics whose name starts with it.
+            dimension: If provided, only the metrics with this dimension.
+
+        Returns:
+            The names of the metrics, in ascending order.
+        """
+        metrics = self.metrics
+        if dimension is not None:
+            metrics = self.dimension_metrics.get(dimension.lower(), [])
+        if prefix:
+            metrics = search_prefix(metrics, prefix)
+        return list(metrics)
+
+    def list_dimensions(
+        self, metrics: Optional[List[str]] = None, prefix: Optional[str] = None
+    ) -> List[str]:
+        """
+        Returns the names of the dimensions.
+
+        Args:
+            metrics: If provided, only the dimensions shared by all these metrics,
+                which they can be queried by together.
+            prefix: If provided, only the dimensions whose name starts with it.
+
+        Returns:
+            The names of the dimensions, in ascending order.
+        """
+        dimensions = self.dimensions
+        if metrics:
+            shared = set.intersection(
+                *[
+                    set(self.metric_dimensions.get(metric.lower(), []))
+                    for metric in metrics
+                ]
+            )
+            dimensions = sorted(shared)
+        if prefix:
+            dimensions = search_prefix(dimensions, prefix)
+        return list(dimensions)
+
+
+def get_catalog(
+    client: "MetricFlowClient", fingerprint: str, catalog_cache: QueryResultCache
+) -> Catalog:
+    """
+    Returns the catalog of the model of a MetricFlow client,
+    building it only if it is not cached yet.
+
+    Args:
+        client: The MetricFlow client.
+        fingerprint: The fingerprint of the MetricFlow configuration and model.
+        catalog_cache: The cache of the catalogs.
+
+    Returns:
+        The catalog.
+    """
+    # The fingerprint changes with the model, so a cached catalog never expires
+    catalog = catalog_cache.get(fingerprint, ttl=math.inf)
+    if catalog is None:
+        catalog = Catalog.from_client(client)
+        catalog_cache.set(fingerprint, catalog)
+    return catalog
+
+
+def get_dimension_values_key(
+    fingerprint: str,
+    metric_name: str,
+    dimension_name: str,
+    start_time: Optional[str],
+    end_time: Optional[str],
+    max_values: Optional[int] = None,
+) -> str:
+    """
+    Returns the cache key of the values of a dimension of a metric.
+
+    Args:
+        fingerprint: The fingerprint of the MetricFlow configuration and model.
+        metric_name: The name of the metric.
+        dimension_name: The name of the dimension.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        max_values: The maximum number of values, `None` if unbounded.
+
+    Returns:
+        The key of the values.
+    """
+    return get_call_key(
+        call="get_dimension_values",
+        fingerprint=fingerprint,
+        metric_name=metric_name.strip().lower(),
+        dimension_name=dimension_name.strip().lower(),
+        start_time=start_time,
+        end_time=end_time,
+        max_values=max_values,
+    )
+
+
+def fetch_dimension_values(
+    client: "MetricFlowClient",
+    metric_name: str,
+    dimension_name: str,
+    start_time: Optional[str],
+    end_time: Optional[str],
+    key: str,
+    ttl: float,
+    dimension_values_cache: QueryResultCache,
+) -> List[str]:
+    """
+    Returns the values of a dimension of a metric, querying the data warehouse
+    only if they are not cached yet.
+
+    Args:
+        client: The MetricFlow client.
+        metric_name: The name of the metric.
+        dimension_name: The name of the dimension.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        key: The key of the values, see `get_call_key`.
+        ttl: Maximum age in seconds of cached values, `0` disables the cache.
+        dimension_values_cache: The cache of the dimension values.
+
+    Returns:
+        The values of the dimension.
+    """
+    if ttl > 0:
+        values = dimension_values_cache.get(key, ttl=ttl)
+        if values is not None:
+            return values
+
+    values = list(
+        client.get_dimension_values(
+            metric_name=metric_name,
+            dimension_name=dimension_name,
+            start_time=start_time,
+            end_time=end_time,
+        )
+    )
+    if ttl > 0:
+        dimension_values_cache.set(key, values)
+    return values
+
+
+def get_text_type(client: "MetricFlowClient") -> str:
+    """
+    Returns the SQL type of strings in the data warehouse of a MetricFlow client.
+    """
+    engine_type = client.sql_client.sql_engine_attributes.sql_engine_type
+    if getattr(engine_type, "value", engine_type) == "BigQuery":
+        return "STRING"
+    return "VARCHAR"
+
+
+def get_dimension_values_sql(
+    client: "MetricFlowClient",
+    metric_name: str,
+    dimension_names: List[str],
+    start_time: Optional[str],
+    end_time: Optional[str],
+    max_values: Dict[str, int],
+) -> Optional[str]:
+    """
+    Returns a single SQL query selecting the distinct values of several
+    dimensions of a metric.
+
+    The query is the union of the queries MetricFlow renders for the metric
+    grouped by each dimension. Each branch selects the index of its dimension
+    in `dimension_names` and the values of the dimension cast to strings,
+    so that the branches have the same column types whatever the types
+    of the dimensions. As in MetricFlow, the rows where the dimension
+    or the metric is null are dropped.
+
+    Args:
+        client: The MetricFlow client.
+        metric_name: The name of the metric.
+        dimension_names: The normalized names of the dimensions.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        max_values: The maximum number of values of some of the dimensions.
+
+    Raises:
+        `MetricFlowFailureException` if the name of the metric or of a dimension
+        is not a valid MetricFlow name.
+
+    Returns:
+        The SQL query, with the `dimension_index` and `value` columns,
+        or `None` if a rendered query has bind parameters and cannot be merged.
+    """
+    text_type = get_text_type(client)
+    branches = []
+    # The names are interpolated in the merged query
+    for dimension_name in dimension_names:
+        validate_column_name(dimension_name)
+
+    for index, dimension_name in enumerate(dimension_names):
+        spec = normalize_query_spec(
+            metrics=[metric_name],
+            dimensions=[dimension_name],
+            start_time=start_time,
+            end_time=end_time,
+        )
+        rendered_sql = get_query_sql(client, spec)
+        if rendered_sql.bind_parameters.param_dict:
+            return None
+
+        values_sql = (
+            f"SELECT DISTINCT {dimension_name} "
+            f"FROM ({rendered_sql.sql_query}) dimension_query_{index} "
+            f"WHERE {dimension_name} IS NOT NULL "
+            f"AND {validate_column_name(spec['metrics'][0])} IS NOT NULL"
+        )
+        if dimension_name in max_values:
+            values_sql += (
+                f" ORDER BY {dimension_name} LIMIT {int(max_values[dimension_name])}"
+            )
+
+        branches.append(
+            f"SELECT {index} AS {DIMENSION_INDEX_COLUMN}, "
+            f"CAST({dimension_name} AS {text_type}) AS {DIMENSION_VALUE_COLUMN} "
+            f"FROM ({values_sql}) dimension_values_{index}"
+        )
+
+    return "\nUNION ALL\n".join(branches)
+
+
+def fetch_dimension_values_batch(
+    client: "MetricFlowClient",
+    metric_name: str,
+    dimension_names: List[str],
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    max_values: Optional[Union[int, Dict[str, int]]] = None,
+    max_dimensions_per_query: int = DEFAULT_MAX_DIMENSIONS_PER_QUERY,
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> Dict[str, List[str]]:
+    """
+    Returns the distinct values of several dimensions of a metric, querying
+    the data warehouse once per `max_dimensions_per_query` dimensions.
+
+    As `MetricFlowClient.get_dimension_values`, the values are strings,
+    without the null values or the values where the metric is null. Values
+    that are not strings in the data warehouse are cast to strings there.
+
+    Args:
+        client: The MetricFlow client.
+        metric_name: The name of the metric.
+        dimension_names: The names of the dimensions.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        max_values: The maximum number of values of every dimension, or of some
+            dimensions as a `dict`. Capped dimensions return their lowest values.
+        max_dimensions_per_query: Maximum number of dimensions fetched by
+            a single query.
+        max_parallelism: Maximum number of queries run at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if the name of the metric or of a dimension
+        is not a valid MetricFlow name.
+
+    Returns:
+        A `dict` mapping each dimension name, as provided, to its values.
+    """
+    names = {name: name.strip().lower() for name in dimension_names}
+    normalized_names = list(dict.fromkeys(names.values()))
+    if isinstance(max_values, dict):
+        caps = {name.strip().lower(): cap for name, cap in max_values.items()}
+    elif max_values is not None:
+        caps = {name: max_values for name in normalized_names}
+    else:
+        caps = {}
+
+    size = max(max_dimensions_per_query, 1)
+    chunks = [
+        normalized_names[start : start + size]
+        for start in range(0, len(normalized_names), size)
+    ]
+
+    def fetch(chunk: List[str]) -> Dict[str, List[str]]:
+        """
+        Returns the values of a chunk of dimensions, with a single query
+        if their rendered queries can be merged.
+        """
+        sql = get_dimension_values_sql(
+            client, metric_name, chunk, start_time, end_time, caps
+        )
+        if sql is None:
+            return {
+                name: list(
+                    client.get_dimension_values(
+                        metric_name=metric_name,
+                        dimension_name=name,
+                        start_time=start_time,
+                        end_time=end_time,
+                    )
+                )[: caps.get(name)]
+                for name in chunk
+            }
+
+        result = client.sql_client.query(sql)
+        indexes = result[DIMENSION_INDEX_COLUMN].astype(int)
+        values = result[DIMENSION_VALUE_COLUMN]
+        return {
+            name: [str(value) for value in values[indexes == index].dropna()]
+            for index, name in enumerate(chunk)
+        }
+
+    values: Dict[str, List[str]] = {}
+    with ThreadPoolExecutor(max_workers=max(max_parallelism, 1)) as executor:
+        for chunk_values in executor.map(fetch, chunks):
+            values.update(chunk_values)
+
+    return {name: list(values[normalized]) for name, normalized in names.items()}
+
+
+_catalog_cache = QueryResultCache(max_size=DEFAULT_CATALOG_CACHE_MAX_SIZE)
+_dimension_values_cache = QueryResultCache(
+    max_size=DEFAULT_DIMENSION_VALUES_CACHE_MAX_SIZE
+)
+
+
+def get_catalog_cache() -> QueryResultCache:
+    """
+    Returns the process-wide cache of the catalogs of MetricFlow models.
+    """
+    return _catalog_cache
+
+
+def get_dimension_values_cache() -> QueryResultCache:
+    """
+    Returns the process-wide cache of the values of dimensions.
+    """
+    return _dimension_values_cache
+
+
+def clear_catalog_cache() -> None:
+    """
+    Removes every catalog and dimension values from the process-wide caches.
+    """
+    _catalog_cache.clear()
+    _dimension_values_cache.clear()
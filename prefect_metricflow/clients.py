@@ -0,0 +1,578 @@
+"""
+Utils to build and share MetricFlow clients
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from yaml import YAMLError, safe_load
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.timing import instrument_sql_client, timed_phase
+from prefect_metricflow.utils import get_config_file_path, parse_config
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+
+DEFAULT_POOL_MAX_SIZE = 8
+DEFAULT_POOL_MAX_IDLE_TIME = 600.0
+DEFAULT_FINGERPRINT_TTL = 2.0
+DEFAULT_FINGERPRINT_CACHE_MAX_SIZE = 64
+
+
+def get_model_dir_state(model_path: Optional[str]) -> List[Tuple[str, int, int]]:
+    """
+    Returns a cheap snapshot of the MetricFlow model directory.
+
+    Args:
+        model_path: Path of the directory containing the MetricFlow model files.
+
+    Returns:
+        A sorted list of `(relative path, size, mtime in ns)` tuples, one per
+        non-hidden file found under `model_path`.
+        An empty list is returned if `model_path` is not a directory.
+    """
+    if not model_path or not os.path.isdir(model_path):
+        return []
+
+    state = []
+    for root, dirs, files in os.walk(model_path):
+        # Hidden directories and files are ignored by MetricFlow as well
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for file in files:
+            if file.startswith("."):
+                continue
+            file_path = os.path.join(root, file)
+            stat = os.stat(file_path)
+            state.append(
+                (
+                    os.path.relpath(file_path, model_path),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                )
+            )
+
+    return sorted(state)
+
+
+def compute_client_fingerprint(
+    config: Dict[str, Any], ttl: float = DEFAULT_FINGERPRINT_TTL
+) -> str:
+    """
+    Computes a fingerprint of the effective MetricFlow configuration.
+
+    Args:
+        config: The MetricFlow configuration.
+        ttl: Number of seconds the fingerprint of a configuration is reused
+            without walking its model directory again, `0` disables the reuse.
+            Changes of the model files may go unnoticed for that long.
+
+    Returns:
+        An hex digest that changes whenever the configuration or the
+        content of the model directory referenced by `model_path` changes.
+    """
+    model_path = config.get("model_path")
+    payload = {
+        "config": config,
+        "model_path": os.path.abspath(model_path) if model_path else None,
+    }
+    serialized_config = json.dumps(payload, sort_keys=True, default=str)
+    if ttl > 0:
+        fingerprint = _fingerprint_cache.get(serialized_config, ttl=ttl)
+        if fingerprint is not None:
+            return fingerprint
+
+    payload["model_state"] = get_model_dir_state(model_path)
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    fingerprint = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+    if ttl > 0:
+        _fingerprint_cache.set(serialized_config, fingerprint)
+    return fingerprint
+
+
+def read_config_file(file_path: str) -> Dict[str, Any]:
+    """
+    Reads the MetricFlow configuration persisted on the file system.
+
+    Args:
+        file_path: Absolute path of the MetricFlow configuration file.
+
+    Raises:
+        `MetricFlowFailureException` if the file is not a valid YAML file.
+
+    Returns:
+        The MetricFlow configuration, or an empty `dict` if the file does not exist.
+    """
+    if not os.path.isfile(file_path):
+        return {}
+
+    try:
+        with open(file_path, "r") as config_file:
+            return safe_load(config_file) or {}
+    except YAMLError as e:
+        msg = f"Error while parsing MetricFlow config file {file_path}: {e}"
+        raise MetricFlowFailureException(msg)
+
+
+class InMemoryConfigHandler:
+    """
+    MetricFlow config handler backed by an in-memory `dict`
+    instead of a YAML file. It exposes the same interface as
+    MetricFlow `YamlFileHandler`.
+
+    Args:
+        config: The MetricFlow configuration.
+    """
+
+    yaml_file_path = "<in-memory>"
+
+    def __init__(self, config: Dict[str, Any]):
+        self._config = dict(config)
+
+    def get_value(self, key: str) -> Optional[Any]:
+        """
+        Returns the value of a given key in the in-memory configuration.
+        """
+        return self._config.get(key)
+
+    def set_value(self, key: str, value: str) -> None:
+        """
+        Sets a value to a given key in the in-memory configuration.
+        """
+        self._config[key] = value
+
+    def remove_value(self, key: str) -> None:
+        """
+        Removes a key from the in-memory configuration.
+        """
+        self._config.pop(key, None)
+
+    @property
+    def url(self) -> str:
+        """
+        Returns a description of the configuration source, used by MetricFlow
+        in error messages.
+        """
+        return "in-memory MetricFlow configuration"
+
+
+def build_client_from_config(
+    config: Dict[str, Any], model_cache_dir: Optional[str] = None
+) -> "MetricFlowClient":
+    """
+    Builds a MetricFlow client straight from an in-memory configuration,
+    without any file system I/O on the configuration.
+
+    Args:
+        config: The MetricFlow configuration.
+        model_cache_dir: Directory where the parsed model is cached.
+            If not provided, the model files are always parsed.
+
+    Returns:
+        A MetricFlow client.
+    """
+    # MetricFlow is imported lazily as it pulls in its whole engine
+    from metricflow.api import metricflow_client
+    from metricflow.configuration.constants import CONFIG_DWH_SCHEMA
+    from metricflow.engine.utils import (
+        build_user_configured_model_from_config,
+        path_to_models,
+    )
+    from metricflow.sql_clients.common_client import not_empty
+    from metricflow.sql_clients.sql_utils import make_sql_client_from_config
+
+    from prefect_metricflow.model_cache import load_user_configured_model
+
+    handler = InMemoryConfigHandler(config=config)
+    with timed_phase("sql_client_setup"):
+        sql_client = instrument_sql_client(make_sql_client_from_config(handler))
+    with timed_phase("model_parse"):
+        if model_cache_dir:
+            user_configured_model = load_user_configured_model(
+                model_path=path_to_models(handler), cache_dir=model_cache_dir
+            )
+        else:
+            user_configured_model = build_user_configured_model_from_config(handler)
+    schema = not_empty(
+        handler.get_value(CONFIG_DWH_SCHEMA), CONFIG_DWH_SCHEMA, handler.url
+    )
+
+    return metricflow_client.MetricFlowClient(
+        sql_client=sql_client,
+        user_configured_model=user_configured_model,
+        system_schema=schema,
+    )
+
+
+class MetricFlowClientPool:
+    """
+    Thread-safe registry of warm MetricFlow clients keyed by config fingerprint.
+
+    Clients that have not been used for more than `max_idle_time` seconds are
+    evicted, as well as the least recently used ones when more than `max_size`
+    clients are registered. Clients checked out with `checkout` or `lease`
+    are never evicted for being idle, and an evicted client still checked out
+    is only closed on its last `checkin`.
+
+    Args:
+        max_size: Maximum number of clients kept in the pool.
+        max_idle_time: Number of seconds after which an unused client is evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_POOL_MAX_SIZE,
+        max_idle_time: float = DEFAULT_POOL_MAX_IDLE_TIME,
+    ):
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self._clients: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # Number of checkouts of each client, keyed by `id`
+        self._leases: Dict[int, int] = {}
+        # Evicted clients closed on their last checkin, keyed by `id`
+        self._retired: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of clients in the pool.
+        """
+        with self._lock:
+            return len(self._clients)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        """
+        Returns whether a client is registered for `fingerprint`.
+        """
+        with self._lock:
+            return fingerprint in self._clients
+
+    def get(self, fingerprint: str, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the client registered for `fingerprint`, building it if needed.
+
+        The client is not held: it may be closed as soon as it is evicted,
+        use `lease` to hold it while it is in use.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration.
+            factory: Callable used to build the client if it is not registered yet.
+
+        Returns:
+            A MetricFlow client.
+        """
+        client = self.checkout(fingerprint, factory)
+        self.checkin(client)
+        return client
+
+    def checkout(self, fingerprint: str, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the client registered for `fingerprint`, building it if needed,
+        and holds it until it is checked in with `checkin`.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration.
+            factory: Callable used to build the client if it is not registered yet.
+
+        Returns:
+            A MetricFlow client.
+        """
+        client = self._checkout(fingerprint)
+        if client is not None:
+            return client
+
+        # Only one thread builds a client for a given fingerprint,
+        # the others wait for it and reuse the result.
+        with self._lock:
+            build_lock = self._build_locks.setdefault(fingerprint, threading.Lock())
+
+        with build_lock:
+            client = self._checkout(fingerprint)
+            if client is None:
+                client = factory()
+                self._register(fingerprint, client)
+
+        with self._lock:
+            self._build_locks.pop(fingerprint, None)
+
+        return client
+
+    def checkin(self, client: Any) -> None:
+        """
+        Releases a client held by `checkout`, closing it if it was evicted
+        and is not held anymore.
+
+        Args:
+            client: The MetricFlow client.
+        """
+        with self._lock:
+            key = id(client)
+            count = self._leases.get(key, 0) - 1
+            if count > 0:
+                self._leases[key] = count
+                return
+            self._leases.pop(key, None)
+            retired = self._retired.pop(key, None)
+
+        if retired is not None:
+            self._close(retired)
+
+    @contextmanager
+    def lease(self, fingerprint: str, factory: Callable[[], Any]) -> Iterator[Any]:
+        """
+        Holds the client registered for `fingerprint`, building it if needed,
+        until the end of the block.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration.
+            factory: Callable used to build the client if it is not registered yet.
+
+        Yields:
+            A MetricFlow client.
+        """
+        client = self.checkout(fingerprint, factory)
+        try:
+            yield client
+        finally:
+            self.checkin(client)
+
+    def clear(self) -> None:
+        """
+        Evicts every client from the pool. Clients still checked out
+        are closed on their last checkin.
+        """
+        with self._lock:
+            evicted = self._retire([client for client, _ in self._clients.values()])
+            self._clients.clear()
+
+        for client in evicted:
+            self._close(client)
+
+    def _checkout(self, fingerprint: str) -> Optional[Any]:
+        """
+        Returns and holds the client registered for `fingerprint`, if any,
+        after evicting the idle clients.
+        """
+        with self._lock:
+            evicted = self._evict_idle(time.monotonic())
+            entry = self._clients.get(fingerprint)
+            if entry is not None:
+                self._clients[fingerprint] = (entry[0], time.monotonic())
+                self._clients.move_to_end(fingerprint)
+                self._hold(entry[0])
+
+        for client in evicted:
+            self._close(client)
+
+        return entry[0] if entry is not None else None
+
+    def _register(self, fingerprint: str, client: Any) -> None:
+        """
+        Registers and holds a newly built client, evicting the least recently
+        used clients beyond `max_size`.
+        """
+        lru_clients = []
+        with self._lock:
+            self._clients[fingerprint] = (client, time.monotonic())
+            self._clients.move_to_end(fingerprint)
+            self._hold(client)
+            while len(self._clients) > max(self.max_size, 0):
+                _, (lru_client, _) = self._clients.popitem(last=False)
+                lru_clients.append(lru_client)
+            evicted = self._retire(lru_clients)
+
+        for evicted_client in evicted:
+            self._close(evicted_client)
+
+    def _hold(self, client: Any) -> None:
+        """
+        Counts a checkout of a client. Must be called with the lock held.
+        """
+        key = id(client)
+        self._leases[key] = self._leases.get(key, 0) + 1
+
+    def _retire(self, clients: List[Any]) -> List[Any]:
+        """
+        Defers the closing of the evicted clients still checked out to their
+        last checkin. Must be called with the lock held.
+
+        Returns:
+            The evicted clients that can be closed right away.
+        """
+        closable = []
+        for client in clients:
+            if id(client) in self._leases:
+                self._retired[id(client)] = client
+            else:
+                closable.append(client)
+        return closable
+
+    def _evict_idle(self, now: float) -> List[Any]:
+        """
+        Evicts the clients neither checked out nor used for more than
+        `max_idle_time` seconds. Must be called with the lock held.
+
+        Returns:
+            The evicted clients.
+        """
+        expired = [
+            fingerprint
+            for fingerprint, (client, last_used) in self._clients.items()
+            if now - last_used > self.max_idle_time and id(client) not in self._leases
+        ]
+        return [self._clients.pop(fingerprint)[0] for fingerprint in expired]
+
+    @staticmethod
+    def _close(client: Any) -> None:
+        """
+        Closes the SQL client of a MetricFlow client, ignoring errors.
+        """
+        sql_client = getattr(client, "sql_client", None)
+        close = getattr(sql_client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+_client_pool = MetricFlowClientPool()
+_fingerprint_cache = QueryResultCache(max_size=DEFAULT_FINGERPRINT_CACHE_MAX_SIZE)
+
+
+def get_client_pool() -> MetricFlowClientPool:
+    """
+    Returns the process-wide pool of MetricFlow clients.
+    """
+    return _client_pool
+
+
+def clear_client_pool() -> None:
+    """
+    Evicts every client from the process-wide pool of MetricFlow clients,
+    and forgets the fingerprints of the configurations.
+    """
+    _client_pool.clear()
+    _fingerprint_cache.clear()
+
+
+def _resolve_client(
+    config: Optional[Union[Dict, str]],
+    config_file_path: Optional[str],
+    model_cache_dir: Optional[str],
+) -> Tuple[Dict[str, Any], Callable[[], "MetricFlowClient"]]:
+    """
+    Returns the effective MetricFlow configuration and a factory
+    building a client from it.
+    """
+    if config:
+        mf_config = parse_config(config=config)
+    else:
+        mf_config = read_config_file(
+            get_config_file_path(config_file_path=config_file_path)
+        )
+
+    def build_client() -> "MetricFlowClient":
+        """
+        Builds a MetricFlow client from the effective configuration.
+        """
+        return build_client_from_config(
+            config=mf_config, model_cache_dir=model_cache_dir
+        )
+
+    return mf_config, build_client
+
+
+def get_metricflow_client(
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    model_cache_dir: Optional[str] = None,
+) -> "MetricFlowClient":
+    """
+    Returns a MetricFlow client.
+
+    Args:
+        config: MetricFlow configuration. Can be either a `dict` or a YAML string.
+            If provided, the client is built straight from it.
+        config_file_path: Path to MetricFlow config file, read only if `config`
+            is not provided. If not provided, the default path will be used.
+        reuse_client: Whether to reuse a warm client from the process-wide pool.
+            A new client is built whenever the configuration or the
+            model directory changes.
+        model_cache_dir: Directory where the parsed model is cached.
+            If not provided, the model files are always parsed.
+
+    Raises:
+        `MetricFlowFailureException` if the configuration is not valid YAML.
+
+    Returns:
+        A MetricFlow client.
+    """
+    mf_config, build_client = _resolve_client(
+        config=config,
+        config_file_path=config_file_path,
+        model_cache_dir=model_cache_dir,
+    )
+    if not reuse_client:
+        return build_client()
+
+    fingerprint = compute_client_fingerprint(mf_config)
+    return _client_pool.get(fingerprint, build_client)
+
+
+@contextmanager
+def lease_metricflow_client(
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    model_cache_dir: Optional[str] = None,
+) -> Iterator["MetricFlowClient"]:
+    """
+    Holds a MetricFlow client until the end of the block, so that the
+    process-wide pool never closes it while it is in use.
+
+    Args:
+        config: MetricFlow configuration, see `get_metricflow_client`.
+        config_file_path: Path to MetricFlow config file,
+            see `get_metricflow_client`.
+        reuse_client: Whether to reuse a warm client from the process-wide pool,
+            see `get_metricflow_client`.
+        model_cache_dir: Directory where the parsed model is cached,
+            see `get_metricflow_client`.
+
+    Raises:
+        `MetricFlowFailureException` if the configuration is not valid YAML.
+
+    Yields:
+        A MetricFlow client.
+    """
+    mf_config, build_client = _resolve_client(
+        config=config,
+        config_file_path=config_file_path,
+        model_cache_dir=model_cache_dir,
+    )
+    if not reuse_client:
+        yield build_client()
+        return
+
+    fingerprint = compute_client_fingerprint(mf_config)
+    with _client_pool.lease(fingerprint, build_client) as client:
+        yield client
@@ -0,0 +1,304 @@
+"""
+Utils to coalesce compatible MetricFlow queries into a single warehouse query
+"""
+import json
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from prefect_metricflow.materializations import DEFAULT_MAX_PARALLELISM
+from prefect_metricflow.queries import run_query
+from prefect_metricflow.scheduling import get_metric_measures
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from pandas import DataFrame
+
+DEFAULT_COALESCE_WINDOW = 0.05
+COALESCABLE_METRIC_TYPES = ("measure_proxy", "ratio", "expr")
+
+
+def get_metric_data_sources(client: "MetricFlowClient") -> Dict[str, str]:
+    """
+    Returns the data source of each metric whose queries can be merged.
+
+    The rows of a merged query are the union of the dimension values
+    of its metrics. They are the rows of each query only if every metric
+    aggregates the same data source over the same rows: metrics reading
+    several data sources, with a constraint, cumulative or derived from other
+    metrics, are never merged.
+
+    Args:
+        client: The MetricFlow client.
+
+    Returns:
+        A `dict` mapping the normalized name of each metric that can be merged
+        to the name of the data source it reads.
+    """
+    model = client.user_configured_model
+    measure_data_sources = {
+        measure.name: data_source.name
+        for data_source in model.data_sources
+        for measure in data_source.measures
+    }
+
+    data_sources = {}
+    for metric in model.metrics:
+        metric_type = str(getattr(metric.type, "value", metric.type)).lower()
+        if metric_type not in COALESCABLE_METRIC_TYPES:
+            continue
+        if getattr(metric, "constraint", None) is not None:
+            continue
+        type_params = metric.type_params
+        input_measures = list(type_params.measures or []) + [
+            type_params.measure,
+            type_params.numerator,
+            type_params.denominator,
+        ]
+        if any(getattr(measure, "constraint", None) for measure in input_measures):
+            continue
+        metric_data_sources = {
+            measure_data_sources.get(measure) for measure in get_metric_measures(metric)
+        }
+        if len(metric_data_sources) == 1 and None not in metric_data_sources:
+            data_sources[metric.name.lower()] = metric_data_sources.pop()
+    return data_sources
+
+
+def get_coalescing_key(
+    spec: Dict[str, Any], metric_data_sources: Dict[str, str]
+) -> Optional[str]:
+    """
+    Returns the key shared by the queries that can be merged with a query.
+
+    Queries can be merged if they only differ by their metrics, and all their
+    metrics read the same data source, see `get_metric_data_sources`. Queries
+    with a limit, or ordered by a metric, are never merged as the merged query
+    would return different rows.
+
+    Args:
+        spec: A normalized query spec.
+        metric_data_sources: The data source of each metric that can be merged.
+
+    Returns:
+        The coalescing key, or `None` if the query cannot be merged.
+    """
+    if spec["limit"] is not None:
+        return None
+    if any(item.lstrip("-") not in spec["dimensions"] for item in spec["order"]):
+        return None
+    data_sources = {metric_data_sources.get(metric) for metric in spec["metrics"]}
+    if len(data_sources) != 1 or None in data_sources:
+        return None
+
+    return json.dumps(
+        {
+            "data_source": data_sources.pop(),
+            **{key: value for key, value in spec.items() if key != "metrics"},
+        },
+        sort_keys=True,
+    )
+
+
+def split_result(
+    result: "DataFrame", metrics: List[str], merged_metrics: List[str]
+) -> "DataFrame":
+    """
+    Extracts the result of a query from the result of a merged query.
+
+    The metrics of a merged query read the same data source, so its rows
+    are keyed by the same dimension values as the rows of each query:
+    every row is kept, even where the metrics of the query are null.
+
+    Args:
+        result: The result of the merged query.
+        metrics: The metrics of the query.
+        merged_metrics: The metrics of the merged query.
+
+    Returns:
+        The columns of the dimensions and of `metrics`.
+    """
+    other_metrics = [metric for metric in merged_metrics if metric not in metrics]
+    return result.drop(columns=other_metrics).reset_index(drop=True)
+
+
+def run_coalesced_queries(
+    client: "MetricFlowClient", specs: List[Dict[str, Any]]
+) -> List[Union["DataFrame", Exception]]:
+    """
+    Runs queries that only differ by their metrics as a single query over
+    the union of their metrics, then splits the result back per query.
+
+    If the merged query fails, e.g. because one of the metrics is not valid,
+    each query runs on its own, so that the failure is only reported
+    for the queries causing it.
+
+    Args:
+        client: The MetricFlow client.
+        specs: Normalized query specs sharing the same coalescing key.
+
+    Returns:
+        For each query, in order, either its result or the exception raised
+        while running it.
+    """
+    results: List[Union["DataFrame", Exception]] = []
+    if len(specs) > 1:
+        merged_metrics = list(
+            dict.fromkeys(metric for spec in specs for metric in spec["metrics"])
+        )
+        try:
+            result = run_query(client, {**specs[0], "metrics": merged_metrics})
+        except Exception:
+            # Each query runs on its own below, to find the failing ones
+            pass
+        else:
+            return [
+                split_result(result, spec["metrics"], merged_metrics) for spec in specs
+            ]
+
+    for spec in specs:
+        try:
+            results.append(run_query(client, spec))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def query_coalesced(
+    client: "MetricFlowClient",
+    specs: List[Dict[str, Any]],
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> List[Union["DataFrame", Exception]]:
+    """
+    Runs several queries, merging the ones that only differ by their metrics.
+
+    Args:
+        client: The MetricFlow client.
+        specs: Normalized query specs.
+        max_parallelism: Maximum number of merged queries run at the same time.
+
+    Returns:
+        For each query, in order, either its result or the exception raised
+        while running it.
+    """
+    metric_data_sources = get_metric_data_sources(client)
+    groups: Dict[Any, List[int]] = {}
+    for index, spec in enumerate(specs):
+        key = get_coalescing_key(spec, metric_data_sources)
+        groups.setdefault(key if key is not None else index, []).append(index)
+
+    results: List[Union["DataFrame", Exception]] = [None] * len(specs)
+
+    def run(indexes: List[int]) -> None:
+        """
+        Runs a group of queries that can be merged.
+        """
+        group_results = run_coalesced_queries(
+            client, [specs[index] for index in indexes]
+        )
+        for index, result in zip(indexes, group_results):
+            results[index] = result
+
+    with ThreadPoolExecutor(max_workers=max(max_parallelism, 1)) as executor:
+        list(executor.map(run, groups.values()))
+
+    return results
+
+
+class QueryCoalescer:
+    """
+    Merges the compatible queries submitted within a short window
+    into a single query.
+
+    The first query of a batch waits `window` seconds for compatible queries,
+    then the batch runs as a single query and its result is split back.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, List[Tuple[Dict[str, Any], Future]]] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self, client: "MetricFlowClient", spec: Dict[str, Any], window: float
+    ) -> Future:
+        """
+        Submits a query.
+
+        Args:
+            client: The MetricFlow client, the same for every query
+                submitted to this coalescer.
+            spec: A normalized query spec.
+            window: Number of seconds the first query of a batch waits
+                for compatible queries.
+
+        Returns:
+            A future resolved with the result of the query.
+        """
+        future: Future = Future()
+        key = get_coalescing_key(spec, get_metric_data_sources(client))
+        if key is None:
+            self._run(client, [(spec, future)])
+            return future
+
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                self._pending[key] = [(spec, future)]
+                timer = threading.Timer(window, self._flush, args=(client, key))
+                timer.daemon = True
+                timer.start()
+            else:
+                batch.append((spec, future))
+
+        return future
+
+    def _flush(self, client: "MetricFlowClient", key: str) -> None:
+        """
+        Runs the batch of queries pending under `key`, once its window is over.
+        """
+        with self._lock:
+            batch = self._pending.pop(key, [])
+        self._run(client, batch)
+
+    @staticmethod
+    def _run(
+        client: "MetricFlowClient", batch: List[Tuple[Dict[str, Any], Future]]
+    ) -> None:
+        """
+        Runs a batch of queries and resolves their futures.
+        """
+        try:
+            results = run_coalesced_queries(client, [spec for spec, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_coalescers: "weakref.WeakKeyDictionary[Any, QueryCoalescer]" = (
+    weakref.WeakKeyDictionary()
+)
+_coalescers_lock = threading.Lock()
+
+
+def get_query_coalescer(client: "MetricFlowClient") -> QueryCoalescer:
+    """
+    Returns the process-wide query coalescer of a MetricFlow client.
+
+    Args:
+        client: The MetricFlow client.
+
+    Returns:
+        The query coalescer, shared by every query running with `client`.
+    """
+    with _coalescers_lock:
+        coalescer = _coalescers.get(client)
+        if coalescer is None:
+            coalescer = QueryCoalescer()
+            _coalescers[client] = coalescer
+    return coalescer
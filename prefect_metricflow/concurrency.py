@@ -0,0 +1,100 @@
+"""
+Utils to run blocking MetricFlow calls concurrently
+"""
+import asyncio
+import threading
+import weakref
+from functools import partial
+from typing import Any, Callable, Dict
+
+import anyio.to_thread
+from anyio import CapacityLimiter
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Limiters are bound to the event loop they are used in
+_limiters: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# Semaphores bound the calls of every event loop of the process
+_semaphores: Dict[int, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+
+
+def get_capacity_limiter(max_concurrency: int) -> CapacityLimiter:
+    """
+    Returns the limiter shared by every call of the running event loop
+    that requested the same maximum concurrency.
+
+    Args:
+        max_concurrency: Maximum number of calls running at the same time.
+
+    Returns:
+        A capacity limiter.
+    """
+    loop = asyncio.get_running_loop()
+    loop_limiters = _limiters.setdefault(loop, {})
+    limiter = loop_limiters.get(max_concurrency)
+    if limiter is None:
+        limiter = CapacityLimiter(max_concurrency)
+        loop_limiters[max_concurrency] = limiter
+    return limiter
+
+
+def get_process_semaphore(max_concurrency: int) -> threading.BoundedSemaphore:
+    """
+    Returns the semaphore shared by every call of the process
+    that requested the same maximum concurrency, whatever its event loop.
+
+    Args:
+        max_concurrency: Maximum number of calls running at the same time.
+
+    Returns:
+        A bounded semaphore.
+    """
+    with _semaphores_lock:
+        semaphore = _semaphores.get(max_concurrency)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(max_concurrency)
+            _semaphores[max_concurrency] = semaphore
+        return semaphore
+
+
+def _run_with_semaphore(
+    semaphore: threading.BoundedSemaphore, fn: Callable[[], Any]
+) -> Any:
+    """
+    Runs a function while holding a slot of the semaphore.
+    """
+    with semaphore:
+        return fn()
+
+
+async def run_sync_in_thread(
+    fn: Callable[..., Any],
+    *args: Any,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    **kwargs: Any,
+) -> Any:
+    """
+    Runs a blocking function in a worker thread without blocking the event loop.
+
+    At most `max_concurrency` calls sharing the same limit run at the same time
+    across every event loop of the process. Calls of the same event loop wait
+    for a free slot without holding a thread, while calls waiting for a slot
+    used by another event loop hold their worker thread.
+
+    Args:
+        fn: The blocking function to run.
+        *args: Positional arguments passed to `fn`.
+        max_concurrency: Maximum number of calls running at the same time.
+        **kwargs: Keyword arguments passed to `fn`.
+
+    Returns:
+        The value returned by `fn`.
+    """
+    return await anyio.to_thread.run_sync(
+        _run_with_semaphore,
+        get_process_semaphore(max_concurrency),
+        partial(fn, *args, **kwargs),
+        limiter=get_capacity_limiter(max_concurrency),
+    )
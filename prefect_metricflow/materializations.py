@@ -0,0 +1,707 @@
+"""
+Utils to build MetricFlow materializations
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from uuid import uuid4
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.partitions import (
+    PARTITION_GRAINS,
+    parse_time,
+    split_time_range,
+    truncate_to_grain,
+)
+from prefect_metricflow.timing import run_in_current_context, timed_phase
+from prefect_metricflow.watermarks import WatermarkStore
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from metricflow.dataflow.sql_table import SqlTable
+    from metricflow.engine.models import Materialization
+
+DEFAULT_MAX_PARALLELISM = 4
+DEFAULT_TIME_COLUMN = "metric_time"
+# The partition grains each `metric_time` granularity is nested in
+NESTED_TIME_GRAINS = {"day": PARTITION_GRAINS, "week": ("week",), "month": ("month",)}
+
+MATERIALIZATION_REQUEST_KEYS = {"materialization_name", "start_time", "end_time"}
+
+
+def normalize_materialization_request(
+    request: Union[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Normalizes a materialization request.
+
+    Args:
+        request: Either the name of a materialization, or a `dict` with the
+            `materialization_name` and optionally the `start_time` and
+            `end_time` to be used to build the materialization.
+
+    Raises:
+        `MetricFlowFailureException` if the request is not valid.
+
+    Returns:
+        A `dict` with the `materialization_name`, `start_time` and `end_time` keys.
+    """
+    if isinstance(request, str):
+        request = {"materialization_name": request}
+
+    if not isinstance(request, dict) or not request.get("materialization_name"):
+        msg = f"Invalid materialization request, a name is required: {request}"
+        raise MetricFlowFailureException(msg)
+
+    unknown_keys = set(request) - MATERIALIZATION_REQUEST_KEYS
+    if unknown_keys:
+        msg = f"Invalid materialization request keys: {sorted(unknown_keys)}"
+        raise MetricFlowFailureException(msg)
+
+    return {
+        "materialization_name": request["materialization_name"],
+        "start_time": request.get("start_time"),
+        "end_time": request.get("end_time"),
+    }
+
+
+def materialize_concurrently(
+    client: "MetricFlowClient",
+    requests: List[Dict[str, Any]],
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> List[Union["SqlTable", Exception]]:
+    """
+    Builds several materializations concurrently with a shared MetricFlow client.
+
+    Args:
+        client: The MetricFlow client.
+        requests: Normalized materialization requests.
+        max_parallelism: Maximum number of materializations built at the same time.
+
+    Returns:
+        For each request, in order, either the SqlTable of the materialization
+        or the exception raised while building it.
+    """
+
+    def build(request: Dict[str, Any]) -> Union["SqlTable", Exception]:
+        """
+        Builds a materialization, returning the exception if it fails.
+        """
+        try:
+            return client.materialize(**request)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(max_parallelism, 1)) as executor:
+        return list(executor.map(build, requests))
+
+
+def get_materialization(
+    client: "MetricFlowClient", materialization_name: str
+) -> "Materialization":
+    """
+    Returns the definition of a materialization.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_name: The name of the materialization.
+
+    Raises:
+        `MetricFlowFailureException` if the materialization is not defined.
+
+    Returns:
+        The materialization, with its metrics, dimensions and destination table.
+    """
+    for materialization in client.list_materializations():
+        if materialization.name == materialization_name:
+            return materialization
+
+    msg = (
+        f"Unable to find materialization `{materialization_name}`. "
+        "Perhaps it has not been registered"
+    )
+    raise MetricFlowFailureException(msg)
+
+
+def get_materialization_table(
+    client: "MetricFlowClient", materialization: "Materialization"
+) -> "SqlTable":
+    """
+    Returns the table a materialization is built into, as MetricFlow does.
+
+    Args:
+        client: The MetricFlow client.
+        materialization: The materialization.
+
+    Returns:
+        The destination table of the materialization, or a table named after
+        the materialization in the MetricFlow system schema.
+    """
+    from metricflow.dataflow.sql_table import SqlTable
+
+    return materialization.destination_table or SqlTable.from_string(
+        f"{client.system_schema}.{materialization.name}"
+    )
+
+
+def get_materialization_sql(
+    client: "MetricFlowClient",
+    materialization: "Materialization",
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+) -> str:
+    """
+    Renders the SQL MetricFlow runs to build a materialization, without running it.
+
+    Args:
+        client: The MetricFlow client.
+        materialization: The materialization.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+
+    Returns:
+        The `CREATE TABLE ... AS` statement building the table
+        of the materialization.
+    """
+    from metricflow.engine.metricflow_engine import MetricFlowQueryRequest
+
+    # The same request as MetricFlow materializations, explained instead of run
+    explain_result = client.engine.explain(
+        mf_request=MetricFlowQueryRequest.create_with_random_request_id(
+            metric_names=materialization.metrics,
+            group_by_names=materialization.dimensions,
+            time_constraint_start=parse_time(start_time) if start_time else None,
+            time_constraint_end=parse_time(end_time) if end_time else None,
+            output_table=get_materialization_table(client, materialization).sql,
+        )
+    )
+    return explain_result.rendered_sql.sql_query
+
+
+def drop_materialization_tables(
+    client: "MetricFlowClient",
+    materialization_names: List[str],
+    max_parallelism: int = 1,
+) -> Dict[str, "SqlTable"]:
+    """
+    Drops the tables of several materializations with a shared MetricFlow client.
+
+    All the materializations are resolved before any table is dropped,
+    so that nothing is dropped if one of them is not defined. Tables are dropped
+    with `DROP TABLE IF EXISTS`, in a single round trip each.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_names: The names of the materializations to drop.
+        max_parallelism: Maximum number of tables dropped at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if a materialization is not defined.
+
+    Returns:
+        A `dict` mapping each materialization name to its table,
+        which no longer exists.
+    """
+    materializations = {
+        materialization.name: materialization
+        for materialization in client.list_materializations()
+    }
+    unknown_names = sorted(set(materialization_names) - set(materializations))
+    if unknown_names:
+        msg = (
+            f"Unable to find materializations {unknown_names}. "
+            "Perhaps they have not been registered"
+        )
+        raise MetricFlowFailureException(msg)
+
+    tables = {
+        name: get_materialization_table(client, materializations[name])
+        for name in dict.fromkeys(materialization_names)
+    }
+
+    with ThreadPoolExecutor(max_workers=max(max_parallelism, 1)) as executor:
+        list(executor.map(client.sql_client.drop_table, tables.values()))
+    return tables
+
+
+def new_run_id() -> str:
+    """
+    Returns a random identifier of a build, appended to the names of the
+    tables it creates next to the materialization table, so that concurrent
+    builds of the same materialization do not use the same tables.
+
+    Returns:
+        A short random hex string.
+    """
+    return uuid4().hex[:8]
+
+
+def get_partition_table(
+    table: "SqlTable", partition_start: str, run_id: Optional[str] = None
+) -> "SqlTable":
+    """
+    Returns the table a partition of a materialization is built into.
+
+    Args:
+        table: The table of the materialization.
+        partition_start: The start of the partition, as an ISO 8601 timestamp.
+        run_id: The identifier of the build, see `new_run_id`.
+
+    Returns:
+        A table next to `table`, named after the start of the partition
+        and the build.
+    """
+    from metricflow.dataflow.sql_table import SqlTable
+
+    start = parse_time(partition_start)
+    suffix = start.strftime("%Y%m%d")
+    if start != start.replace(hour=0, minute=0, second=0, microsecond=0):
+        suffix = start.strftime("%Y%m%d%H%M%S%f")
+    if run_id:
+        suffix = f"{suffix}_{run_id}"
+
+    return SqlTable(
+        db_name=table.db_name,
+        schema_name=table.schema_name,
+        table_name=f"{table.table_name}__p{suffix}",
+    )
+
+
+def build_time_range(
+    client: "MetricFlowClient",
+    materialization: "Materialization",
+    start_time: Optional[str],
+    end_time: Optional[str],
+    table: "SqlTable",
+) -> "SqlTable":
+    """
+    Builds the rows of a materialization within a time range into a table.
+
+    Args:
+        client: The MetricFlow client.
+        materialization: The materialization.
+        start_time: The start of the time range.
+        end_time: The end of the time range.
+        table: The table to create, it must not exist.
+
+    Returns:
+        The created table.
+    """
+    with timed_phase("sql_planning"):
+        client.query(
+            metrics=materialization.metrics,
+            dimensions=materialization.dimensions,
+            start_time=start_time,
+            end_time=end_time,
+            as_table=table.sql,
+        )
+    return table
+
+
+def build_partition(
+    client: "MetricFlowClient",
+    materialization: "Materialization",
+    partition: Tuple[str, str],
+    table: Optional["SqlTable"] = None,
+    run_id: Optional[str] = None,
+) -> "SqlTable":
+    """
+    Builds a partition of a materialization into its own table.
+
+    Args:
+        client: The MetricFlow client.
+        materialization: The materialization.
+        partition: The `(start_time, end_time)` of the partition.
+        table: The table the partitions are merged into. If not provided,
+            the table of the materialization is used.
+        run_id: The identifier of the build, see `new_run_id`.
+
+    Returns:
+        The table of the partition.
+    """
+    start_time, end_time = partition
+    partition_table = get_partition_table(
+        table or get_materialization_table(client, materialization),
+        start_time,
+        run_id=run_id,
+    )
+    return build_time_range(
+        client, materialization, start_time, end_time, table=partition_table
+    )
+
+
+def validate_partitioning(
+    client: "MetricFlowClient", materialization: "Materialization", partition_grain: str
+) -> None:
+    """
+    Checks that a materialization can be built as time partitions
+    whose rows are merged with `UNION ALL`.
+
+    That is the case when no row of the materialization aggregates data from
+    two partitions: the materialization must be grouped by `metric_time` at
+    a granularity nested in the partition grain, and none of its metrics
+    can be cumulative, as their window spans partitions.
+
+    Args:
+        client: The MetricFlow client.
+        materialization: The materialization.
+        partition_grain: The partition grain, one of `day`, `week` or `month`.
+
+    Raises:
+        `MetricFlowFailureException` if the materialization cannot be partitioned.
+    """
+    time_grains = [
+        grain or "day"
+        for name, _, grain in (
+            dimension.lower().partition("__")
+            for dimension in materialization.dimensions
+        )
+        if name == DEFAULT_TIME_COLUMN
+    ]
+    if not any(
+        partition_grain in NESTED_TIME_GRAINS.get(grain, ()) for grain in time_grains
+    ):
+        msg = (
+            f"Materialization `{materialization.name}` cannot be built in "
+            f"{partition_grain} partitions, it must be grouped by "
+            f"{DEFAULT_TIME_COLUMN} at a granularity nested in the partition grain"
+        )
+        raise MetricFlowFailureException(msg)
+
+    metric_types = {
+        metric.name.lower(): str(getattr(metric.type, "value", metric.type)).lower()
+        for metric in client.user_configured_model.metrics
+    }
+    cumulative_metrics = [
+        name
+        for name in materialization.metrics
+        if metric_types.get(name.lower()) == "cumulative"
+    ]
+    if cumulative_metrics:
+        msg = (
+            f"Materialization `{materialization.name}` cannot be built in "
+            f"partitions, its cumulative metrics {cumulative_metrics} "
+            "span partitions"
+        )
+        raise MetricFlowFailureException(msg)
+
+
+def drop_tables(client: "MetricFlowClient", tables: List["SqlTable"]) -> None:
+    """
+    Drops tables if they exist.
+
+    Args:
+        client: The MetricFlow client.
+        tables: The tables to drop.
+    """
+    for table in tables:
+        client.sql_client.drop_table(table)
+
+
+def merge_partitions(
+    client: "MetricFlowClient",
+    table: "SqlTable",
+    partition_tables: List["SqlTable"],
+    run_id: Optional[str] = None,
+) -> "SqlTable":
+    """
+    Replaces the table of a materialization with the union of its partitions.
+
+    The union is built into a staging table first, so that the table is left
+    untouched if the union fails. The staging table is only dropped once the
+    table has been rebuilt from it, so that the merged rows are not lost if
+    the table is dropped but cannot be created again. The partition tables
+    are not dropped.
+
+    Args:
+        client: The MetricFlow client.
+        table: The table of the materialization.
+        partition_tables: The tables of the partitions.
+        run_id: The identifier of the build, see `new_run_id`.
+
+    Raises:
+        `MetricFlowFailureException` if the table was dropped but could not be
+        created again, its rows are then kept in the staging table.
+
+    Returns:
+        The table of the materialization.
+    """
+    select_query = "\nUNION ALL\n".join(
+        f"SELECT * FROM {partition_table.sql}" for partition_table in partition_tables
+    )
+    staging_table = get_staging_table(table, suffix=f"merge_{run_id or new_run_id()}")
+    try:
+        client.sql_client.create_table_as_select(
+            staging_table, select_query=select_query
+        )
+        client.sql_client.drop_table(table)
+    except Exception:
+        client.sql_client.drop_table(staging_table)
+        raise
+
+    try:
+        client.sql_client.create_table_as_select(
+            table, select_query=f"SELECT * FROM {staging_table.sql}"
+        )
+    except Exception as e:
+        msg = (
+            f"Failed to create table {table.sql} after dropping it, "
+            f"its rows are kept in {staging_table.sql}"
+        )
+        raise MetricFlowFailureException(msg) from e
+
+    client.sql_client.drop_table(staging_table)
+    return table
+
+
+def materialize_partitioned(
+    client: "MetricFlowClient",
+    materialization_name: str,
+    start_time: str,
+    end_time: str,
+    partition_grain: str,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+    table: Optional["SqlTable"] = None,
+) -> "SqlTable":
+    """
+    Builds a materialization by splitting its time range into partitions
+    that are built concurrently, then merged into the materialization table.
+    The partition tables are dropped whether the build succeeds or fails.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_name: The name of the materialization.
+        start_time: The start time range to be used to build the materialization.
+        end_time: The end time range to be used to build the materialization.
+        partition_grain: The partition grain, one of `day`, `week` or `month`.
+        max_workers: Maximum number of partitions built at the same time.
+        table: The table the partitions are merged into. If not provided,
+            the table of the materialization is used.
+
+    Raises:
+        `MetricFlowFailureException` if the materialization cannot be partitioned,
+        see `validate_partitioning`, or if any partition fails to build.
+
+    Returns:
+        The table of the materialization.
+    """
+    partitions = split_time_range(start_time, end_time, partition_grain)
+    materialization = get_materialization(client, materialization_name)
+    validate_partitioning(client, materialization, partition_grain)
+    table = table or get_materialization_table(client, materialization)
+    run_id = new_run_id()
+
+    def build(partition: Tuple[str, str]) -> Union["SqlTable", Exception]:
+        """
+        Builds a partition, returning the exception if it fails.
+        """
+        try:
+            return build_partition(
+                client, materialization, partition, table=table, run_id=run_id
+            )
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        results = list(executor.map(run_in_current_context(build), partitions))
+
+    errors = [
+        (partition, result)
+        for partition, result in zip(partitions, results)
+        if isinstance(result, Exception)
+    ]
+    if errors:
+        drop_tables(
+            client,
+            [
+                get_partition_table(table, partition_start, run_id=run_id)
+                for partition_start, _ in partitions
+            ],
+        )
+        msg = (
+            f"Failed to build {len(errors)} of {len(partitions)} partitions of "
+            f"materialization `{materialization_name}`: "
+            + ", ".join(f"{start} - {end}: {e}" for (start, end), e in errors)
+        )
+        raise MetricFlowFailureException(msg) from errors[0][1]
+
+    try:
+        return merge_partitions(client, table, results, run_id=run_id)
+    finally:
+        drop_tables(client, results)
+
+
+def get_staging_table(table: "SqlTable", suffix: str = "incremental") -> "SqlTable":
+    """
+    Returns the table the rows of a build are staged into, such as the new rows
+    of an incremental build or the union of the partitions of a build.
+
+    Args:
+        table: The table of the materialization.
+        suffix: The suffix of the staging table name.
+
+    Returns:
+        A table next to `table`.
+    """
+    from metricflow.dataflow.sql_table import SqlTable
+
+    return SqlTable(
+        db_name=table.db_name,
+        schema_name=table.schema_name,
+        table_name=f"{table.table_name}__{suffix}",
+    )
+
+
+def get_time_column_grain(
+    materialization: "Materialization", time_column: str = DEFAULT_TIME_COLUMN
+) -> Optional[str]:
+    """
+    Returns the granularity of the time column of a materialization table.
+
+    Args:
+        materialization: The materialization.
+        time_column: The time column of the materialization table.
+
+    Returns:
+        The granularity of the dimension the time column holds, `day` if the
+        dimension has no explicit granularity, or `None` if the materialization
+        does not have that dimension.
+    """
+    name, _, grain = time_column.lower().partition("__")
+    if grain:
+        return grain
+    for dimension in materialization.dimensions:
+        dimension_name, _, dimension_grain = dimension.lower().partition("__")
+        if dimension_name == name:
+            return dimension_grain or "day"
+    return None
+
+
+def materialize_incremental(
+    client: "MetricFlowClient",
+    materialization_name: str,
+    watermark_store: WatermarkStore,
+    watermark_key: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    lookback: Optional[timedelta] = None,
+    time_column: str = DEFAULT_TIME_COLUMN,
+    partition_grain: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+) -> "SqlTable":
+    """
+    Builds a materialization incrementally, starting from the high-water mark
+    of its last successful build.
+
+    The first build, or a build whose table no longer exists, builds the whole
+    time range. Later builds only query the rows after the watermark, minus
+    `lookback`, replace these rows in the materialization table, then move the
+    watermark to `end_time`. As MetricFlow widens a time range to whole periods
+    of the time column granularity, the start of the rebuilt rows is truncated
+    to that granularity, so that the period holding it is replaced, not
+    inserted twice.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_name: The name of the materialization.
+        watermark_store: The store of the watermarks.
+        watermark_key: The key of the watermark of the materialization.
+        start_time: The start time range to be used for the first build.
+        end_time: The end time range to be used to build the materialization.
+            If not provided, the current UTC time is used.
+        lookback: How far before the watermark rows are rebuilt,
+            to pick up late-arriving data.
+        time_column: The time column of the materialization table.
+        partition_grain: If provided, the time range is built in partitions
+            of this grain, see `materialize_partitioned`.
+        max_workers: Maximum number of partitions built at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if the time range is not valid, if
+        `end_time` is before the watermark of an existing table, or if the
+        granularity of the time column is not `day`, `week` or `month`.
+
+    Returns:
+        The table of the materialization.
+    """
+    end = parse_time(end_time) if end_time else datetime.utcnow()
+    end_time = end.isoformat()
+    materialization = get_materialization(client, materialization_name)
+    table = get_materialization_table(client, materialization)
+
+    watermark = watermark_store.get(watermark_key)
+    if watermark is None or not client.sql_client.table_exists(table):
+        if partition_grain and start_time:
+            materialize_partitioned(
+                client,
+                materialization_name=materialization_name,
+                start_time=start_time,
+                end_time=end_time,
+                partition_grain=partition_grain,
+                max_workers=max_workers,
+            )
+        else:
+            with timed_phase("sql_planning"):
+                table = client.materialize(
+                    materialization_name=materialization_name,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+        watermark_store.set(watermark_key, end_time)
+        return table
+
+    # Rows after the end would be deleted without being rebuilt,
+    # and the watermark would move backwards
+    if end < parse_time(watermark):
+        msg = (
+            f"Invalid end time {end_time} for materialization "
+            f"`{materialization_name}`, it is before its watermark {watermark}"
+        )
+        raise MetricFlowFailureException(msg)
+
+    range_start = parse_time(watermark) - (lookback or timedelta(0))
+    time_grain = get_time_column_grain(materialization, time_column)
+    if time_grain is not None:
+        if time_grain not in PARTITION_GRAINS:
+            msg = (
+                f"Materialization `{materialization_name}` cannot be built "
+                f"incrementally, the granularity {time_grain} of its time column "
+                f"is not one of {PARTITION_GRAINS}"
+            )
+            raise MetricFlowFailureException(msg)
+        range_start = truncate_to_grain(range_start, time_grain)
+    if range_start > end:
+        return table
+
+    staging_table = get_staging_table(table, suffix=f"incremental_{new_run_id()}")
+    try:
+        if partition_grain:
+            materialize_partitioned(
+                client,
+                materialization_name=materialization_name,
+                start_time=range_start.isoformat(),
+                end_time=end_time,
+                partition_grain=partition_grain,
+                max_workers=max_workers,
+                table=staging_table,
+            )
+        else:
+            build_time_range(
+                client,
+                materialization,
+                start_time=range_start.isoformat(),
+                end_time=end_time,
+                table=staging_table,
+            )
+        client.sql_client.execute(
+            f"DELETE FROM {table.sql} "
+            f"WHERE {time_column} >= '{range_start.isoformat(sep=' ')}'"
+        )
+        client.sql_client.execute(
+            f"INSERT INTO {table.sql} SELECT * FROM {staging_table.sql}"
+        )
+    finally:
+        client.sql_client.drop_table(staging_table)
+
+    watermark_store.set(watermark_key, end_time)
+    return table
@@ -0,0 +1,404 @@
+"""
+Utils to incrementally load and cache the MetricFlow model built from the model files
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+from metricflow.errors.errors import ModelCreationException, ParsingException
+from metricflow.model.model_transformer import ModelTransformer
+from metricflow.model.model_validator import ModelValidator
+from metricflow.model.objects.common import YamlConfigFile
+from metricflow.model.objects.data_source import DataSource
+from metricflow.model.objects.materialization import Materialization
+from metricflow.model.objects.metric import Metric
+from metricflow.model.objects.user_configured_model import UserConfiguredModel
+from metricflow.model.parsing.dir_to_model import parse_config_yaml
+from metricflow.model.parsing.yaml_loader import YamlConfigLoader
+
+from prefect_metricflow.utils import is_private_file
+
+MODEL_CACHE_FILE_NAME = "model_cache.pkl"
+MODEL_CACHE_VERSION = 2
+
+Manifest = Dict[str, Dict[str, Any]]
+
+
+def iter_model_files(model_path: str) -> List[Tuple[str, str]]:
+    """
+    Lists the model files parsed by MetricFlow.
+
+    Args:
+        model_path: Path of the directory containing the MetricFlow model files.
+
+    Returns:
+        A sorted list of `(relative path, absolute path)` tuples,
+        one per non-hidden YAML file found under `model_path`.
+    """
+    model_files = []
+    for root, dirs, files in os.walk(model_path):
+        # Hidden directories and files are skipped by MetricFlow
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for file in files:
+            if file.startswith(".") or not YamlConfigLoader.is_valid_yaml_file_ending(
+                file
+            ):
+                continue
+            file_path = os.path.join(root, file)
+            model_files.append((os.path.relpath(file_path, model_path), file_path))
+
+    return sorted(model_files)
+
+
+def build_model_manifest(
+    model_path: str, previous_manifest: Optional[Manifest] = None
+) -> Manifest:
+    """
+    Builds the manifest of the model files.
+
+    Content hashes of files whose size and mtime did not change since
+    `previous_manifest` are reused instead of being computed again.
+
+    Args:
+        model_path: Path of the directory containing the MetricFlow model files.
+        previous_manifest: A manifest previously built for the same directory.
+
+    Returns:
+        A `dict` mapping the relative path of each model file to its
+        `size`, `mtime_ns` and `sha256` content hash.
+    """
+    previous_manifest = previous_manifest or {}
+    manifest = {}
+    for relative_path, file_path in iter_model_files(model_path):
+        stat = os.stat(file_path)
+        previous_entry = previous_manifest.get(relative_path)
+        if (
+            previous_entry is not None
+            and previous_entry["size"] == stat.st_size
+            and previous_entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            digest = previous_entry["sha256"]
+        else:
+            with open(file_path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+
+        manifest[relative_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }
+
+    return manifest
+
+
+def get_manifest_digest(manifest: Manifest) -> str:
+    """
+    Returns the cache key of a manifest.
+
+    Only paths and content hashes are part of the key, so touching a file
+    without changing its content does not invalidate the cache.
+
+    Args:
+        manifest: A manifest of the model files.
+
+    Returns:
+        The SHA-256 hex digest identifying the model files content.
+    """
+    digest = hashlib.sha256()
+    for relative_path in sorted(manifest):
+        digest.update(relative_path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(manifest[relative_path]["sha256"].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def read_model_cache(cache_file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Reads the model cache from the file system.
+
+    Args:
+        cache_file_path: Absolute path of the model cache file.
+
+    Returns:
+        The content of the cache, or `None` if the cache does not exist,
+        is not readable, was written by an incompatible version, or is not
+        owned by the current user or writable by other users, as unpickling
+        a file written by another user could run arbitrary code.
+    """
+    try:
+        with open(cache_file_path, "rb") as cache_file:
+            if not is_private_file(cache_file):
+                return None
+            cache = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # A corrupted or incompatible cache is simply rebuilt
+        return None
+
+    if not isinstance(cache, dict) or cache.get("version") != MODEL_CACHE_VERSION:
+        return None
+
+    return cache
+
+
+def write_model_cache(cache_file_path: str, cache: Dict[str, Any]) -> None:
+    """
+    Atomically writes the model cache on the file system, in a file
+    only accessible by the current user.
+
+    Args:
+        cache_file_path: Absolute path of the model cache file.
+        cache: The content of the cache.
+    """
+    dir_path = os.path.dirname(os.path.abspath(cache_file_path))
+    os.makedirs(dir_path, mode=0o700, exist_ok=True)
+    fd, tmp_file_path = tempfile.mkstemp(
+        dir=dir_path, prefix=".model-cache-", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            pickle.dump(
+                {**cache, "version": MODEL_CACHE_VERSION},
+                tmp_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_file_path, cache_file_path)
+    except BaseException:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+        raise
+
+
+def parse_model_file(file_path: str) -> List[Any]:
+    """
+    Parses and validates a single model file.
+
+    Args:
+        file_path: Path of the model file.
+
+    Raises:
+        `ModelCreationException` if MetricFlow reports issues parsing the file.
+
+    Returns:
+        The data sources, metrics and materializations defined in the file.
+    """
+    with open(file_path) as f:
+        contents = Template(f.read()).substitute({})
+
+    try:
+        return list(
+            parse_config_yaml(YamlConfigFile(filepath=file_path, contents=contents))
+        )
+    except ParsingException as e:
+        raise ModelCreationException from e
+
+
+def build_model_from_parsed_files(
+    parsed_files: Dict[str, List[Any]]
+) -> UserConfiguredModel:
+    """
+    Assembles the MetricFlow model from the objects parsed from each model file.
+
+    The model is validated with MetricFlow's model validator between the
+    pre-validation and post-validation transformations.
+
+    Args:
+        parsed_files: A `dict` mapping the relative path of each model file
+            to the objects parsed from it.
+
+    Raises:
+        `ModelCreationException` if the model has blocking validation issues.
+
+    Returns:
+        The MetricFlow model, with MetricFlow transformations applied.
+    """
+    data_sources = []
+    metrics = []
+    materializations = []
+    for relative_path in sorted(parsed_files):
+        for obj in parsed_files[relative_path]:
+            if isinstance(obj, DataSource):
+                data_sources.append(obj)
+            elif isinstance(obj, Metric):
+                metrics.append(obj)
+            elif isinstance(obj, Materialization):
+                materializations.append(obj)
+
+    model = UserConfiguredModel(
+        data_sources=data_sources,
+        metrics=metrics,
+        materializations=materializations,
+    )
+    model = ModelTransformer.pre_validation_transform_model(model)
+    try:
+        model = ModelValidator().checked_validations(model)
+    except Exception as e:
+        raise ModelCreationException from e
+    return ModelTransformer.post_validation_transform_model(model)
+
+
+class IncrementalModelLoader:
+    """
+    Loads the MetricFlow model, keeping the parse results of each model file
+    so that only the files that changed since the previous load are parsed
+    and validated again.
+
+    If `cache_dir` is provided, the parse results are also persisted on disk,
+    so that a new process can reuse them.
+
+    Args:
+        model_path: Path of the directory containing the MetricFlow model files.
+        cache_dir: Directory where the model cache is stored.
+    """
+
+    def __init__(self, model_path: str, cache_dir: Optional[str] = None):
+        self.model_path = model_path
+        self.cache_dir = cache_dir
+        self._manifest: Manifest = {}
+        self._manifest_digest: Optional[str] = None
+        self._parsed_files: Dict[str, List[Any]] = {}
+        self._model: Optional[UserConfiguredModel] = None
+        self._restored = False
+        self._lock = threading.Lock()
+
+    @property
+    def cache_file_path(self) -> Optional[str]:
+        """
+        Returns the absolute path of the model cache file, if any.
+        """
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, MODEL_CACHE_FILE_NAME)
+
+    def load(self) -> UserConfiguredModel:
+        """
+        Loads the MetricFlow model.
+
+        The changed model files are parsed again and the rebuilt model is
+        validated before it replaces the cached one.
+
+        Raises:
+            `ModelCreationException` if a model file cannot be parsed,
+            or if the model is invalid.
+
+        Returns:
+            The MetricFlow model.
+        """
+        with self._lock:
+            if not self._restored:
+                self._restore()
+
+            manifest = build_model_manifest(
+                self.model_path, previous_manifest=self._manifest
+            )
+            manifest_digest = get_manifest_digest(manifest)
+
+            if self._model is not None and manifest_digest == self._manifest_digest:
+                # Keep sizes and mtimes up to date to skip hashing on the next load
+                if manifest != self._manifest:
+                    self._manifest = manifest
+                    self._persist()
+                return self._model
+
+            parsed_files = {}
+            try:
+                for relative_path, entry in manifest.items():
+                    previous_entry = self._manifest.get(relative_path)
+                    if (
+                        previous_entry is not None
+                        and previous_entry["sha256"] == entry["sha256"]
+                        and relative_path in self._parsed_files
+                    ):
+                        parsed_files[relative_path] = self._parsed_files[relative_path]
+                    else:
+                        parsed_files[relative_path] = parse_model_file(
+                            os.path.join(self.model_path, relative_path)
+                        )
+                model = build_model_from_parsed_files(parsed_files)
+            except Exception as e:
+                raise ModelCreationException from e
+
+            self._manifest = manifest
+            self._manifest_digest = manifest_digest
+            self._parsed_files = parsed_files
+            self._model = model
+            self._persist()
+
+            return model
+
+    def _restore(self) -> None:
+        """
+        Restores the parsed files and model persisted for the model directory.
+        """
+        self._restored = True
+        if self.cache_file_path is None:
+            return
+
+        cache = read_model_cache(self.cache_file_path)
+        if cache is None or cache.get("model_path") != os.path.abspath(self.model_path):
+            return
+
+        self._manifest = cache["manifest"]
+        self._manifest_digest = cache["manifest_digest"]
+        self._parsed_files = cache["parsed_files"]
+        self._model = cache["model"]
+
+    def _persist(self) -> None:
+        """
+        Persists the parsed files and model to the cache file.
+        """
+        if self.cache_file_path is None:
+            return
+
+        write_model_cache(
+            self.cache_file_path,
+            {
+                "model_path": os.path.abspath(self.model_path),
+                "manifest": self._manifest,
+                "manifest_digest": self._manifest_digest,
+                "parsed_files": self._parsed_files,
+                "model": self._model,
+            },
+        )
+
+
+_model_loaders: Dict[Tuple[str, Optional[str]], IncrementalModelLoader] = {}
+_model_loaders_lock = threading.Lock()
+
+
+def load_user_configured_model(
+    model_path: str, cache_dir: Optional[str] = None
+) -> UserConfiguredModel:
+    """
+    Loads the MetricFlow model through a process-wide incremental loader,
+    so that only the model files that changed since the previous load
+    are parsed again.
+
+    Args:
+        model_path: Path of the directory containing the MetricFlow model files.
+        cache_dir: Directory where the model cache is stored.
+
+    Raises:
+        `ModelCreationException` if a model file cannot be parsed,
+        or if the model is invalid.
+
+    Returns:
+        The MetricFlow model.
+    """
+    key = (
+        os.path.abspath(model_path),
+        os.path.abspath(cache_dir) if cache_dir else None,
+    )
+    with _model_loaders_lock:
+        loader = _model_loaders.get(key)
+        if loader is None:
+            loader = IncrementalModelLoader(model_path=model_path, cache_dir=cache_dir)
+            _model_loaders[key] = loader
+
+    return loader.load()
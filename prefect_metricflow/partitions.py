@@ -0,0 +1,119 @@
+"""
+Utils to split time ranges into partitions
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from dateutil.parser import isoparse
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+PARTITION_GRAINS = ("day", "week", "month")
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Parses an ISO 8601 timestamp, as MetricFlow does.
+
+    Args:
+        value: An ISO 8601 date or timestamp, such as `2022-01-01`,
+            `2022-01-01T12:00:00` or `2022-01-01T12:00:00Z`.
+
+    Raises:
+        `MetricFlowFailureException` if `value` is not a valid ISO 8601 timestamp.
+
+    Returns:
+        The parsed timestamp. Timestamps with a UTC offset are converted
+        to naive UTC timestamps, so that all timestamps can be compared.
+    """
+    try:
+        parsed = isoparse(value)
+    except (TypeError, ValueError, OverflowError):
+        msg = f"'{value}' is not a valid iso8601 timestamp"
+        raise MetricFlowFailureException(msg)
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def truncate_to_grain(value: datetime, grain: str) -> datetime:
+    """
+    Truncates a timestamp to the start of its partition.
+
+    Args:
+        value: The timestamp to truncate.
+        grain: The partition grain, one of `day`, `week` or `month`.
+            Weeks start on Monday.
+
+    Returns:
+        The start of the partition containing `value`.
+    """
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if grain == "day":
+        return day
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+
+    msg = f"Invalid partition grain {grain}, expected one of {PARTITION_GRAINS}"
+    raise MetricFlowFailureException(msg)
+
+
+def next_partition_start(value: datetime, grain: str) -> datetime:
+    """
+    Returns the start of the partition following the one containing `value`.
+
+    Args:
+        value: A timestamp.
+        grain: The partition grain, one of `day`, `week` or `month`.
+
+    Returns:
+        The start of the next partition.
+    """
+    start = truncate_to_grain(value, grain)
+    if grain == "day":
+        return start + timedelta(days=1)
+    if grain == "week":
+        return start + timedelta(weeks=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def split_time_range(
+    start_time: str, end_time: str, grain: str
+) -> List[Tuple[str, str]]:
+    """
+    Splits a time range into partitions aligned on the partition grain.
+
+    MetricFlow time constraints include both ends, so each partition ends
+    one microsecond before the next one starts.
+
+    Args:
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        grain: The partition grain, one of `day`, `week` or `month`.
+
+    Raises:
+        `MetricFlowFailureException` if the time range or the grain are not valid.
+
+    Returns:
+        The `(start_time, end_time)` ISO 8601 timestamps of each partition.
+    """
+    start = parse_time(start_time)
+    end = parse_time(end_time)
+    if start > end:
+        msg = f"Invalid time range, {start_time} is after {end_time}"
+        raise MetricFlowFailureException(msg)
+
+    partitions = []
+    partition_start = start
+    while partition_start <= end:
+        next_start = next_partition_start(partition_start, grain)
+        partition_end = min(next_start - timedelta(microseconds=1), end)
+        partitions.append((partition_start.isoformat(), partition_end.isoformat()))
+        partition_start = next_start
+
+    return partitions
@@ -0,0 +1,102 @@
+"""
+Cache of the SQL MetricFlow renders for queries
+"""
+import math
+from typing import TYPE_CHECKING, Any, Dict
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.streaming import get_query_sql
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from pandas import DataFrame
+
+DEFAULT_PLAN_CACHE_MAX_SIZE = 1024
+
+
+def has_cumulative_metric(client: "MetricFlowClient", spec: Dict[str, Any]) -> bool:
+    """
+    Returns whether a query has a cumulative metric.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+
+    Returns:
+        `True` if one of the metrics of the query is cumulative.
+    """
+    metric_types = {
+        metric.name.lower(): str(getattr(metric.type, "value", metric.type)).lower()
+        for metric in client.user_configured_model.metrics
+    }
+    return any(metric_types.get(name) == "cumulative" for name in spec["metrics"])
+
+
+def get_query_plan(
+    client: "MetricFlowClient",
+    spec: Dict[str, Any],
+    key: str,
+    plan_cache: QueryResultCache,
+) -> Any:
+    """
+    Returns the SQL MetricFlow renders for a query, planning the query
+    only if its SQL is not cached yet.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+        key: The key of the query, see `get_query_key`.
+        plan_cache: The cache of the rendered SQL.
+
+    Returns:
+        The rendered MetricFlow `SqlQuery`, with its `sql_query`
+        and `bind_parameters`.
+    """
+    # The key changes with the model, so a cached plan never expires
+    rendered_sql = plan_cache.get(key, ttl=math.inf)
+    if rendered_sql is None:
+        rendered_sql = get_query_sql(client, spec)
+        plan_cache.set(key, rendered_sql)
+    return rendered_sql
+
+
+def run_planned_query(
+    client: "MetricFlowClient",
+    spec: Dict[str, Any],
+    key: str,
+    plan_cache: QueryResultCache,
+) -> "DataFrame":
+    """
+    Runs a query on the data warehouse, executing its cached SQL
+    instead of planning the query again.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+        key: The key of the query, see `get_query_key`.
+        plan_cache: The cache of the rendered SQL.
+
+    Returns:
+        The result of the query.
+    """
+    rendered_sql = get_query_plan(client, spec, key, plan_cache)
+    return client.sql_client.query(
+        rendered_sql.sql_query, sql_bind_parameters=rendered_sql.bind_parameters
+    )
+
+
+_plan_cache = QueryResultCache(max_size=DEFAULT_PLAN_CACHE_MAX_SIZE)
+
+
+def get_plan_cache() -> QueryResultCache:
+    """
+    Returns the process-wide cache of the SQL rendered for queries.
+    """
+    return _plan_cache
+
+
+def clear_plan_cache() -> None:
+    """
+    Removes every plan from the process-wide cache of the SQL rendered for queries.
+    """
+    _plan_cache.clear()
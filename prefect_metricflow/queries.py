@@ -0,0 +1,152 @@
+"""
+Utils to run MetricFlow queries
+"""
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from prefect_metricflow.caching import DiskQueryResultCache, get_query_cache
+from prefect_metricflow.partitions import parse_time
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from pandas import DataFrame
+
+
+def normalize_query_spec(
+    metrics: List[str],
+    dimensions: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    where: Optional[str] = None,
+    order: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Normalizes the parameters of a MetricFlow query, so that equivalent
+    queries have the same spec.
+
+    Args:
+        metrics: The names of the metrics to query.
+        dimensions: The names of the dimensions to group the metrics by.
+        limit: The maximum number of rows to return.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        where: A SQL filter on the dimensions.
+        order: The metrics or dimensions to order by, prefixed with `-`
+            to sort in descending order.
+
+    Raises:
+        `MetricFlowFailureException` if a timestamp is not valid.
+
+    Returns:
+        The query spec, as a `dict` with the same keys as the arguments.
+    """
+
+    def normalize_names(names: Optional[List[str]]) -> List[str]:
+        """
+        Strips and lowercases names.
+        """
+        return [name.strip().lower() for name in names or []]
+
+    return {
+        "metrics": normalize_names(metrics),
+        "dimensions": normalize_names(dimensions),
+        "limit": limit,
+        "start_time": parse_time(start_time).isoformat() if start_time else None,
+        "end_time": parse_time(end_time).isoformat() if end_time else None,
+        "where": where.strip() if where else None,
+        "order": normalize_names(order),
+    }
+
+
+def get_query_key(spec: Dict[str, Any], fingerprint: str) -> str:
+    """
+    Returns the cache key of a query.
+
+    Args:
+        spec: A normalized query spec.
+        fingerprint: The fingerprint of the MetricFlow configuration
+            and model the query runs against.
+
+    Returns:
+        The SHA-256 hex digest identifying the query.
+    """
+    serialized = json.dumps(
+        {"spec": spec, "fingerprint": fingerprint}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def run_query(client: "MetricFlowClient", spec: Dict[str, Any]) -> "DataFrame":
+    """
+    Runs a query on the data warehouse.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+
+    Returns:
+        The result of the query.
+    """
+    result = client.query(
+        metrics=spec["metrics"],
+        dimensions=spec["dimensions"],
+        limit=spec["limit"],
+        start_time=spec["start_time"],
+        end_time=spec["end_time"],
+        where=spec["where"],
+        order=spec["order"] or None,
+    )
+    return result.result_df
+
+
+def run_cached_query(
+    client: "MetricFlowClient",
+    spec: Dict[str, Any],
+    key: str,
+    ttl: float,
+    disk_cache: Optional[DiskQueryResultCache] = None,
+    disk_ttl: Optional[float] = None,
+    run: Optional[Callable[[Dict[str, Any]], "DataFrame"]] = None,
+) -> "DataFrame":
+    """
+    Runs a query, looking up its result in the process-wide in-memory cache,
+    then in the on-disk cache, before querying the data warehouse.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+        key: The cache key of the query.
+        ttl: Maximum age in seconds of a result served from memory,
+            `0` disables the in-memory cache.
+        disk_cache: The on-disk cache. If not provided, results are only
+            cached in memory.
+        disk_ttl: Maximum age in seconds of a result served from disk.
+            If not provided, `ttl` is used.
+        run: Callable running the query on a cache miss.
+            If not provided, the query runs on its own with `client`.
+
+    Returns:
+        The result of the query.
+    """
+    memory_cache = get_query_cache()
+    if ttl > 0:
+        result = memory_cache.get(key, ttl=ttl)
+        if result is not None:
+            return result
+
+    if disk_cache is not None:
+        entry = disk_cache.get(key, ttl=ttl if disk_ttl is None else disk_ttl)
+        if entry is not None:
+            result, created_at = entry
+            if ttl > 0:
+                memory_cache.set(key, result, created_at=created_at)
+            return result
+
+    result = run(spec) if run else run_query(client, spec)
+    if ttl > 0:
+        memory_cache.set(key, result)
+    if disk_cache is not None:
+        disk_cache.set(key, result)
+    return result
@@ -0,0 +1,379 @@
+"""
+Utils to answer MetricFlow queries from the tables of built materializations
+"""
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.partitions import (
+    PARTITION_GRAINS,
+    parse_time,
+    truncate_to_grain,
+)
+from prefect_metricflow.subsumption import TIME_DIMENSION
+from prefect_metricflow.utils import get_cache_root
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from metricflow.dataflow.sql_table import SqlTable
+    from metricflow.engine.models import Materialization
+    from pandas import DataFrame
+
+MATERIALIZATIONS_DB_FILE_NAME = "materializations.db"
+# The names MetricFlow allows for metrics and dimensions, see its model validation
+COLUMN_NAME_PATTERN = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def get_materializations_db_path(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the path of the default SQLite registry of built materializations.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the materializations database
+        in the cache root directory.
+    """
+    return os.path.join(
+        get_cache_root(cache_root=cache_root), MATERIALIZATIONS_DB_FILE_NAME
+    )
+
+
+class SQLiteMaterializationRegistry:
+    """
+    Records the materializations built, with their table and time range,
+    in a local SQLite database.
+
+    Args:
+        path: Path of the SQLite database. If not provided, a database
+            in the prefect-metricflow cache root directory is used.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_materializations_db_path()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connects to the database, creating its table if needed.
+        """
+        dir_path = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dir_path, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS materializations "
+            "(fingerprint TEXT NOT NULL, materialization_name TEXT NOT NULL, "
+            "table_name TEXT NOT NULL, metrics TEXT NOT NULL, "
+            "dimensions TEXT NOT NULL, start_time TEXT, end_time TEXT, "
+            "built_at TEXT NOT NULL, "
+            "PRIMARY KEY (fingerprint, materialization_name))"
+        )
+        return connection
+
+    def get(
+        self, fingerprint: str, materialization_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the last build of a materialization.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration and model
+                the materialization was built with.
+            materialization_name: The name of the materialization.
+
+        Returns:
+            The build, see `list`, or `None` if it was never recorded.
+        """
+        builds = [
+            build
+            for build in self.list(fingerprint)
+            if build["materialization_name"] == materialization_name
+        ]
+        return builds[0] if builds else None
+
+    def list(self, fingerprint: str) -> List[Dict[str, Any]]:
+        """
+        Returns the last build of every materialization.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration and model
+                the materializations were built with.
+
+        Returns:
+            The builds, most recent first, as `dict`s with the
+            `materialization_name`, `table_name`, `metrics`, `dimensions`,
+            `start_time`, `end_time` and `built_at` of each materialization.
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT materialization_name, table_name, metrics, dimensions, "
+                "start_time, end_time, built_at FROM materializations "
+                "WHERE fingerprint = ? ORDER BY built_at DESC",
+                (fingerprint,),
+            ).fetchall()
+
+        keys = (
+            "materialization_name",
+            "table_name",
+            "metrics",
+            "dimensions",
+            "start_time",
+            "end_time",
+            "built_at",
+        )
+        builds = [dict(zip(keys, row)) for row in rows]
+        for build in builds:
+            build["metrics"] = json.loads(build["metrics"])
+            build["dimensions"] = json.loads(build["dimensions"])
+        return builds
+
+    def record(
+        self,
+        fingerprint: str,
+        materialization: "Materialization",
+        table: "SqlTable",
+        start_time: Optional[str],
+        end_time: Optional[str],
+    ) -> None:
+        """
+        Records a build of a materialization, replacing its previous build.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration and model
+                the materialization is built with.
+            materialization: The materialization.
+            table: The table the materialization is built into.
+            start_time: The start of the time range built, `None` if unbounded.
+            end_time: The end of the time range built, `None` if unbounded.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO materializations (fingerprint, "
+                "materialization_name, table_name, metrics, dimensions, "
+                "start_time, end_time, built_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    materialization.name,
+                    table.sql,
+                    json.dumps([name.lower() for name in materialization.metrics]),
+                    json.dumps([name.lower() for name in materialization.dimensions]),
+                    parse_time(start_time).isoformat() if start_time else None,
+                    parse_time(end_time).isoformat() if end_time else None,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+
+    def delete(self, fingerprint: str, materialization_name: str) -> bool:
+        """
+        Deletes the build of a materialization.
+
+        Args:
+            fingerprint: The fingerprint of the MetricFlow configuration and model
+                the materialization was built with.
+            materialization_name: The name of the materialization.
+
+        Returns:
+            `True` if a build was deleted, `False` otherwise.
+        """
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                "DELETE FROM materializations "
+                "WHERE fingerprint = ? AND materialization_name = ?",
+                (fingerprint, materialization_name),
+            )
+        return cursor.rowcount > 0
+
+
+def get_time_dimension(spec: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the time dimension a query is grouped by.
+
+    Args:
+        spec: A normalized query spec.
+
+    Returns:
+        The first `metric_time` dimension of the query, or `None`.
+    """
+    for dimension in spec["dimensions"]:
+        if dimension.partition("__")[0] == TIME_DIMENSION:
+            return dimension
+    return None
+
+
+def get_routed_start(spec: Dict[str, Any]) -> Optional[datetime]:
+    """
+    Returns the start of the time range of a query, truncated to the granularity
+    of its time dimension as MetricFlow does.
+
+    Args:
+        spec: A normalized query spec with a start time and a time dimension.
+
+    Returns:
+        The truncated start, or `None` if the granularity is not supported.
+    """
+    grain = get_time_dimension(spec).partition("__")[2] or "day"
+    if grain not in PARTITION_GRAINS:
+        return None
+    return truncate_to_grain(parse_time(spec["start_time"]), grain)
+
+
+def covers_query(
+    build: Dict[str, Any],
+    spec: Dict[str, Any],
+    max_age: Optional[timedelta] = None,
+) -> bool:
+    """
+    Returns whether the table of a materialization holds the result of a query.
+
+    That is the case when the materialization has the metrics of the query,
+    exactly its dimensions, so that no metric has to be aggregated again,
+    and a time range including the time range of the query. Queries with
+    a `where` filter, or ordered by another column, are never covered,
+    as they may refer to columns missing from the table.
+
+    Args:
+        build: A build of a materialization, see
+            `SQLiteMaterializationRegistry.list`.
+        spec: A normalized query spec.
+        max_age: Maximum age of the build. If not provided, builds of any age
+            cover the query.
+
+    Returns:
+        `True` if the query can be answered from the materialization table.
+    """
+    if spec["where"] is not None:
+        return False
+    if not set(spec["metrics"]) <= set(build["metrics"]):
+        return False
+    if set(spec["dimensions"]) != set(build["dimensions"]):
+        return False
+    columns = set(spec["dimensions"]) | set(spec["metrics"])
+    if any(item.lstrip("-") not in columns for item in spec["order"]):
+        return False
+    if max_age is not None:
+        if datetime.utcnow() - parse_time(build["built_at"]) > max_age:
+            return False
+
+    if spec["start_time"] or spec["end_time"]:
+        if get_time_dimension(spec) is None:
+            return False
+
+    if spec["start_time"] is None:
+        if build["start_time"] is not None:
+            return False
+    elif build["start_time"] is not None:
+        start = get_routed_start(spec)
+        if start is None or start < parse_time(build["start_time"]):
+            return False
+
+    if spec["end_time"] is None:
+        return build["end_time"] is None
+    return build["end_time"] is None or (
+        parse_time(spec["end_time"]) <= parse_time(build["end_time"])
+    )
+
+
+def validate_column_name(name: str) -> str:
+    """
+    Validates the name of a metric or dimension interpolated in a SQL query.
+
+    Args:
+        name: The normalized name.
+
+    Raises:
+        `MetricFlowFailureException` if the name is not a valid MetricFlow name.
+
+    Returns:
+        The name.
+    """
+    if not COLUMN_NAME_PATTERN.match(name):
+        msg = f"Invalid metric or dimension name {name!r}"
+        raise MetricFlowFailureException(msg)
+    return name
+
+
+def get_routed_sql(spec: Dict[str, Any], table: "SqlTable") -> str:
+    """
+    Returns the SQL query reading the result of a query from the table
+    of a materialization covering it.
+
+    The names of the metrics and dimensions are interpolated unquoted,
+    so that they match the columns MetricFlow created whatever the case
+    folding of the data warehouse, and are validated instead.
+
+    Args:
+        spec: A normalized query spec.
+        table: The table of the materialization.
+
+    Raises:
+        `MetricFlowFailureException` if a metric, dimension or order item
+        is not a valid MetricFlow name.
+
+    Returns:
+        The SQL query.
+    """
+    for name in spec["dimensions"] + spec["metrics"]:
+        validate_column_name(name)
+    for item in spec["order"]:
+        validate_column_name(item[1:] if item.startswith("-") else item)
+
+    sql = f"SELECT {', '.join(spec['dimensions'] + spec['metrics'])} FROM {table.sql}"
+
+    conditions = []
+    time_dimension = get_time_dimension(spec)
+    if spec["start_time"]:
+        start = get_routed_start(spec)
+        conditions.append(f"{time_dimension} >= '{start.isoformat(sep=' ')}'")
+    if spec["end_time"]:
+        end = parse_time(spec["end_time"])
+        conditions.append(f"{time_dimension} <= '{end.isoformat(sep=' ')}'")
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+
+    if spec["order"]:
+        order_by = [
+            f"{item[1:]} DESC" if item.startswith("-") else item
+            for item in spec["order"]
+        ]
+        sql += f" ORDER BY {', '.join(order_by)}"
+    if spec["limit"] is not None:
+        sql += f" LIMIT {int(spec['limit'])}"
+    return sql
+
+
+def run_routed_query(
+    client: "MetricFlowClient",
+    spec: Dict[str, Any],
+    builds: List[Dict[str, Any]],
+    max_age: Optional[timedelta] = None,
+) -> Optional["DataFrame"]:
+    """
+    Runs a query on the table of the most recently built materialization
+    covering it, instead of computing it from the data sources.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+        builds: The builds of the materializations,
+            see `SQLiteMaterializationRegistry.list`.
+        max_age: Maximum age of the builds, see `covers_query`.
+
+    Returns:
+        The result of the query, or `None` if no existing materialization table
+        covers the query.
+    """
+    from metricflow.dataflow.sql_table import SqlTable
+
+    for build in builds:
+        if not covers_query(build, spec, max_age=max_age):
+            continue
+        table = SqlTable.from_string(build["table_name"])
+        # The table may have been dropped since it was built
+        if client.sql_client.table_exists(table):
+            return client.sql_client.query(get_routed_sql(spec, table))
+    return None
@@ -0,0 +1,210 @@
+"""
+Utils to schedule the build of materializations sharing their inputs
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Union
+
+from prefect_metricflow.materializations import DEFAULT_MAX_PARALLELISM
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from metricflow.dataflow.sql_table import SqlTable
+
+
+def get_metric_measures(metric: Any) -> Set[str]:
+    """
+    Returns the measures a metric is computed from.
+
+    Args:
+        metric: A MetricFlow metric.
+
+    Returns:
+        The names of the measures referenced by the metric.
+    """
+    type_params = metric.type_params
+    # Measures are referenced by `MetricInputMeasure` objects
+    input_measures = list(type_params.measures or []) + [
+        type_params.measure,
+        type_params.numerator,
+        type_params.denominator,
+    ]
+    return {measure.name for measure in input_measures if measure}
+
+
+def get_materialization_inputs(
+    client: "MetricFlowClient", materialization_names: List[str]
+) -> Dict[str, Set[str]]:
+    """
+    Returns the measures and data sources each materialization reads.
+
+    Args:
+        client: The MetricFlow client.
+        materialization_names: The names of the materializations.
+
+    Returns:
+        A `dict` mapping each materialization name to its inputs,
+        as `measure:<name>` and `data_source:<name>` strings.
+        Materializations that are not defined have no inputs.
+    """
+    model = client.user_configured_model
+    metrics = {metric.name: metric for metric in model.metrics}
+    measure_data_sources = {
+        measure.name: data_source.name
+        for data_source in model.data_sources
+        for measure in data_source.measures
+    }
+
+    materializations = {
+        materialization.name: materialization
+        for materialization in client.list_materializations()
+    }
+
+    inputs = {}
+    for name in set(materialization_names):
+        measures = set()
+        materialization = materializations.get(name)
+        for metric_name in materialization.metrics if materialization else []:
+            if metric_name in metrics:
+                measures |= get_metric_measures(metrics[metric_name])
+        inputs[name] = {f"measure:{measure}" for measure in measures} | {
+            f"data_source:{measure_data_sources[measure]}"
+            for measure in measures
+            if measure in measure_data_sources
+        }
+
+    return inputs
+
+
+def get_conflicts(inputs: List[Set[str]]) -> List[Set[int]]:
+    """
+    Returns the builds each build shares at least one input with.
+
+    Only builds directly sharing an input conflict: if `a` shares an input
+    with `b`, and `b` with `c`, `a` and `c` do not conflict.
+
+    Args:
+        inputs: The inputs of each build.
+
+    Returns:
+        For each build, the indexes in `inputs` of the builds it conflicts with.
+    """
+    readers: Dict[str, List[int]] = {}
+    for index, build_inputs in enumerate(inputs):
+        for build_input in build_inputs:
+            readers.setdefault(build_input, []).append(index)
+
+    conflicts: List[Set[int]] = [set() for _ in inputs]
+    for indexes in readers.values():
+        for index in indexes:
+            conflicts[index].update(indexes)
+    for index, build_conflicts in enumerate(conflicts):
+        build_conflicts.discard(index)
+    return conflicts
+
+
+def run_without_conflicts(
+    inputs: List[Set[str]],
+    run: Callable[[int], None],
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> None:
+    """
+    Runs a build per entry of `inputs` on up to `max_parallelism` workers,
+    never running two builds sharing an input at the same time.
+
+    The builds conflicting with the most other builds are started first.
+    A worker that finishes a build then picks the pending build sharing the most
+    inputs with it, so that builds reading the same inputs run back-to-back
+    while the warehouse caches are hot.
+
+    Args:
+        inputs: The inputs of each build.
+        run: Runs the build of a given index in `inputs`.
+            It should not raise, as the other builds would not be run.
+        max_parallelism: Maximum number of builds running at the same time.
+    """
+    conflicts = get_conflicts(inputs)
+    pending = sorted(
+        range(len(inputs)), key=lambda i: (-len(conflicts[i]), -len(inputs[i]), i)
+    )
+    running: Set[int] = set()
+    condition = threading.Condition()
+
+    def next_build(previous: Optional[int]) -> Optional[int]:
+        """
+        Marks the previous build of a worker as finished, then waits for
+        a pending build that conflicts with no running build.
+        """
+        with condition:
+            if previous is not None:
+                running.discard(previous)
+                condition.notify_all()
+            while pending:
+                runnable = [i for i in pending if not conflicts[i] & running]
+                if runnable:
+                    shared = inputs[previous] if previous is not None else set()
+                    index = max(runnable, key=lambda i: len(inputs[i] & shared))
+                    pending.remove(index)
+                    running.add(index)
+                    return index
+                condition.wait()
+            return None
+
+    def work() -> None:
+        """
+        Runs builds until none is pending.
+        """
+        previous = None
+        while True:
+            index = next_build(previous)
+            if index is None:
+                return
+            run(index)
+            previous = index
+
+    workers = max(min(max_parallelism, len(inputs)), 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(work) for _ in range(workers)]:
+            future.result()
+
+
+def materialize_grouped(
+    client: "MetricFlowClient",
+    requests: List[Dict[str, Any]],
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> List[Union["SqlTable", Exception]]:
+    """
+    Builds several materializations concurrently, never building two
+    materializations sharing measures or data sources at the same time, and
+    building them back-to-back in the same worker while the warehouse caches
+    are hot, see `run_without_conflicts`.
+
+    Args:
+        client: The MetricFlow client.
+        requests: Normalized materialization requests.
+        max_parallelism: Maximum number of materializations built at the same time.
+
+    Returns:
+        For each request, in order, either the SqlTable of the materialization
+        or the exception raised while building it.
+    """
+    results: List[Union["SqlTable", Exception]] = [None] * len(requests)
+    inputs_by_name = get_materialization_inputs(
+        client, [request["materialization_name"] for request in requests]
+    )
+
+    def build(index: int) -> None:
+        """
+        Builds a materialization, storing its table or the exception raised.
+        """
+        try:
+            results[index] = client.materialize(**requests[index])
+        except Exception as e:
+            results[index] = e
+
+    run_without_conflicts(
+        [inputs_by_name[request["materialization_name"]] for request in requests],
+        build,
+        max_parallelism=max_parallelism,
+    )
+    return results
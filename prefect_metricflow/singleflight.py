@@ -0,0 +1,184 @@
+"""
+Utils to deduplicate identical concurrent MetricFlow calls
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prefect_metricflow.caching import DiskQueryResultCache, copy_result
+from prefect_metricflow.utils import get_cache_root
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCKS_DIR_NAME = "locks"
+SHARED_RESULTS_DIR_NAME = "shared-results"
+
+
+def get_call_key(**call: Any) -> str:
+    """
+    Returns the key identifying a call.
+
+    Args:
+        call: What identifies the call, such as its name, arguments
+            and the fingerprint of the MetricFlow configuration.
+
+    Returns:
+        The SHA-256 hex digest of the call.
+    """
+    serialized = json.dumps(call, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def get_locks_dir(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the directory of the lock files shared by the processes of a host.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the locks directory in the cache root directory.
+    """
+    return os.path.join(get_cache_root(cache_root=cache_root), LOCKS_DIR_NAME)
+
+
+def get_shared_results_dir(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the directory of the results shared by the processes of a host
+    waiting for each other's calls.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the shared results directory in the cache root
+        directory.
+    """
+    return os.path.join(get_cache_root(cache_root=cache_root), SHARED_RESULTS_DIR_NAME)
+
+
+@contextmanager
+def file_lock(lock_dir: str, key: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock shared by the processes of a host.
+    On platforms without `fcntl`, no lock is held.
+
+    Args:
+        lock_dir: Directory of the lock files.
+        key: The key of the lock.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{key}.lock"), "a+") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time: concurrent callers with the same
+    key wait for the running call and share its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        lock_dir: Optional[str] = None,
+        shared_results: Optional[DiskQueryResultCache] = None,
+    ) -> Any:
+        """
+        Runs `fn`, unless a call with the same key is running, in which case
+        its result is returned once it finishes.
+
+        Args:
+            key: The key of the call.
+            fn: The call.
+            lock_dir: If provided, `fn` also holds a file lock in this directory,
+                so that identical calls of other processes wait for it.
+            shared_results: If provided with `lock_dir`, the result of `fn` is
+                written to this cache, and a call that waited for the file lock
+                returns the result of an identical call of another process that
+                finished in the meantime instead of running `fn` again.
+
+        Returns:
+            The result of the call. Callers waiting for another call
+            receive a copy of its result.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return copy_result(future.result())
+
+        try:
+            if lock_dir:
+                waiting_since = time.time()
+                with file_lock(lock_dir, key):
+                    result = self._run_shared(key, fn, shared_results, waiting_since)
+            else:
+                result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    @staticmethod
+    def _run_shared(
+        key: str,
+        fn: Callable[[], Any],
+        shared_results: Optional[DiskQueryResultCache],
+        waiting_since: float,
+    ) -> Any:
+        """
+        Returns the shared result of the call if it finished after
+        `waiting_since`, otherwise runs it and shares its result.
+        """
+        if shared_results is None:
+            return fn()
+
+        entry = shared_results.get(key, ttl=time.time() - waiting_since)
+        if entry is not None:
+            result, _ = entry
+            return result
+
+        result = fn()
+        shared_results.set(key, result)
+        return result
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Returns the process-wide single-flight registry.
+    """
+    return _single_flight
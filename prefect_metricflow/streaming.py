@@ -0,0 +1,191 @@
+"""
+Utils to stream the results of MetricFlow queries in batches
+"""
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Union
+
+from prefect_metricflow.clients import lease_metricflow_client
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.queries import normalize_query_spec
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from pandas import DataFrame
+
+DEFAULT_BATCH_SIZE = 100_000
+
+
+def get_query_sql(client: "MetricFlowClient", spec: Dict[str, Any]) -> Any:
+    """
+    Renders the SQL of a query without running it.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+
+    Returns:
+        The rendered MetricFlow `SqlQuery`, with its `sql_query`
+        and `bind_parameters`.
+    """
+    explain_result = client.explain(
+        metrics=spec["metrics"],
+        dimensions=spec["dimensions"],
+        limit=spec["limit"],
+        start_time=spec["start_time"],
+        end_time=spec["end_time"],
+        where=spec["where"],
+        order=spec["order"] or None,
+    )
+    return explain_result.rendered_sql
+
+
+def get_sql_engine(client: "MetricFlowClient") -> Any:
+    """
+    Returns the SQLAlchemy engine of the SQL client of a MetricFlow client.
+
+    Args:
+        client: The MetricFlow client.
+
+    Raises:
+        `MetricFlowFailureException` if the SQL client of `client`
+        is not backed by SQLAlchemy.
+
+    Returns:
+        The SQLAlchemy engine.
+    """
+    engine = getattr(client.sql_client, "_engine", None)
+    if engine is None:
+        msg = (
+            f"Streaming is not supported by {type(client.sql_client).__name__}, "
+            "a SQLAlchemy based SQL client is required"
+        )
+        raise MetricFlowFailureException(msg)
+    return engine
+
+
+def iter_sql_batches(
+    client: "MetricFlowClient",
+    sql_query: str,
+    bind_parameters: Optional[Dict[str, Any]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator["DataFrame"]:
+    """
+    Runs a SQL query and yields its result in batches fetched from a server-side
+    cursor, so that at most `batch_size` rows are held in memory.
+
+    Args:
+        client: The MetricFlow client.
+        sql_query: The SQL query.
+        bind_parameters: The parameters bound to the SQL query.
+        batch_size: Maximum number of rows of each batch.
+
+    Raises:
+        `MetricFlowFailureException` if the SQL client of `client`
+        is not backed by SQLAlchemy.
+
+    Yields:
+        pandas DataFrames with the rows of the result, in order.
+    """
+    import pandas as pd
+    import sqlalchemy
+
+    engine = get_sql_engine(client)
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(
+            sqlalchemy.text(sql_query), bind_parameters or {}
+        )
+        columns = list(result.keys())
+        while True:
+            rows = result.fetchmany(max(batch_size, 1))
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def iter_query_batches(
+    client: "MetricFlowClient",
+    spec: Dict[str, Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator["DataFrame"]:
+    """
+    Runs a MetricFlow query and yields its result in batches,
+    see `iter_sql_batches`.
+
+    Args:
+        client: The MetricFlow client.
+        spec: A normalized query spec.
+        batch_size: Maximum number of rows of each batch.
+
+    Raises:
+        `MetricFlowFailureException` if the SQL client of `client`
+        is not backed by SQLAlchemy.
+
+    Yields:
+        pandas DataFrames with the rows of the result, in order.
+    """
+    # Fail before rendering the query if streaming is not supported
+    get_sql_engine(client)
+
+    rendered_sql = get_query_sql(client, spec)
+    yield from iter_sql_batches(
+        client,
+        rendered_sql.sql_query,
+        dict(rendered_sql.bind_parameters.param_dict),
+        batch_size=batch_size,
+    )
+
+
+def stream_query(
+    metrics: List[str],
+    dimensions: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    where: Optional[str] = None,
+    order: Optional[List[str]] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator["DataFrame"]:
+    """
+    Query metrics on the target DWH, yielding the result in batches.
+
+    Generators cannot be passed between Prefect tasks, so call it from within
+    the task consuming the batches.
+
+    Args:
+        metrics: The names of the metrics to query.
+        dimensions: The names of the dimensions to group the metrics by.
+        limit: The maximum number of rows to return.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        where: A SQL filter on the dimensions.
+        order: The metrics or dimensions to order by, prefixed with `-`
+            to sort in descending order.
+        config: MetricFlow configuration. Can be either a `dict` or a YAML string.
+        config_file_path: Path to MetricFlow config file, read if `config` is not
+            provided. If not provided, the default path will be used.
+        reuse_client: Whether to reuse a warm MetricFlow client.
+        batch_size: Maximum number of rows of each batch.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if a timestamp is not valid or if the SQL client does not support
+        streaming.
+
+    Yields:
+        pandas DataFrames with the rows of the result, in order.
+    """
+    spec = normalize_query_spec(
+        metrics=metrics,
+        dimensions=dimensions,
+        limit=limit,
+        start_time=start_time,
+        end_time=end_time,
+        where=where,
+        order=order,
+    )
+    with lease_metricflow_client(
+        config=config, config_file_path=config_file_path, reuse_client=reuse_client
+    ) as mfc:
+        yield from iter_query_batches(mfc, spec, batch_size=batch_size)
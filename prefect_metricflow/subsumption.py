@@ -0,0 +1,216 @@
+"""
+Utils to answer MetricFlow queries from cached results over a wider time range
+"""
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.partitions import (
+    PARTITION_GRAINS,
+    parse_time,
+    truncate_to_grain,
+)
+from prefect_metricflow.queries import get_query_key
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+TIME_DIMENSION = "metric_time"
+
+
+def get_time_grain(spec: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the granularity of the time dimension of a query.
+
+    Args:
+        spec: A normalized query spec.
+
+    Returns:
+        The granularity of the first `metric_time__<grain>` dimension, or `None`
+        if the query has no time dimension with an explicit granularity.
+    """
+    for dimension in spec["dimensions"]:
+        name, _, grain = dimension.partition("__")
+        if name == TIME_DIMENSION and grain:
+            return grain
+    return None
+
+
+def is_subsumable(spec: Dict[str, Any]) -> bool:
+    """
+    Returns whether the result of a query can be sliced out of the result of
+    the same query over a wider time range.
+
+    That is the case for queries without a limit, grouped by `metric_time`
+    with an explicit `day`, `week` or `month` granularity, and whose start,
+    if any, is aligned on that granularity, so that the rows of the query
+    are exactly the rows of the wider query within its time range.
+
+    Args:
+        spec: A normalized query spec.
+
+    Returns:
+        `True` if the query can be answered from a wider query.
+    """
+    grain = get_time_grain(spec)
+    if spec["limit"] is not None or grain not in PARTITION_GRAINS:
+        return False
+    if spec["start_time"] is None:
+        return True
+
+    start = parse_time(spec["start_time"])
+    return truncate_to_grain(start, grain) == start
+
+
+def get_range_key(spec: Dict[str, Any], fingerprint: str) -> str:
+    """
+    Returns the key shared by the queries only differing by their time range.
+
+    Args:
+        spec: A normalized query spec.
+        fingerprint: The fingerprint of the MetricFlow configuration and model.
+
+    Returns:
+        The key of the query, without its time range.
+    """
+    return get_query_key({**spec, "start_time": None, "end_time": None}, fingerprint)
+
+
+def slice_time_range(
+    result: "DataFrame",
+    column: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    inside: bool = True,
+) -> "DataFrame":
+    """
+    Returns the rows of a result within, or outside of, a time range.
+
+    Args:
+        result: The result of a query.
+        column: The time column.
+        start: The start of the time range, `None` if unbounded.
+        end: The end of the time range, `None` if unbounded.
+        inside: Whether to return the rows inside the time range,
+            or the rows outside of it.
+
+    Returns:
+        The selected rows.
+    """
+    import pandas as pd
+
+    times = pd.to_datetime(result[column])
+    mask = pd.Series(True, index=result.index)
+    if start is not None:
+        mask &= times >= pd.Timestamp(start)
+    if end is not None:
+        mask &= times <= pd.Timestamp(end)
+    return result[mask if inside else ~mask]
+
+
+def sort_result(result: "DataFrame", spec: Dict[str, Any]) -> "DataFrame":
+    """
+    Sorts a result as requested by the `order` of a query.
+
+    Args:
+        result: The result of the query.
+        spec: A normalized query spec.
+
+    Returns:
+        The sorted result, with a fresh index.
+    """
+    if spec["order"]:
+        result = result.sort_values(
+            by=[item.lstrip("-") for item in spec["order"]],
+            ascending=[not item.startswith("-") for item in spec["order"]],
+            kind="stable",
+        )
+    return result.reset_index(drop=True)
+
+
+def run_subsumed_query(
+    spec: Dict[str, Any],
+    range_key: str,
+    range_cache: QueryResultCache,
+    ttl: float,
+    run: Callable[[Dict[str, Any]], "DataFrame"],
+) -> "DataFrame":
+    """
+    Runs a query, slicing its result out of a cached result of the same query
+    over an overlapping time range, and only querying the missing edges of
+    the time range.
+
+    The cache keeps, for each query without its time range, the result over
+    the union of the time ranges queried within `ttl`.
+
+    Args:
+        spec: A normalized query spec, for which `is_subsumable` is `True`.
+        range_key: The key of the query without its time range.
+        range_cache: The cache of the results over wider time ranges.
+        ttl: Maximum age in seconds of the cached results.
+        run: Callable running a query on the data warehouse.
+
+    Returns:
+        The result of the query.
+    """
+    import pandas as pd
+
+    column = f"{TIME_DIMENSION}__{get_time_grain(spec)}"
+    start = parse_time(spec["start_time"]) if spec["start_time"] else None
+    end = parse_time(spec["end_time"]) if spec["end_time"] else None
+
+    entry = range_cache.get(range_key, ttl=ttl)
+    if entry is not None:
+        cached_start, cached_end, cached_result, created_at = entry
+        disjoint = (
+            end is not None and cached_start is not None and end < cached_start
+        ) or (start is not None and cached_end is not None and start > cached_end)
+        if column not in cached_result.columns or disjoint:
+            entry = None
+
+    if entry is None:
+        result = run(spec)
+        if column in result.columns:
+            range_cache.set(range_key, (start, end, result, time.time()))
+        return result
+
+    edges = []
+    if cached_start is not None and (start is None or start < cached_start):
+        edges.append((start, cached_start - timedelta(microseconds=1)))
+    if cached_end is not None and (end is None or end > cached_end):
+        edges.append((cached_end + timedelta(microseconds=1), end))
+
+    if edges:
+        parts = [cached_result]
+        for edge_start, edge_end in edges:
+            edge_result = run(
+                {
+                    **spec,
+                    "start_time": edge_start.isoformat() if edge_start else None,
+                    "end_time": edge_end.isoformat() if edge_end else None,
+                }
+            )
+            # MetricFlow widens time constraints to whole periods,
+            # so the edges may repeat rows of the cached time range
+            parts.append(
+                slice_time_range(
+                    edge_result, column, cached_start, cached_end, inside=False
+                )
+            )
+        cached_result = pd.concat(parts, ignore_index=True)
+        if start is None or cached_start is None:
+            cached_start = None
+        else:
+            cached_start = min(start, cached_start)
+        if end is None or cached_end is None:
+            cached_end = None
+        else:
+            cached_end = max(end, cached_end)
+        range_cache.set(
+            range_key,
+            (cached_start, cached_end, cached_result, created_at),
+            created_at=created_at,
+        )
+
+    return sort_result(slice_time_range(cached_result, column, start, end), spec)
@@ -1,90 +1,1633 @@
 """
 Collections of tasks to interact with MetricFlow
 """
-from typing import Dict, Optional, Union
+import contextvars
+import functools
+import os
+from contextlib import ExitStack
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 
-from metricflow.api.metricflow_client import MetricFlowClient
-from metricflow.dataflow.sql_table import SqlTable
 from prefect import task
 
-from prefect_metricflow.utils import get_config_file_path, persist_config
+from prefect_metricflow.arrow import (
+    to_arrow_table,
+    validate_result_format,
+    write_batches,
+)
+from prefect_metricflow.backfill import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_DELAY_SECONDS,
+    SQLiteBackfillCheckpoint,
+    get_backfill_key,
+    get_backfills_db_path,
+    run_backfill,
+)
+from prefect_metricflow.caching import (
+    DEFAULT_QUERY_CACHE_TTL,
+    DiskQueryResultCache,
+    get_query_results_dir,
+    get_range_cache,
+)
+from prefect_metricflow.catalog import (
+    DEFAULT_MAX_DIMENSIONS_PER_QUERY,
+    Catalog,
+    fetch_dimension_values,
+    fetch_dimension_values_batch,
+    get_catalog,
+    get_catalog_cache,
+    get_dimension_values_cache,
+    get_dimension_values_key,
+)
+from prefect_metricflow.clients import (
+    compute_client_fingerprint,
+    get_metricflow_client,
+    lease_metricflow_client,
+    read_config_file,
+)
+from prefect_metricflow.coalescing import get_query_coalescer, query_coalesced
+from prefect_metricflow.concurrency import DEFAULT_MAX_CONCURRENCY, run_sync_in_thread
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.materializations import (
+    DEFAULT_MAX_PARALLELISM,
+    DEFAULT_TIME_COLUMN,
+    drop_materialization_tables,
+    get_materialization,
+    get_materialization_sql,
+    get_materialization_table,
+    materialize_concurrently,
+    materialize_incremental,
+    materialize_partitioned,
+    normalize_materialization_request,
+)
+from prefect_metricflow.plans import (
+    get_plan_cache,
+    get_query_plan,
+    has_cumulative_metric,
+    run_planned_query,
+)
+from prefect_metricflow.queries import (
+    get_query_key,
+    normalize_query_spec,
+    run_cached_query,
+    run_query,
+)
+from prefect_metricflow.routing import (
+    SQLiteMaterializationRegistry,
+    get_materializations_db_path,
+    run_routed_query,
+)
+from prefect_metricflow.scheduling import materialize_grouped
+from prefect_metricflow.singleflight import (
+    get_call_key,
+    get_locks_dir,
+    get_shared_results_dir,
+    get_single_flight,
+)
+from prefect_metricflow.streaming import (
+    DEFAULT_BATCH_SIZE,
+    get_query_sql,
+    iter_sql_batches,
+)
+from prefect_metricflow.subsumption import (
+    get_range_key,
+    is_subsumable,
+    run_subsumed_query,
+)
+from prefect_metricflow.timing import reports_phases, timed_phase
+from prefect_metricflow.utils import (
+    get_config_file_path,
+    get_isolated_config_file_path,
+    parse_config,
+    persist_config,
+)
+from prefect_metricflow.watermarks import (
+    SQLiteWatermarkStore,
+    WatermarkStore,
+    get_watermark_key,
+    get_watermarks_db_path,
+)
+
+if TYPE_CHECKING:
+    from metricflow.api.metricflow_client import MetricFlowClient
+    from metricflow.dataflow.sql_table import SqlTable
+    from pandas import DataFrame
+    from pyarrow import Table
+
+_client_leases: contextvars.ContextVar[Optional[ExitStack]] = contextvars.ContextVar(
+    "prefect_metricflow_client_leases", default=None
+)
+
+
+def _holds_clients(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Holds the pooled MetricFlow clients a task run gets until the run ends,
+    so that the pool never closes a client the run is using.
+    """
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        """
+        Runs `fn` with a new stack of client leases, released when it returns.
+        """
+        with ExitStack() as leases:
+            token = _client_leases.set(leases)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _client_leases.reset(token)
+
+    return run
+
+
+def _get_client(
+    config: Optional[Union[Dict, str]],
+    config_file_path: Optional[str],
+    reuse_client: bool,
+    write_config_file: bool,
+    isolate_config: bool,
+    cache_root: Optional[str],
+    cache_model: bool,
+) -> "MetricFlowClient":
+    """
+    Persists the MetricFlow configuration if requested and returns a MetricFlow client.
+    """
+
+    mf_config_file_path = None
+    with timed_phase("get_config_file_path"):
+        if config and isolate_config:
+            mf_config_file_path = get_isolated_config_file_path(
+                config=config, cache_root=cache_root
+            )
+        elif (config and write_config_file) or cache_model:
+            mf_config_file_path = get_config_file_path(
+                config_file_path=config_file_path
+            )
+
+    # Persisting the config is an opt-in side effect,
+    # the client is built straight from the provided config.
+    if config and (isolate_config or write_config_file):
+        with timed_phase("persist_config"):
+            persist_config(config=config, file_path=mf_config_file_path)
+
+    # An isolated config is read back from its dedicated file,
+    # never from a config file shared with other configurations.
+    if config and isolate_config:
+        config, config_file_path = None, mf_config_file_path
+
+    # The parsed model is cached next to the config file
+    model_cache_dir = None
+    if cache_model:
+        model_cache_dir = os.path.dirname(mf_config_file_path)
+
+    leases = _client_leases.get()
+    if leases is None:
+        return get_metricflow_client(
+            config=config,
+            config_file_path=config_file_path,
+            reuse_client=reuse_client,
+            model_cache_dir=model_cache_dir,
+        )
+
+    return leases.enter_context(
+        lease_metricflow_client(
+            config=config,
+            config_file_path=config_file_path,
+            reuse_client=reuse_client,
+            model_cache_dir=model_cache_dir,
+        )
+    )
+
+
+def _get_effective_config(
+    config: Optional[Union[Dict, str]], config_file_path: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Returns the MetricFlow configuration a client is built from.
+    """
+    if config:
+        return parse_config(config=config)
+    return read_config_file(get_config_file_path(config_file_path=config_file_path))
+
+
+def _get_catalog(
+    config: Optional[Union[Dict, str]],
+    config_file_path: Optional[str],
+    reuse_client: bool,
+    write_config_file: bool,
+    isolate_config: bool,
+    cache_root: Optional[str],
+    cache_model: bool,
+) -> Catalog:
+    """
+    Returns the cached catalog of the metrics and dimensions of the MetricFlow model.
+    """
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    return get_catalog(mfc, compute_client_fingerprint(mf_config), get_catalog_cache())
 
 
 @task
+@_holds_clients
+@reports_phases("materialize")
 def materialize(
     materialization_name: str,
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
     config: Optional[Union[Dict, str]] = None,
     config_file_path: Optional[str] = None,
-) -> SqlTable:
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    partition_grain: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+    incremental: bool = False,
+    lookback: Optional[timedelta] = None,
+    watermark_store: Optional[WatermarkStore] = None,
+    time_column: str = DEFAULT_TIME_COLUMN,
+    single_flight: bool = False,
+    lock_across_processes: bool = False,
+    register: bool = False,
+    timing_artifact: bool = False,
+) -> "SqlTable":
     """
     Materialize metrics on the target DWH.
 
+    The time spent in each phase of the run, from resolving the config file path
+    to MetricFlow planning and warehouse execution, is logged as a structured
+    record with the `phase_durations` and `total_duration` attributes.
+
     Args:
         materialization_name: The name of the materialization to be created.
         start_time: The start time range to be used to build the materialization.
         end_time: The end time range to be used to build the materialization.
         config: MetricFlow configuration. Can be either a `dict` or a YAML string.
-            If provided, will be persisted at the path specified in `config_file_path`.
-        config_file_path: Path to MetricFlow config file.
-            If not provided, the default path will be used.
+            If provided, the MetricFlow client is built straight from it.
+        config_file_path: Path to MetricFlow config file, read if `config` is not
+            provided. If not provided, the default path will be used.
+        reuse_client: Whether to reuse a warm MetricFlow client built by a previous
+            task run with the same configuration and model files.
+        write_config_file: Whether to also persist `config`
+            at the path specified in `config_file_path`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            only accessible by the current user, instead of `config_file_path`,
+            and build the MetricFlow client from that file, so that tasks with
+            different configurations can run concurrently.
+        cache_root: Root directory of the isolated config directories.
+            If not provided, the `PREFECT_METRICFLOW_CACHE_DIR` environment variable
+            or a directory in the system temporary directory is used.
+        cache_model: Whether to cache the parsed MetricFlow model next to the
+            config file, so that it is only parsed again when a model file changes.
+        partition_grain: If provided, the time range is split into partitions of
+            this grain, one of `day`, `week` or `month`. Partitions are built
+            concurrently, then merged into the materialization table.
+            Both `start_time` and `end_time` are then required, and the
+            materialization must be grouped by `metric_time` at a granularity
+            nested in the grain, without cumulative metrics.
+        max_workers: Maximum number of partitions built at the same time.
+        incremental: Whether to only build the rows after the high-water mark of
+            the last successful build of the materialization with the same
+            configuration. The whole time range is built on the first run.
+            `end_time` defaults to the current UTC time, cannot be before the
+            watermark and becomes the new watermark.
+        lookback: How far before the watermark rows are rebuilt on incremental
+            runs, to pick up late-arriving data.
+        watermark_store: The store of the watermarks. If not provided, a SQLite
+            database in the cache root directory is used.
+        time_column: The time column of the materialization table, used to
+            replace the rebuilt rows on incremental runs.
+        single_flight: Whether identical builds running at the same time in this
+            process share a single execution and its result. A waiting build
+            then gets the table of the running one, even if it would have
+            seen newer data.
+        lock_across_processes: Whether identical builds running at the same time
+            in other processes of the host wait for each other, using a lock file
+            in the cache root directory. A waiting build then gets the table of
+            the build that finished while it waited instead of building it again.
+            Requires `single_flight`.
+        register: Whether to record the table and time range of the built
+            materialization in a SQLite database in the cache root directory,
+            so that `query` can read covered queries from its table.
+        timing_artifact: Whether to also report the time spent in each phase
+            of the run as a Prefect table artifact.
 
     Raises:
-        `MetricFlowFailureException` if `config` is not a valid YAML string.
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if the partitioned time range is not valid or if a partition fails to build.
 
     Returns:
         a SqlTable with references to the newly created materialization.
     """
 
-    mf_config_file_path = get_config_file_path(config_file_path=config_file_path)
+    if partition_grain and not incremental and not (start_time and end_time):
+        msg = "Both start_time and end_time are required to partition a materialization"
+        raise MetricFlowFailureException(msg)
 
-    # If a config is provided, try to use it.
-    if config:
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
 
-        persist_config(config=config, file_path=mf_config_file_path)
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    fingerprint = compute_client_fingerprint(mf_config)
+    if incremental and watermark_store is None:
+        watermark_store = SQLiteWatermarkStore(
+            get_watermarks_db_path(cache_root=cache_root)
+        )
+    watermark_key = get_watermark_key(materialization_name, mf_config)
 
-    # Create MetricFlow client
-    mfc = MetricFlowClient.from_config(config_file_path=mf_config_file_path)
+    def build() -> "SqlTable":
+        """
+        Builds the table, then records the build if `register` is set.
+        """
+        table = build_table()
+        if register:
+            registry = SQLiteMaterializationRegistry(
+                get_materializations_db_path(cache_root=cache_root)
+            )
+            built_start_time, built_end_time = start_time, end_time
+            if incremental:
+                # Incremental builds extend the time range of the previous build
+                previous_build = registry.get(fingerprint, materialization_name)
+                if previous_build is not None:
+                    built_start_time = previous_build["start_time"]
+                built_end_time = watermark_store.get(watermark_key)
+            registry.record(
+                fingerprint,
+                get_materialization(mfc, materialization_name),
+                table,
+                start_time=built_start_time,
+                end_time=built_end_time,
+            )
+        return table
 
-    # Build materialization and return result
-    return mfc.materialize(
+    def build_table() -> "SqlTable":
+        """
+        Builds the materialization table.
+        """
+        if incremental:
+            return materialize_incremental(
+                client=mfc,
+                materialization_name=materialization_name,
+                watermark_store=watermark_store,
+                watermark_key=watermark_key,
+                start_time=start_time,
+                end_time=end_time,
+                lookback=lookback,
+                time_column=time_column,
+                partition_grain=partition_grain,
+                max_workers=max_workers,
+            )
+
+        if partition_grain:
+            return materialize_partitioned(
+                client=mfc,
+                materialization_name=materialization_name,
+                start_time=start_time,
+                end_time=end_time,
+                partition_grain=partition_grain,
+                max_workers=max_workers,
+            )
+
+        # Build materialization and return result
+        with timed_phase("sql_planning"):
+            return mfc.materialize(
+                materialization_name=materialization_name,
+                start_time=start_time,
+                end_time=end_time,
+            )
+
+    if not single_flight:
+        return build()
+
+    # Identical concurrent builds share a single execution
+    key = get_call_key(
+        call="materialize",
+        fingerprint=fingerprint,
         materialization_name=materialization_name,
         start_time=start_time,
         end_time=end_time,
+        partition_grain=partition_grain,
+        incremental=incremental,
+        lookback=lookback,
+        time_column=time_column,
+        register=register,
+    )
+    if not lock_across_processes:
+        return get_single_flight().do(key, build)
+    return get_single_flight().do(
+        key,
+        build,
+        lock_dir=get_locks_dir(cache_root=cache_root),
+        shared_results=DiskQueryResultCache(
+            get_shared_results_dir(cache_root=cache_root)
+        ),
     )
 
 
 @task
+@_holds_clients
+@reports_phases("drop_materialization")
 def drop_materialization(
     materialization_name: str,
     config: Optional[Union[Dict, str]] = None,
     config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    timing_artifact: bool = False,
 ) -> bool:
     """
     Drop a materialization that was previously created by MetricFlow.
 
+    The time spent in each phase of the run is logged, see `materialize`.
+
     Args:
         materialization_name: The name of the materialization to drop.
         config: MetricFlow configuration. Can be either a `dict` or a YAML string.
-            If provided, will be persisted at the path specified in `config_file_path`.
-        config_file_path: Path to MetricFlow config file.
-            If not provided, the default path will be used.
+            If provided, the MetricFlow client is built straight from it.
+        config_file_path: Path to MetricFlow config file, read if `config` is not
+            provided. If not provided, the default path will be used.
+        reuse_client: Whether to reuse a warm MetricFlow client built by a previous
+            task run with the same configuration and model files.
+        write_config_file: Whether to also persist `config`
+            at the path specified in `config_file_path`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            only accessible by the current user, instead of `config_file_path`,
+            and build the MetricFlow client from that file, so that tasks with
+            different configurations can run concurrently.
+        cache_root: Root directory of the isolated config directories.
+            If not provided, the `PREFECT_METRICFLOW_CACHE_DIR` environment variable
+            or a directory in the system temporary directory is used.
+        cache_model: Whether to cache the parsed MetricFlow model next to the
+            config file, so that it is only parsed again when a model file changes.
+        timing_artifact: Whether to also report the time spent in each phase
+            of the run as a Prefect table artifact.
 
     Returns:
         `True` if MetricFlow has successfully dropped the materialization table,
         `False` if the materialization table does not exist.
     """
 
-    mf_config_file_path = get_config_file_path(config_file_path=config_file_path)
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
 
-    # If a config is provided, try to use it.
-    if config:
+    # Build materialization and return result
+    with timed_phase("sql_planning"):
+        return mfc.drop_materialization(materialization_name=materialization_name)
+
+
+@task
+@_holds_clients
+def drop_materializations(
+    materialization_names: List[str],
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    max_parallelism: int = 1,
+) -> Dict[str, "SqlTable"]:
+    """
+    Drop several materializations that were previously created by MetricFlow,
+    with a single MetricFlow client and warehouse connection pool.
+    Tables that do not exist are skipped.
+
+    Args:
+        materialization_names: The names of the materializations to drop.
+        config: MetricFlow configuration, see `drop_materialization`.
+        config_file_path: Path to MetricFlow config file, see `drop_materialization`.
+        reuse_client: Whether to reuse a warm MetricFlow client,
+            see `drop_materialization`.
+        write_config_file: Whether to also persist `config`,
+            see `drop_materialization`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `drop_materialization`.
+        cache_root: Root directory of the isolated config directories,
+            see `drop_materialization`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `drop_materialization`.
+        max_parallelism: Maximum number of tables dropped at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        or if a materialization is not defined, in which case nothing is dropped.
 
-        persist_config(config=config, file_path=mf_config_file_path)
+    Returns:
+        A `dict` mapping each materialization name to a SqlTable with references
+        to the materialization table, which no longer exists.
+    """
 
     # Create MetricFlow client
-    mfc = MetricFlowClient.from_config(config_file_path=mf_config_file_path)
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
 
-    # Build materialization and return result
-    return mfc.drop_materialization(materialization_name=materialization_name)
+    return drop_materialization_tables(
+        client=mfc,
+        materialization_names=materialization_names,
+        max_parallelism=max_parallelism,
+    )
+
+
+@task
+async def materialize_async(
+    materialization_name: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    partition_grain: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+    incremental: bool = False,
+    lookback: Optional[timedelta] = None,
+    watermark_store: Optional[WatermarkStore] = None,
+    time_column: str = DEFAULT_TIME_COLUMN,
+    single_flight: bool = False,
+    lock_across_processes: bool = False,
+    register: bool = False,
+    timing_artifact: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> "SqlTable":
+    """
+    Materialize metrics on the target DWH without blocking the event loop.
+
+    The blocking MetricFlow calls run in a worker thread. At most `max_concurrency`
+    calls sharing the same limit run at the same time, the others wait for a
+    free slot without holding a thread.
+
+    Args:
+        materialization_name: The name of the materialization to be created.
+        start_time: The start time range to be used to build the materialization.
+        end_time: The end time range to be used to build the materialization.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        partition_grain: The grain of the partitions the time range is split into,
+            see `materialize`.
+        max_workers: Maximum number of partitions built at the same time.
+        incremental: Whether to only build the rows after the high-water mark,
+            see `materialize`.
+        lookback: How far before the watermark rows are rebuilt,
+            see `materialize`.
+        watermark_store: The store of the watermarks, see `materialize`.
+        time_column: The time column of the materialization table,
+            see `materialize`.
+        single_flight: Whether identical builds running at the same time
+            share a single execution, see `materialize`.
+        lock_across_processes: Whether identical builds of other processes
+            wait for each other and share the table, see `materialize`.
+        register: Whether to record the built materialization, see `materialize`.
+        timing_artifact: Whether to also report the time spent in each phase
+            as a Prefect table artifact, see `materialize`.
+        max_concurrency: Maximum number of MetricFlow calls running at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        a SqlTable with references to the newly created materialization.
+    """
+    return await run_sync_in_thread(
+        materialize.fn,
+        materialization_name=materialization_name,
+        start_time=start_time,
+        end_time=end_time,
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+        partition_grain=partition_grain,
+        max_workers=max_workers,
+        incremental=incremental,
+        lookback=lookback,
+        watermark_store=watermark_store,
+        time_column=time_column,
+        single_flight=single_flight,
+        lock_across_processes=lock_across_processes,
+        register=register,
+        timing_artifact=timing_artifact,
+        max_concurrency=max_concurrency,
+    )
+
+
+@task
+async def drop_materialization_async(
+    materialization_name: str,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    timing_artifact: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> bool:
+    """
+    Drop a materialization that was previously created by MetricFlow
+    without blocking the event loop.
+
+    The blocking MetricFlow calls run in a worker thread. At most `max_concurrency`
+    calls sharing the same limit run at the same time, the others wait for a
+    free slot without holding a thread.
+
+    Args:
+        materialization_name: The name of the materialization to drop.
+        config: MetricFlow configuration, see `drop_materialization`.
+        config_file_path: Path to MetricFlow config file, see `drop_materialization`.
+        reuse_client: Whether to reuse a warm MetricFlow client,
+            see `drop_materialization`.
+        write_config_file: Whether to also persist `config`,
+            see `drop_materialization`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `drop_materialization`.
+        cache_root: Root directory of the isolated config directories,
+            see `drop_materialization`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `drop_materialization`.
+        timing_artifact: Whether to also report the time spent in each phase
+            as a Prefect table artifact, see `drop_materialization`.
+        max_concurrency: Maximum number of MetricFlow calls running at the same time.
+
+    Returns:
+        `True` if MetricFlow has successfully dropped the materialization table,
+        `False` if the materialization table does not exist.
+    """
+    return await run_sync_in_thread(
+        drop_materialization.fn,
+        materialization_name=materialization_name,
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+        timing_artifact=timing_artifact,
+        max_concurrency=max_concurrency,
+    )
+
+
+@task
+@_holds_clients
+def materialize_many(
+    materializations: List[Union[str, Dict[str, Any]]],
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+    group_by_inputs: bool = False,
+) -> List[Union["SqlTable", Exception]]:
+    """
+    Materialize several materializations on the target DWH in a single task run,
+    concurrently and with a single MetricFlow client.
+
+    Args:
+        materializations: The materializations to be created. Each one is either
+            a materialization name, or a `dict` with the `materialization_name`
+            and optionally the `start_time` and `end_time` to be used to build it.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        max_parallelism: Maximum number of materializations built at the same time.
+        group_by_inputs: Whether to never build two materializations reading the
+            same measures or data sources at the same time, and to build them
+            back-to-back in a single worker while the warehouse caches are hot.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        or if a materialization request is not valid.
+
+    Returns:
+        For each materialization, in order, either a SqlTable with references
+        to the newly created materialization or the exception raised
+        while building it.
+    """
+    requests = [normalize_materialization_request(m) for m in materializations]
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    if group_by_inputs:
+        return materialize_grouped(
+            client=mfc, requests=requests, max_parallelism=max_parallelism
+        )
+
+    return materialize_concurrently(
+        client=mfc, requests=requests, max_parallelism=max_parallelism
+    )
+
+
+@task
+@_holds_clients
+def backfill(
+    materialization_name: str,
+    start_time: str,
+    end_time: str,
+    partition_grain: str = "day",
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    max_workers: int = DEFAULT_MAX_PARALLELISM,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay_seconds: float = DEFAULT_RETRY_DELAY_SECONDS,
+    checkpoint_path: Optional[str] = None,
+) -> "SqlTable":
+    """
+    Backfill a materialization on the target DWH, resuming from the partitions
+    that finished in a previous run of the same backfill.
+
+    Concurrent runs of the same backfill, in this process or in other processes
+    of the host, wait for each other, see `run_backfill`.
+
+    Args:
+        materialization_name: The name of the materialization to be backfilled.
+        start_time: The start of the backfilled time range.
+        end_time: The end of the backfilled time range.
+        partition_grain: The grain of the partitions the time range is split into,
+            one of `day`, `week` or `month`.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories and of the
+            default checkpoints database, see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        max_workers: Maximum number of partitions built at the same time.
+        max_retries: Number of times a failing partition is retried
+            before the backfill fails.
+        retry_delay_seconds: Delay between two attempts to build a partition.
+        checkpoint_path: Path of the SQLite database recording the partitions
+            that finished. If not provided, a database in the cache root
+            directory is used.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if the time range is not valid or if a partition still fails
+        after `max_retries` retries.
+
+    Returns:
+        a SqlTable with references to the backfilled materialization.
+    """
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    checkpoint_key = get_backfill_key(
+        materialization_name, mf_config, start_time, end_time, partition_grain
+    )
+
+    def build() -> "SqlTable":
+        """
+        Runs the backfill.
+        """
+        return run_backfill(
+            client=mfc,
+            materialization_name=materialization_name,
+            start_time=start_time,
+            end_time=end_time,
+            partition_grain=partition_grain,
+            checkpoint=SQLiteBackfillCheckpoint(
+                checkpoint_path or get_backfills_db_path(cache_root=cache_root)
+            ),
+            checkpoint_key=checkpoint_key,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            retry_delay_seconds=retry_delay_seconds,
+        )
+
+    # Runs of the same backfill share its partition tables, so they never overlap
+    return get_single_flight().do(
+        get_call_key(task="backfill", checkpoint_key=checkpoint_key),
+        build,
+        lock_dir=get_locks_dir(cache_root=cache_root),
+    )
+
+
+@task
+@_holds_clients
+def query(
+    metrics: List[str],
+    dimensions: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    where: Optional[str] = None,
+    order: Optional[List[str]] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    cache_ttl: float = DEFAULT_QUERY_CACHE_TTL,
+    disk_cache_ttl: Optional[float] = None,
+    result_format: str = "pandas",
+    output_path: Optional[str] = None,
+    coalesce_window: Optional[float] = None,
+    single_flight: bool = False,
+    lock_across_processes: bool = False,
+    subsume_time_ranges: bool = False,
+    use_materializations: bool = False,
+    max_materialization_age: Optional[timedelta] = None,
+    cache_plans: bool = False,
+) -> Union["DataFrame", "Table", str]:
+    """
+    Query metrics on the target DWH.
+
+    Results are cached in memory and optionally on disk, keyed by the
+    normalized query and a fingerprint of the configuration and model files,
+    so that identical queries issued within the TTL skip the data warehouse.
+
+    Args:
+        metrics: The names of the metrics to query.
+        dimensions: The names of the dimensions to group the metrics by.
+        limit: The maximum number of rows to return.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        where: A SQL filter on the dimensions.
+        order: The metrics or dimensions to order by, prefixed with `-`
+            to sort in descending order.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories and of the
+            on-disk query result cache, see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        cache_ttl: Number of seconds a result is served from memory,
+            `0` disables the in-memory cache.
+        disk_cache_ttl: Number of seconds a result is served from the on-disk
+            cache, shared by the processes of a host. If not provided,
+            results are not cached on disk.
+        result_format: The format of the returned result, either `pandas` for a
+            pandas DataFrame or `arrow` for an Apache Arrow table.
+            The `arrow` format requires pyarrow.
+        output_path: If provided, the result is written to this file instead of
+            being returned, so that downstream tasks can memory-map it.
+            Files ending with `.arrow`, `.feather` or `.ipc` are written in the
+            Arrow IPC format, others in Parquet. Requires pyarrow.
+        coalesce_window: If provided, the query waits up to this number of
+            seconds for concurrent queries with the same dimensions, time range,
+            filter and order, and metrics read from the same data source, and runs
+            as a single query over the union of their metrics, see `query_many`.
+        single_flight: Whether identical queries running at the same time in this
+            process share a single execution and its result. A waiting query
+            then gets the result of the running one, even if it would have
+            seen newer data.
+        lock_across_processes: Whether identical queries running at the same time
+            in other processes of the host wait for each other, using a lock file
+            in the cache root directory. A waiting query then gets the result of
+            the query that finished while it waited instead of running it again.
+            Requires `single_flight`.
+        subsume_time_ranges: Whether the query is answered from the in-memory
+            result of the same query over an overlapping time range, only
+            querying the missing edges of the time range. Only applies to
+            queries without a `limit`, grouped by `metric_time` with an explicit
+            `day`, `week` or `month` granularity, and whose `start_time`,
+            if any, is aligned on that granularity. Requires `cache_ttl`.
+            The cached rows may be older than the rows of the edges.
+        use_materializations: Whether the query reads from the table of a
+            materialization built with `register` when it covers the query,
+            instead of computing it from the data sources. A materialization
+            covers a query when it has its metrics, exactly its dimensions and
+            a time range including its time range. Queries with a `where`
+            filter are always computed from the data sources.
+        max_materialization_age: Maximum age of the materializations read by
+            `use_materializations`. If not provided, materializations of any age
+            are read.
+        cache_plans: Whether the SQL MetricFlow renders for the query is cached
+            in memory, keyed by the normalized query and a fingerprint of the
+            configuration and model files, so that running the query again
+            skips its planning. Queries on cumulative metrics, and queries
+            merged by `coalesce_window`, are always planned by MetricFlow.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if a timestamp is not valid or if pyarrow is required but not installed.
+
+    Returns:
+        the result of the query in `result_format`,
+        or `output_path` if the result has been written to a file.
+    """
+    validate_result_format("arrow" if output_path else result_format)
+    spec = normalize_query_spec(
+        metrics=metrics,
+        dimensions=dimensions,
+        limit=limit,
+        start_time=start_time,
+        end_time=end_time,
+        where=where,
+        order=order,
+    )
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    def run_coalesced(spec: Dict[str, Any]) -> "DataFrame":
+        """
+        Runs the query merged with the concurrent compatible queries.
+        """
+        coalescer = get_query_coalescer(mfc)
+        return coalescer.submit(mfc, spec, window=coalesce_window).result()
+
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    disk_cache = None
+    if disk_cache_ttl:
+        disk_cache = DiskQueryResultCache(get_query_results_dir(cache_root=cache_root))
+
+    fingerprint = compute_client_fingerprint(mf_config)
+    key = get_query_key(spec, fingerprint)
+
+    def run_warehouse(spec: Dict[str, Any]) -> "DataFrame":
+        """
+        Runs the query on a covering materialization table, or MetricFlow.
+        """
+        if use_materializations:
+            registry = SQLiteMaterializationRegistry(
+                get_materializations_db_path(cache_root=cache_root)
+            )
+            result = run_routed_query(
+                mfc,
+                spec,
+                registry.list(fingerprint),
+                max_age=max_materialization_age,
+            )
+            if result is not None:
+                return result
+        if coalesce_window:
+            return run_coalesced(spec)
+        if cache_plans and not has_cumulative_metric(mfc, spec):
+            return run_planned_query(
+                mfc, spec, get_query_key(spec, fingerprint), get_plan_cache()
+            )
+        return run_query(mfc, spec)
+
+    def run_subsumed(spec: Dict[str, Any]) -> "DataFrame":
+        """
+        Runs the query from the cached result of a wider time range.
+        """
+        return run_subsumed_query(
+            spec=spec,
+            range_key=get_range_key(spec, fingerprint),
+            range_cache=get_range_cache(),
+            ttl=cache_ttl,
+            run=run_warehouse,
+        )
+
+    def run() -> "DataFrame":
+        """
+        Runs the query through the in-memory and on-disk result caches.
+        """
+        return run_cached_query(
+            client=mfc,
+            spec=spec,
+            key=key,
+            ttl=cache_ttl,
+            disk_cache=disk_cache,
+            disk_ttl=disk_cache_ttl,
+            run=run_subsumed
+            if subsume_time_ranges and cache_ttl > 0 and is_subsumable(spec)
+            else run_warehouse,
+        )
+
+    if single_flight:
+        # Identical concurrent queries share a single execution
+        if lock_across_processes:
+            result = get_single_flight().do(
+                key,
+                run,
+                lock_dir=get_locks_dir(cache_root=cache_root),
+                shared_results=DiskQueryResultCache(
+                    get_shared_results_dir(cache_root=cache_root)
+                ),
+            )
+        else:
+            result = get_single_flight().do(key, run)
+    else:
+        result = run()
+
+    if output_path:
+        write_batches([result], output_path)
+        return output_path
+    if result_format == "arrow":
+        return to_arrow_table(result)
+    return result
+
+
+@task
+@_holds_clients
+def explain(
+    metrics: Optional[List[str]] = None,
+    dimensions: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    where: Optional[str] = None,
+    order: Optional[List[str]] = None,
+    materialization_name: Optional[str] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    cache_plans: bool = False,
+) -> str:
+    """
+    Returns the SQL MetricFlow generates for a query or a materialization,
+    without running it.
+
+    Args:
+        metrics: The names of the metrics to query, see `query`.
+        dimensions: The names of the dimensions to group the metrics by,
+            see `query`.
+        limit: The maximum number of rows to return, see `query`.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        where: A SQL filter on the dimensions, see `query`.
+        order: The metrics or dimensions to order by, see `query`.
+        materialization_name: The name of a materialization to explain instead of
+            `metrics`. Its SQL is the `CREATE TABLE ... AS` statement MetricFlow
+            runs to build the materialization over the time range; `dimensions`,
+            `limit`, `where`, `order` and `cache_plans` do not apply.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        cache_plans: Whether to read and store the SQL in the in-memory plan
+            cache shared with `query`, see `query`.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if a timestamp is not valid, if neither or both of `metrics` and
+        `materialization_name` are provided, or if the materialization
+        is not defined.
+
+    Returns:
+        The SQL of the query.
+    """
+    if bool(metrics) == bool(materialization_name):
+        msg = "Exactly one of metrics and materialization_name is required"
+        raise MetricFlowFailureException(msg)
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    if materialization_name:
+        return get_materialization_sql(
+            mfc,
+            get_materialization(mfc, materialization_name),
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+    spec = normalize_query_spec(
+        metrics=metrics,
+        dimensions=dimensions,
+        limit=limit,
+        start_time=start_time,
+        end_time=end_time,
+        where=where,
+        order=order,
+    )
+
+    if not cache_plans or has_cumulative_metric(mfc, spec):
+        return get_query_sql(mfc, spec).sql_query
+
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    key = get_query_key(spec, compute_client_fingerprint(mf_config))
+    return get_query_plan(mfc, spec, key, get_plan_cache()).sql_query
+
+
+@task
+@_holds_clients
+def query_many(
+    queries: List[Dict[str, Any]],
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> List[Union["DataFrame", Exception]]:
+    """
+    Query metrics on the target DWH for several queries in a single task run,
+    merging the queries that only differ by their metrics, all read from the same
+    data source, into a single query over the union of their metrics. If a merged
+    query fails, its queries run on their own.
+
+    Args:
+        queries: The queries, as `dict`s with the `metrics` and optionally the
+            `dimensions`, `limit`, `start_time`, `end_time`, `where` and `order`
+            parameters of `query`. Queries with a `limit`, ordered by a metric,
+            or with metrics that are cumulative, derived, constrained or read
+            several data sources, are never merged.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        max_parallelism: Maximum number of merged queries run at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        or if a timestamp is not valid.
+
+    Returns:
+        For each query, in order, either a pandas DataFrame with its result
+        or the exception raised while running it.
+    """
+    specs = [normalize_query_spec(**q) for q in queries]
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    return query_coalesced(client=mfc, specs=specs, max_parallelism=max_parallelism)
+
+
+@task
+@_holds_clients
+def export_materialization(
+    materialization_name: str,
+    output_path: str,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> str:
+    """
+    Export the table of a materialization to a Parquet or Arrow IPC file,
+    streaming it from the target DWH in batches. Requires pyarrow.
+
+    Args:
+        materialization_name: The name of the materialization to export.
+        output_path: Path of the file. Files ending with `.arrow`, `.feather`
+            or `.ipc` are written in the Arrow IPC format, others in Parquet.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        batch_size: Maximum number of rows fetched from the DWH at once.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string,
+        if the materialization is not defined, if pyarrow is not installed
+        or if the SQL client does not support streaming.
+
+    Returns:
+        `output_path`.
+    """
+    validate_result_format("arrow")
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    table = get_materialization_table(
+        mfc, get_materialization(mfc, materialization_name)
+    )
+    write_batches(
+        iter_sql_batches(mfc, f"SELECT * FROM {table.sql}", batch_size=batch_size),
+        output_path,
+    )
+    return output_path
+
+
+@task
+@_holds_clients
+def list_metrics(
+    prefix: Optional[str] = None,
+    dimension: Optional[str] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+) -> List[str]:
+    """
+    List the metrics of the MetricFlow model.
+
+    The metrics and their dimensions are listed once per configuration and model
+    files, then looked up in an in-memory index.
+
+    Args:
+        prefix: If provided, only the metrics whose name starts with it.
+        dimension: If provided, only the metrics with this dimension.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        The names of the metrics, in ascending order.
+    """
+    catalog = _get_catalog(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+    return catalog.list_metrics(prefix=prefix, dimension=dimension)
+
+
+@task
+@_holds_clients
+def list_dimensions(
+    metrics: Optional[List[str]] = None,
+    prefix: Optional[str] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+) -> List[str]:
+    """
+    List the dimensions of the MetricFlow model, see `list_metrics`.
+
+    Args:
+        metrics: If provided, only the dimensions shared by all these metrics,
+            which they can be queried by together.
+        prefix: If provided, only the dimensions whose name starts with it.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        The names of the dimensions, in ascending order.
+    """
+    catalog = _get_catalog(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+    return catalog.list_dimensions(metrics=metrics, prefix=prefix)
+
+
+@task
+@_holds_clients
+def get_dimension_values(
+    metric_name: str,
+    dimension_name: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    cache_ttl: float = DEFAULT_QUERY_CACHE_TTL,
+) -> List[str]:
+    """
+    Get the distinct values of a dimension of a metric from the target DWH.
+
+    Args:
+        metric_name: The name of the metric.
+        dimension_name: The name of the dimension.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        cache_ttl: Number of seconds the values are served from memory,
+            `0` disables the in-memory cache.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        The values of the dimension.
+    """
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    key = get_dimension_values_key(
+        compute_client_fingerprint(mf_config),
+        metric_name,
+        dimension_name,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    return fetch_dimension_values(
+        client=mfc,
+        metric_name=metric_name,
+        dimension_name=dimension_name,
+        start_time=start_time,
+        end_time=end_time,
+        key=key,
+        ttl=cache_ttl,
+        dimension_values_cache=get_dimension_values_cache(),
+    )
+
+
+@task
+@_holds_clients
+def get_dimension_values_batch(
+    metric_name: str,
+    dimension_names: List[str],
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    max_values: Optional[Union[int, Dict[str, int]]] = None,
+    config: Optional[Union[Dict, str]] = None,
+    config_file_path: Optional[str] = None,
+    reuse_client: bool = True,
+    write_config_file: bool = False,
+    isolate_config: bool = False,
+    cache_root: Optional[str] = None,
+    cache_model: bool = False,
+    cache_ttl: float = DEFAULT_QUERY_CACHE_TTL,
+    max_dimensions_per_query: int = DEFAULT_MAX_DIMENSIONS_PER_QUERY,
+    max_parallelism: int = DEFAULT_MAX_PARALLELISM,
+) -> Dict[str, List[str]]:
+    """
+    Get the distinct values of several dimensions of a metric from the target DWH,
+    fetching many dimensions with a single query. As in `get_dimension_values`,
+    the values are strings without nulls.
+
+    Args:
+        metric_name: The name of the metric.
+        dimension_names: The names of the dimensions.
+        start_time: The start of the time range, as an ISO 8601 timestamp.
+        end_time: The end of the time range, as an ISO 8601 timestamp.
+        max_values: The maximum number of values of every dimension, or of some
+            dimensions as a `dict` keyed by dimension name. Capped dimensions
+            return their lowest values.
+        config: MetricFlow configuration, see `materialize`.
+        config_file_path: Path to MetricFlow config file, see `materialize`.
+        reuse_client: Whether to reuse a warm MetricFlow client, see `materialize`.
+        write_config_file: Whether to also persist `config`, see `materialize`.
+        isolate_config: Whether to persist `config` in a directory dedicated to it,
+            see `materialize`.
+        cache_root: Root directory of the isolated config directories,
+            see `materialize`.
+        cache_model: Whether to cache the parsed MetricFlow model,
+            see `materialize`.
+        cache_ttl: Number of seconds the values of each dimension are served
+            from memory, `0` disables the in-memory cache. The cache is shared
+            with `get_dimension_values`.
+        max_dimensions_per_query: Maximum number of dimensions fetched by
+            a single query.
+        max_parallelism: Maximum number of queries run at the same time.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        A `dict` mapping each dimension name to its values.
+    """
+
+    # Create MetricFlow client
+    mfc = _get_client(
+        config=config,
+        config_file_path=config_file_path,
+        reuse_client=reuse_client,
+        write_config_file=write_config_file,
+        isolate_config=isolate_config,
+        cache_root=cache_root,
+        cache_model=cache_model,
+    )
+
+    mf_config = _get_effective_config(config=config, config_file_path=config_file_path)
+    fingerprint = compute_client_fingerprint(mf_config)
+    cache = get_dimension_values_cache()
+
+    def get_max_values(dimension_name: str) -> Optional[int]:
+        """
+        Returns the maximum number of values of a dimension, matching its name
+        as `fetch_dimension_values_batch` does.
+        """
+        if isinstance(max_values, dict):
+            caps = {name.strip().lower(): cap for name, cap in max_values.items()}
+            return caps.get(dimension_name.strip().lower())
+        return max_values
+
+    keys = {
+        name: get_dimension_values_key(
+            fingerprint,
+            metric_name,
+            name,
+            start_time=start_time,
+            end_time=end_time,
+            max_values=get_max_values(name),
+        )
+        for name in dimension_names
+    }
+
+    values = {}
+    if cache_ttl > 0:
+        for name, key in keys.items():
+            cached_values = cache.get(key, ttl=cache_ttl)
+            if cached_values is not None:
+                values[name] = cached_values
+
+    missing_names = [name for name in dimension_names if name not in values]
+    if missing_names:
+        fetched_values = fetch_dimension_values_batch(
+            client=mfc,
+            metric_name=metric_name,
+            dimension_names=missing_names,
+            start_time=start_time,
+            end_time=end_time,
+            max_values=max_values,
+            max_dimensions_per_query=max_dimensions_per_query,
+            max_parallelism=max_parallelism,
+        )
+        for name, dimension_values in fetched_values.items():
+            values[name] = dimension_values
+            if cache_ttl > 0:
+                cache.set(keys[name], dimension_values)
+
+    return {name: values[name] for name in dimension_names}
@@ -0,0 +1,278 @@
+"""
+Utils to time the phases of MetricFlow task runs
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+SQL_CLIENT_METHODS = (
+    "query",
+    "execute",
+    "dry_run",
+    "create_table_as_select",
+    "create_table_from_dataframe",
+    "drop_table",
+    "table_exists",
+    "list_tables",
+    "create_schema",
+    "drop_schema",
+)
+WAREHOUSE_EXECUTION_PHASE = "warehouse_execution"
+
+_active_timer: contextvars.ContextVar[Optional["PhaseTimer"]] = contextvars.ContextVar(
+    "prefect_metricflow_phase_timer", default=None
+)
+
+
+class PhaseTimer:
+    """
+    Thread-safe accumulator of the time spent in the phases of a task run.
+
+    Phases can be nested: the time of a phase excludes the time of the phases
+    nested in it, so that MetricFlow planning excludes warehouse execution.
+    Phases running in several threads are summed.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def durations(self) -> Dict[str, float]:
+        """
+        The number of seconds spent in each phase, in the order phases started.
+        """
+        with self._lock:
+            return dict(self._durations)
+
+    @property
+    def total(self) -> float:
+        """
+        The number of seconds since the timer was created.
+        """
+        return time.perf_counter() - self.started_at
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times a phase.
+
+        Args:
+            name: The name of the phase.
+        """
+        stack: Optional[List[List[float]]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Each frame holds the start of the phase and the time of its children
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            if stack:
+                stack[-1][1] += elapsed
+            with self._lock:
+                self._durations[name] = (
+                    self._durations.get(name, 0.0) + elapsed - frame[1]
+                )
+
+    @contextmanager
+    def activate(self) -> Iterator["PhaseTimer"]:
+        """
+        Makes the timer record the phases timed by `timed_phase`
+        in the current context.
+        """
+        token = _active_timer.set(self)
+        try:
+            yield self
+        finally:
+            _active_timer.reset(token)
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """
+    Times a phase with the active timer, if any.
+
+    Args:
+        name: The name of the phase.
+    """
+    timer = _active_timer.get()
+    if timer is None:
+        yield
+        return
+
+    with timer.phase(name):
+        yield
+
+
+def run_in_current_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Returns a function running `fn` in a copy of the current context,
+    so that phases timed in worker threads are recorded by the active timer.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        """
+        Runs `fn` in a fresh copy of the captured context.
+        """
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def instrument_sql_client(sql_client: Any) -> Any:
+    """
+    Times the calls of a MetricFlow SQL client reaching the data warehouse
+    as the `warehouse_execution` phase of the active timer, if any.
+
+    Args:
+        sql_client: The MetricFlow SQL client, instrumented in place.
+
+    Returns:
+        The SQL client.
+    """
+
+    def instrument(method: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Returns a method timing the calls of `method`.
+        """
+
+        @functools.wraps(method)
+        def timed_method(*args: Any, **kwargs: Any) -> Any:
+            """
+            Calls the method in the `warehouse_execution` phase.
+            """
+            with timed_phase(WAREHOUSE_EXECUTION_PHASE):
+                return method(*args, **kwargs)
+
+        return timed_method
+
+    for name in SQL_CLIENT_METHODS:
+        method = getattr(sql_client, name, None)
+        if callable(method):
+            setattr(sql_client, name, instrument(method))
+    return sql_client
+
+
+def get_logger() -> Any:
+    """
+    Returns the logger of the current Prefect run, or the logger
+    of prefect-metricflow outside of a run.
+    """
+    from prefect import get_run_logger
+    from prefect.exceptions import MissingContextError
+
+    try:
+        return get_run_logger()
+    except MissingContextError:
+        return logging.getLogger("prefect_metricflow")
+
+
+def report_phase_durations(
+    task_name: str, timer: PhaseTimer, create_artifact: bool = False
+) -> None:
+    """
+    Logs the time spent in each phase of a task run as a structured record,
+    with the `task_name`, `phase_durations` and `total_duration` attributes.
+
+    Args:
+        task_name: The name of the task.
+        timer: The timer of the run.
+        create_artifact: Whether to also create a Prefect table artifact
+            with the duration of each phase.
+    """
+    durations = timer.durations
+    total = timer.total
+    summary = ", ".join(
+        f"{phase}={seconds:.3f}s" for phase, seconds in durations.items()
+    )
+    get_logger().info(
+        "%s ran in %.3fs (%s)",
+        task_name,
+        total,
+        summary or "no timed phase",
+        extra={
+            "task_name": task_name,
+            "phase_durations": durations,
+            "total_duration": total,
+        },
+    )
+
+    if create_artifact:
+        from prefect.artifacts import create_table_artifact
+
+        rows = [
+            {"phase": phase, "seconds": round(seconds, 6)}
+            for phase, seconds in durations.items()
+        ]
+        rows.append({"phase": "total", "seconds": round(total, 6)})
+        create_table_artifact(
+            table=rows,
+            key=f"{task_name.replace('_', '-')}-phase-durations",
+            description=f"Time spent in each phase of `{task_name}`",
+        )
+
+
+@contextmanager
+def report_phases(task_name: str, create_artifact: bool = False) -> Iterator[None]:
+    """
+    Times the phases of a task run, then reports them with
+    `report_phase_durations`, whether the run succeeds or fails.
+
+    Args:
+        task_name: The name of the task.
+        create_artifact: Whether to also create a Prefect table artifact.
+    """
+    timer = PhaseTimer()
+    try:
+        with timer.activate():
+            yield
+    finally:
+        report_phase_durations(task_name, timer, create_artifact=create_artifact)
+
+
+def reports_phases(
+    task_name: str, artifact_argument: str = "timing_artifact"
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorates a function so that each of its runs reports its phases,
+    see `report_phases`.
+
+    Args:
+        task_name: The name of the task.
+        artifact_argument: The name of the boolean argument of the function
+            telling whether to also create a Prefect table artifact.
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps `fn` so that its runs report their phases.
+        """
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def reporting_fn(*args: Any, **kwargs: Any) -> Any:
+            """
+            Runs the function in a new phase timer, then reports its phases.
+            """
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            create_artifact = bool(arguments.arguments.get(artifact_argument))
+            with report_phases(task_name, create_artifact=create_artifact):
+                return fn(*args, **kwargs)
+
+        return reporting_fn
+
+    return decorator
@@ -1,13 +1,21 @@
 """
 Utils to build a MetricFlow configuration file
 """
-from typing import Dict, Optional, Union
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import IO, Dict, List, Optional, Union
 
-from metricflow.configuration.config_handler import ConfigHandler
 from yaml import YAMLError, dump, safe_load
 
 from prefect_metricflow.exceptions import MetricFlowFailureException
 
+CACHE_ROOT_ENV_VAR = "PREFECT_METRICFLOW_CACHE_DIR"
+ISOLATED_CONFIG_DIR_NAME = "configs"
+ISOLATED_CONFIG_FILE_NAME = "config.yml"
+DEFAULT_MAX_ISOLATED_CONFIG_DIRS = 32
+
 
 def get_config_file_path(config_file_path: Optional[str] = None) -> str:
     """
@@ -20,30 +28,241 @@ def get_config_file_path(config_file_path: Optional[str] = None) -> str:
         The absolute path of the configuration file.
         The default path is returned if `config_file_path` is not provided.
     """
-    return config_file_path or ConfigHandler().file_path
+    if config_file_path:
+        return config_file_path
+
+    # MetricFlow is imported lazily as it pulls in its whole engine
+    from metricflow.configuration.config_handler import ConfigHandler
+
+    return ConfigHandler().file_path
 
 
-def persist_config(config: Union[Dict, str], file_path: str) -> None:
+def get_cache_root(cache_root: Optional[str] = None) -> str:
     """
-    Persist the MetricFlow configuration on the file system.
+    Returns the root directory used by prefect-metricflow to store cached files.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the cache root directory.
+        If `cache_root` is not provided, the `PREFECT_METRICFLOW_CACHE_DIR`
+        environment variable is used, falling back to a directory
+        in the system temporary directory.
+    """
+    return (
+        cache_root
+        or os.getenv(CACHE_ROOT_ENV_VAR)
+        or os.path.join(tempfile.gettempdir(), "prefect-metricflow")
+    )
+
+
+def make_private_dir(dir_path: str) -> str:
+    """
+    Creates a directory only accessible by the current user, if it does not
+    exist yet, and restricts its permissions if it does.
+
+    Args:
+        dir_path: The absolute path of the directory.
+
+    Raises:
+        `MetricFlowFailureException` if the directory is owned by another user.
+
+    Returns:
+        The absolute path of the directory.
+    """
+    os.makedirs(dir_path, mode=0o700, exist_ok=True)
+
+    # Ownership and permission bits are only meaningful on POSIX systems
+    if hasattr(os, "getuid"):
+        stat = os.stat(dir_path)
+        if stat.st_uid != os.getuid():
+            msg = f"Directory {dir_path} is owned by another user"
+            raise MetricFlowFailureException(msg)
+        if stat.st_mode & 0o077:
+            os.chmod(dir_path, 0o700)
+
+    return dir_path
+
+
+def is_private_file(file: IO) -> bool:
+    """
+    Returns whether an open file is owned by the current user and not writable
+    by other users, so that its content can be trusted, e.g. unpickled.
+
+    Args:
+        file: The open file.
+
+    Returns:
+        `True` if the file is private, always `True` on non-POSIX systems.
+    """
+    if not hasattr(os, "getuid"):
+        return True
+
+    stat = os.fstat(file.fileno())
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def get_isolated_config_file_path(
+    config: Union[Dict, str], cache_root: Optional[str] = None
+) -> str:
+    """
+    Returns the path of the config file in a directory dedicated to `config`.
+
+    The directory name is derived from the content of the configuration,
+    so that tasks running concurrently with different configurations
+    never share the same config file. The cache root directory and the
+    config directories are only accessible by the current user, as the
+    configuration holds the data warehouse credentials.
 
     Args:
         config: Either a `dict` or a valid YAML string describing
             the MetricFlow configuration.
-        file_path: Absolute path of the file where the configuration will be persisted.
+        cache_root: The absolute path of the cache root directory.
+
+    Raises:
+        `MetricFlowFailureException` if the cache root directory
+        is owned by another user.
+
+    Returns:
+        The absolute path of the isolated configuration file.
+    """
+    content = dump(parse_config(config=config))
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    root = make_private_dir(get_cache_root(cache_root=cache_root))
+    config_dir = os.path.join(root, ISOLATED_CONFIG_DIR_NAME, digest)
+
+    is_new_dir = not os.path.isdir(config_dir)
+    os.makedirs(config_dir, mode=0o700, exist_ok=True)
+
+    # Refresh the directory mtime, used to evict least recently used directories
+    os.utime(config_dir)
+
+    if is_new_dir:
+        prune_isolated_config_dirs(cache_root=cache_root, keep=[config_dir])
+
+    return os.path.join(config_dir, ISOLATED_CONFIG_FILE_NAME)
+
+
+def prune_isolated_config_dirs(
+    cache_root: Optional[str] = None,
+    max_dirs: int = DEFAULT_MAX_ISOLATED_CONFIG_DIRS,
+    keep: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Removes the least recently used isolated config directories.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+        max_dirs: Maximum number of isolated config directories to keep.
+        keep: Directories that must not be removed.
+
+    Returns:
+        The list of removed directories.
+    """
+    root = os.path.join(get_cache_root(cache_root=cache_root), ISOLATED_CONFIG_DIR_NAME)
+    if not os.path.isdir(root):
+        return []
+
+    keep = {os.path.abspath(path) for path in keep or []}
+    config_dirs = [
+        os.path.join(root, name)
+        for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name))
+    ]
+    config_dirs.sort(key=os.path.getmtime, reverse=True)
+
+    removed = []
+    for config_dir in config_dirs[max(max_dirs, 0) :]:
+        if os.path.abspath(config_dir) in keep:
+            continue
+        shutil.rmtree(config_dir, ignore_errors=True)
+        removed.append(config_dir)
+
+    return removed
+
+
+def parse_config(config: Union[Dict, str]) -> Dict:
+    """
+    Parse the MetricFlow configuration.
+
+    Args:
+        config: Either a `dict` or a valid YAML string describing
+            the MetricFlow configuration.
+
+    Raises:
+        `MetricFlowFailureException` if `config` is not a valid YAML string.
+
+    Returns:
+        The MetricFlow configuration as a `dict`.
     """
 
     if isinstance(config, dict):
-        mf_config = config
+        return config
 
     # If the config is a string, try parsing as YAML
-    elif isinstance(config, str):
-        try:
-            mf_config = safe_load(config)
-        except YAMLError as e:
-            msg = f"Error while parsing provided MetricFlow config string: {e}"
-            raise MetricFlowFailureException(msg)
+    try:
+        return safe_load(config) or {}
+    except YAMLError as e:
+        msg = f"Error while parsing provided MetricFlow config string: {e}"
+        raise MetricFlowFailureException(msg)
+
+
+def get_file_digest(file_path: str) -> Optional[str]:
+    """
+    Returns the content hash of a file.
+
+    Args:
+        file_path: Absolute path of the file.
+
+    Returns:
+        The SHA-256 hex digest of the file content,
+        or `None` if the file does not exist.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def persist_config(config: Union[Dict, str], file_path: str) -> bool:
+    """
+    Persist the MetricFlow configuration on the file system.
+
+    The file is left untouched if it already holds the same configuration,
+    otherwise it is replaced atomically so that concurrent readers never
+    see a partially written file.
+
+    Args:
+        config: Either a `dict` or a valid YAML string describing
+            the MetricFlow configuration.
+        file_path: Absolute path of the file where the configuration will be persisted.
+
+    Returns:
+        `True` if the file has been written,
+        `False` if it already held the same configuration.
+    """
+
+    mf_config = parse_config(config=config)
+    content = dump(mf_config).encode("utf-8")
+
+    # Skip the write if the file already holds the same content
+    if get_file_digest(file_path) == hashlib.sha256(content).hexdigest():
+        return False
+
+    # Write to a temporary file in the same directory, then atomically rename it
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_file_path = tempfile.mkstemp(dir=dir_path, prefix=".config-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(content)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_file_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+        raise
 
-    # Persist the configuration on the file system
-    with open(file_path, "w") as config_file:
-        dump(mf_config, config_file)
+    return True
@@ -0,0 +1,145 @@
+"""
+Stores of the high-water marks of incrementally built materializations
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from prefect_metricflow.utils import get_cache_root
+
+WATERMARKS_DB_FILE_NAME = "watermarks.db"
+
+
+def get_watermarks_db_path(cache_root: Optional[str] = None) -> str:
+    """
+    Returns the path of the default SQLite watermarks database.
+
+    Args:
+        cache_root: The absolute path of the cache root directory.
+
+    Returns:
+        The absolute path of the watermarks database in the cache root directory.
+    """
+    return os.path.join(get_cache_root(cache_root=cache_root), WATERMARKS_DB_FILE_NAME)
+
+
+def get_watermark_key(materialization_name: str, config: Dict[str, Any]) -> str:
+    """
+    Returns the key of the watermark of a materialization.
+
+    Args:
+        materialization_name: The name of the materialization.
+        config: The MetricFlow configuration the materialization is built with.
+
+    Returns:
+        A key identifying the materialization built with this configuration,
+        so that the same materialization built on different warehouses
+        has distinct watermarks.
+    """
+    serialized = json.dumps(config, sort_keys=True, default=str)
+    digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+    return f"{materialization_name}:{digest}"
+
+
+class WatermarkStore(ABC):
+    """
+    Stores the high-water mark of the last successful build of materializations.
+
+    Subclass it to keep watermarks in a shared location,
+    such as a table in the data warehouse.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the watermark stored under `key`.
+
+        Args:
+            key: The key of the watermark.
+
+        Returns:
+            The watermark as an ISO 8601 timestamp,
+            or `None` if no watermark is stored.
+        """
+
+    @abstractmethod
+    def set(self, key: str, watermark: str) -> None:
+        """
+        Stores the watermark under `key`, replacing any previous value.
+
+        Args:
+            key: The key of the watermark.
+            watermark: The watermark as an ISO 8601 timestamp.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """
+        Deletes the watermark stored under `key`.
+
+        Args:
+            key: The key of the watermark.
+
+        Returns:
+            `True` if a watermark was deleted, `False` otherwise.
+        """
+
+
+class SQLiteWatermarkStore(WatermarkStore):
+    """
+    Stores watermarks in a local SQLite database.
+
+    Args:
+        path: Path of the SQLite database. If not provided, a database
+            in the prefect-metricflow cache root directory is used.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_watermarks_db_path()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connects to the database, creating its table if needed.
+        """
+        dir_path = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dir_path, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks "
+            "(key TEXT PRIMARY KEY, watermark TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the watermark stored under `key`, see `WatermarkStore.get`.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT watermark FROM watermarks WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, watermark: str) -> None:
+        """
+        Stores the watermark under `key`, see `WatermarkStore.set`.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO watermarks (key, watermark, updated_at) "
+                "VALUES (?, ?, ?)",
+                (key, watermark, datetime.utcnow().isoformat()),
+            )
+
+    def delete(self, key: str) -> bool:
+        """
+        Deletes the watermark stored under `key`, see `WatermarkStore.delete`.
+        """
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute("DELETE FROM watermarks WHERE key = ?", (key,))
+        return cursor.rowcount > 0
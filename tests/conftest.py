@@ -0,0 +1,34 @@
+import pytest
+
+from prefect_metricflow.caching import clear_query_cache
+from prefect_metricflow.catalog import clear_catalog_cache
+from prefect_metricflow.clients import clear_client_pool
+from prefect_metricflow.plans import clear_plan_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_metricflow_client_pool():
+    clear_client_pool()
+    yield
+    clear_client_pool()
+
+
+@pytest.fixture(autouse=True)
+def clear_metricflow_query_cache():
+    clear_query_cache()
+    yield
+    clear_query_cache()
+
+
+@pytest.fixture(autouse=True)
+def clear_metricflow_plan_cache():
+    clear_plan_cache()
+    yield
+    clear_plan_cache()
+
+
+@pytest.fixture(autouse=True)
+def clear_metricflow_catalog_cache():
+    clear_catalog_cache()
+    yield
+    clear_catalog_cache()
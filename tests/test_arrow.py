@@ -0,0 +1,103 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from prefect_metricflow.arrow import (
+    read_arrow_file,
+    to_arrow_table,
+    validate_result_format,
+    write_batches,
+)
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+pytest.importorskip("pyarrow")
+
+
+def batches():
+    yield pd.DataFrame({"day": [1, 2], "revenue": [10.0, 20.0]})
+    yield pd.DataFrame({"day": [3], "revenue": [30.0]})
+
+
+def test_to_arrow_table_drops_index():
+    df = pd.DataFrame({"revenue": [1, 2]}, index=[5, 6])
+
+    table = to_arrow_table(df)
+
+    assert table.column_names == ["revenue"]
+    assert table.column("revenue").to_pylist() == [1, 2]
+
+
+@pytest.mark.parametrize("file_name", ["result.parquet", "result.arrow"])
+def test_write_batches(tmp_path, file_name):
+    file_path = str(tmp_path / "results" / file_name)
+
+    assert write_batches(batches(), file_path) == 3
+
+    table = read_arrow_file(file_path)
+    assert table.column("day").to_pylist() == [1, 2, 3]
+    assert table.column("revenue").to_pylist() == [10.0, 20.0, 30.0]
+    assert sorted(p.name for p in (tmp_path / "results").iterdir()) == [file_name]
+
+
+def test_write_batches_failure_removes_temporary_file(tmp_path):
+    def failing_batches():
+        yield pd.DataFrame({"day": [1]})
+        raise ValueError("Connection reset!")
+
+    with pytest.raises(ValueError, match="Connection reset!"):
+        write_batches(failing_batches(), str(tmp_path / "result.parquet"))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_write_no_batches(tmp_path):
+    file_path = str(tmp_path / "result.parquet")
+
+    assert write_batches([], file_path) == 0
+    assert read_arrow_file(file_path).num_rows == 0
+
+
+def test_validate_result_format():
+    validate_result_format("pandas")
+    validate_result_format("arrow")
+
+    with pytest.raises(MetricFlowFailureException, match="Invalid result format"):
+        validate_result_format("csv")
+
+
+def test_arrow_format_without_pyarrow_raises(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    with pytest.raises(
+        MetricFlowFailureException, match="prefect-metricflow\\[arrow\\]"
+    ):
+        validate_result_format("arrow")
+
+
+@pytest.mark.parametrize("file_name", ["result.parquet", "result.arrow"])
+def test_write_batches_unifies_schemas(tmp_path, file_name):
+    def null_first_batches():
+        yield pd.DataFrame({"day": [1], "country": [None], "revenue": [10]})
+        yield pd.DataFrame({"revenue": [None], "country": ["FR"], "day": [2]})
+        yield pd.DataFrame({"day": [3], "country": ["US"], "revenue": [30]})
+
+    file_path = str(tmp_path / file_name)
+
+    assert write_batches(null_first_batches(), file_path) == 3
+
+    table = read_arrow_file(file_path)
+    assert table.column_names == ["day", "country", "revenue"]
+    assert str(table.schema.field("country").type).endswith("string")
+    assert table.column("country").to_pylist() == [None, "FR", "US"]
+    assert table.column("revenue").to_pylist() == [10, None, 30]
+
+
+def test_write_batches_with_different_columns_raises(tmp_path):
+    file_path = tmp_path / "result.parquet"
+    batches = [pd.DataFrame({"day": [1]}), pd.DataFrame({"revenue": [10]})]
+
+    with pytest.raises(MetricFlowFailureException, match="columns"):
+        write_batches(batches, str(file_path))
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from prefect_metricflow.backfill import (
+    SQLiteBackfillCheckpoint,
+    get_backfill_key,
+    get_backfill_run_id,
+    run_backfill,
+)
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+
+def backfill_client_mock(failures):
+    """
+    Returns a client failing `failures[start_time]` times for each partition.
+    """
+    failures = dict(failures)
+
+    def query(metrics, dimensions, start_time, end_time, as_table):
+        if failures.get(start_time, 0) > 0:
+            failures[start_time] -= 1
+            raise ValueError("Connection reset!")
+
+    client = mock.Mock(system_schema="mf")
+    client.list_materializations.return_value = [
+        SimpleNamespace(
+            name="foo",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+    client.user_configured_model.metrics = []
+    client.query.side_effect = query
+    return client
+
+
+def built_partitions(client):
+    return sorted(call.kwargs["start_time"] for call in client.query.call_args_list)
+
+
+def test_get_backfill_key_depends_on_time_range():
+    key = get_backfill_key("foo", {}, "2022-01-01", "2022-01-31", "day")
+
+    assert key == get_backfill_key("foo", {}, "2022-01-01", "2022-01-31", "day")
+    assert key != get_backfill_key("foo", {}, "2022-01-01", "2022-02-28", "day")
+    assert key != get_backfill_key("foo", {}, "2022-01-01", "2022-01-31", "week")
+
+
+def test_backfill_checkpoint(tmp_path):
+    checkpoint = SQLiteBackfillCheckpoint(str(tmp_path / "backfills.db"))
+
+    checkpoint.record("foo", "2022-01-01T00:00:00", "completed", 1)
+    checkpoint.record("foo", "2022-01-02T00:00:00", "failed", 3, "boom")
+    checkpoint.record("bar", "2022-01-03T00:00:00", "completed", 1)
+
+    assert checkpoint.get_completed("foo") == {"2022-01-01T00:00:00"}
+
+    checkpoint.clear("foo")
+
+    assert checkpoint.get_completed("foo") == set()
+    assert checkpoint.get_completed("bar") == {"2022-01-03T00:00:00"}
+
+
+def test_run_backfill_retries_transient_failures(tmp_path):
+    client = backfill_client_mock({"2022-01-02T00:00:00": 1})
+    checkpoint = SQLiteBackfillCheckpoint(str(tmp_path / "backfills.db"))
+
+    table = run_backfill(
+        client,
+        materialization_name="foo",
+        start_time="2022-01-01",
+        end_time="2022-01-03",
+        partition_grain="day",
+        checkpoint=checkpoint,
+        checkpoint_key="foo:key",
+        max_retries=1,
+        retry_delay_seconds=0,
+    )
+
+    assert table.sql == "mf.foo"
+    assert client.query.call_count == 4
+    assert client.sql_client.create_table_as_select.call_count == 2
+    assert checkpoint.get_completed("foo:key") == set()
+
+
+def test_run_backfill_resumes_from_checkpoint(tmp_path):
+    checkpoint = SQLiteBackfillCheckpoint(str(tmp_path / "backfills.db"))
+    kwargs = dict(
+        materialization_name="foo",
+        start_time="2022-01-01",
+        end_time="2022-01-03",
+        partition_grain="day",
+        checkpoint=checkpoint,
+        checkpoint_key="foo:key",
+        max_retries=1,
+        retry_delay_seconds=0,
+    )
+
+    client = backfill_client_mock({"2022-01-02T00:00:00": 2})
+    with pytest.raises(MetricFlowFailureException, match="1 of 3 partitions"):
+        run_backfill(client, **kwargs)
+
+    client.sql_client.create_table_as_select.assert_not_called()
+    assert checkpoint.get_completed("foo:key") == {
+        "2022-01-01T00:00:00",
+        "2022-01-03T00:00:00",
+    }
+
+    client = backfill_client_mock({})
+    table = run_backfill(client, **kwargs)
+
+    assert table.sql == "mf.foo"
+    assert built_partitions(client) == ["2022-01-02T00:00:00"]
+    select_query = client.sql_client.create_table_as_select.call_args_list[0].kwargs[
+        "select_query"
+    ]
+    assert select_query.count("SELECT * FROM mf.foo__p2022010") == 3
+    assert checkpoint.get_completed("foo:key") == set()
+
+
+def test_run_backfill_rebuilds_dropped_checkpointed_partitions(tmp_path):
+    checkpoint = SQLiteBackfillCheckpoint(str(tmp_path / "backfills.db"))
+    checkpoint.record("foo:key", "2022-01-01T00:00:00", "completed", 1)
+    checkpoint.record("foo:key", "2022-01-02T00:00:00", "completed", 1)
+    client = backfill_client_mock({})
+    run_id = get_backfill_run_id("foo:key")
+    client.sql_client.table_exists.side_effect = (
+        lambda table: table.table_name != f"foo__p20220101_{run_id}"
+    )
+
+    run_backfill(
+        client,
+        materialization_name="foo",
+        start_time="2022-01-01",
+        end_time="2022-01-03",
+        partition_grain="day",
+        checkpoint=checkpoint,
+        checkpoint_key="foo:key",
+    )
+
+    assert built_partitions(client) == ["2022-01-01T00:00:00", "2022-01-03T00:00:00"]
+    assert checkpoint.get_completed("foo:key") == set()
+
+
+def test_backfills_with_other_keys_use_other_partition_tables(tmp_path):
+    checkpoint = SQLiteBackfillCheckpoint(str(tmp_path / "backfills.db"))
+    client = backfill_client_mock({})
+
+    for checkpoint_key in ["foo:key", "foo:other_key"]:
+        run_backfill(
+            client,
+            materialization_name="foo",
+            start_time="2022-01-01",
+            end_time="2022-01-01",
+            partition_grain="day",
+            checkpoint=checkpoint,
+            checkpoint_key=checkpoint_key,
+        )
+
+    assert [call.kwargs["as_table"] for call in client.query.call_args_list] == [
+        f"mf.foo__p20220101_{get_backfill_run_id('foo:key')}",
+        f"mf.foo__p20220101_{get_backfill_run_id('foo:other_key')}",
+    ]
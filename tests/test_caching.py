@@ -0,0 +1,94 @@
+import os
+import time
+
+import pandas as pd
+
+from prefect_metricflow.caching import DiskQueryResultCache, QueryResultCache
+
+
+def test_query_result_cache_returns_copies():
+    cache = QueryResultCache()
+    cache.set("foo", pd.DataFrame({"revenue": [1, 2]}))
+
+    result = cache.get("foo", ttl=60)
+    result["revenue"] = 0
+
+    assert cache.get("foo", ttl=60)["revenue"].tolist() == [1, 2]
+    assert cache.get("bar", ttl=60) is None
+
+
+def test_query_result_cache_expires_results():
+    cache = QueryResultCache()
+    cache.set("foo", "result", created_at=time.time() - 120)
+
+    assert cache.get("foo", ttl=300) == "result"
+    assert cache.get("foo", ttl=60) is None
+    assert len(cache) == 0
+
+
+def test_query_result_cache_evicts_least_recently_used():
+    cache = QueryResultCache(max_size=2)
+    cache.set("foo", 1)
+    cache.set("bar", 2)
+    cache.get("foo", ttl=60)
+    cache.set("baz", 3)
+
+    assert cache.get("foo", ttl=60) == 1
+    assert cache.get("bar", ttl=60) is None
+    assert cache.get("baz", ttl=60) == 3
+
+
+def test_disk_query_result_cache(tmp_path):
+    cache = DiskQueryResultCache(str(tmp_path / "results"))
+
+    assert cache.get("foo", ttl=60) is None
+
+    cache.set("foo", pd.DataFrame({"revenue": [1, 2]}), created_at=42.0)
+    result, created_at = DiskQueryResultCache(cache.cache_dir).get("foo", ttl=60)
+
+    assert result["revenue"].tolist() == [1, 2]
+    assert created_at == 42.0
+
+
+def test_disk_query_result_cache_expires_results(tmp_path):
+    cache = DiskQueryResultCache(str(tmp_path))
+    cache.set("foo", "result")
+    file_path = os.path.join(str(tmp_path), "foo.pkl")
+    os.utime(file_path, (time.time() - 120, time.time() - 120))
+
+    assert cache.get("foo", ttl=60) is None
+    assert not os.path.exists(file_path)
+
+
+def test_disk_query_result_cache_ignores_corrupted_results(tmp_path):
+    cache = DiskQueryResultCache(str(tmp_path))
+    with open(os.path.join(str(tmp_path), "foo.pkl"), "wb") as f:
+        f.write(b"not a pickle")
+
+    assert cache.get("foo", ttl=60) is None
+
+
+def test_disk_query_result_cache_is_private(tmp_path):
+    cache = DiskQueryResultCache(str(tmp_path / "results"))
+    cache.set("foo", "result")
+
+    assert os.stat(cache.cache_dir).st_mode & 0o777 == 0o700
+
+    file_path = os.path.join(cache.cache_dir, "foo.pkl")
+    os.chmod(file_path, 0o666)
+    assert cache.get("foo", ttl=60) is None
+
+
+def test_disk_query_result_cache_evicts_oldest_results(tmp_path):
+    for age, key in enumerate(["foo", "bar", "baz"]):
+        DiskQueryResultCache(str(tmp_path)).set(key, key)
+        file_path = os.path.join(str(tmp_path), f"{key}.pkl")
+        os.utime(file_path, (time.time() - age * 10, time.time() - age * 10))
+
+    cache = DiskQueryResultCache(str(tmp_path), max_size=2)
+    cache.set("qux", "qux")
+
+    assert cache.get("qux", ttl=60)[0] == "qux"
+    assert cache.get("foo", ttl=60)[0] == "foo"
+    assert cache.get("bar", ttl=60) is None
+    assert cache.get("baz", ttl=60) is None
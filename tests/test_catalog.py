@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.catalog import (
+    Catalog,
+    fetch_dimension_values,
+    fetch_dimension_values_batch,
+    get_catalog,
+    search_prefix,
+)
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+
+def make_catalog():
+    return Catalog(
+        {
+            "Revenue": ["metric_time", "country", "customer__region"],
+            "revenue_mtd": ["metric_time"],
+            "orders": ["metric_time", "country"],
+        }
+    )
+
+
+def test_search_prefix():
+    names = ["orders", "revenue", "revenue_mtd", "visits"]
+
+    assert search_prefix(names, "REV") == ["revenue", "revenue_mtd"]
+    assert search_prefix(names, "") == names
+    assert search_prefix(names, "x") == []
+
+
+def test_catalog_list_metrics():
+    catalog = make_catalog()
+
+    assert catalog.list_metrics() == ["orders", "revenue", "revenue_mtd"]
+    assert catalog.list_metrics(prefix="rev") == ["revenue", "revenue_mtd"]
+    assert catalog.list_metrics(dimension="Country") == ["orders", "revenue"]
+    assert catalog.list_metrics(prefix="o", dimension="country") == ["orders"]
+    assert catalog.list_metrics(dimension="unknown") == []
+
+
+def test_catalog_list_dimensions():
+    catalog = make_catalog()
+
+    assert catalog.list_dimensions() == ["country", "customer__region", "metric_time"]
+    assert catalog.list_dimensions(prefix="c") == ["country", "customer__region"]
+    assert catalog.list_dimensions(metrics=["revenue", "orders"]) == [
+        "country",
+        "metric_time",
+    ]
+    assert catalog.list_dimensions(metrics=["unknown"]) == []
+
+
+def test_get_catalog_lists_metrics_once_per_fingerprint():
+    client = mock.Mock()
+    client.list_metrics.return_value = [
+        SimpleNamespace(name="revenue", dimensions=[SimpleNamespace(name="country")])
+    ]
+    cache = QueryResultCache()
+
+    catalog = get_catalog(client, "fp", cache)
+    assert get_catalog(client, "fp", cache) is catalog
+    get_catalog(client, "other", cache)
+
+    assert catalog.list_dimensions(metrics=["revenue"]) == ["country"]
+    assert client.list_metrics.call_count == 2
+
+
+def test_fetch_dimension_values_with_cache():
+    client = mock.Mock()
+    client.get_dimension_values.return_value = ["FR", "IT"]
+    cache = QueryResultCache()
+
+    for _ in range(2):
+        values = fetch_dimension_values(
+            client, "revenue", "country", None, None, "key", 60, cache
+        )
+        values.append("mutated")
+
+    assert fetch_dimension_values(
+        client, "revenue", "country", None, None, "key", 60, cache
+    ) == ["FR", "IT"]
+    client.get_dimension_values.assert_called_once()
+
+    fetch_dimension_values(client, "revenue", "country", None, None, "key", 0, cache)
+    assert client.get_dimension_values.call_count == 2
+
+
+def sqlite_client_mock():
+    import sqlite3
+
+    import pandas as pd
+
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.executescript(
+        """
+        CREATE TABLE facts (
+            country TEXT, region TEXT, channel TEXT, revenue_band INTEGER, revenue REAL
+        );
+        INSERT INTO facts VALUES ('IT', 'EMEA', NULL, 1, 1.0),
+            ('FR', 'EMEA', 'web', 2, 2.0), ('US', 'AMER', 'store', 3, 3.0),
+            ('IT', 'EMEA', 'web', 1, 4.0), ('DE', 'EMEA', 'web', 4, NULL);
+        """
+    )
+
+    def explain(metrics, dimensions, **kwargs):
+        sql_query = (
+            f"SELECT {dimensions[0]}, SUM({metrics[0]}) AS {metrics[0]} "
+            f"FROM facts GROUP BY {dimensions[0]}"
+        )
+        return SimpleNamespace(
+            rendered_sql=SimpleNamespace(
+                sql_query=sql_query,
+                bind_parameters=SimpleNamespace(param_dict={}),
+            )
+        )
+
+    client = mock.Mock()
+    client.explain.side_effect = explain
+    client.sql_client.query.side_effect = lambda sql: pd.read_sql(sql, connection)
+    return client
+
+
+def test_fetch_dimension_values_batch():
+    client = sqlite_client_mock()
+
+    values = fetch_dimension_values_batch(
+        client,
+        "revenue",
+        ["Country", "region", "channel", "revenue_band"],
+        max_values={"country": 2},
+        max_dimensions_per_query=3,
+    )
+
+    assert values["Country"] == ["FR", "IT"]
+    assert sorted(values["region"]) == ["AMER", "EMEA"]
+    # The null values of a dimension are dropped, as in MetricFlow
+    assert sorted(values["channel"]) == ["store", "web"]
+    assert sorted(values["revenue_band"]) == ["1", "2", "3"]
+    assert client.sql_client.query.call_count == 2
+    assert client.get_dimension_values.call_count == 0
+
+
+def test_fetch_dimension_values_batch_without_merging_bound_queries():
+    client = mock.Mock()
+    client.explain.return_value = SimpleNamespace(
+        rendered_sql=SimpleNamespace(
+            sql_query="SELECT 1",
+            bind_parameters=SimpleNamespace(param_dict={"p": 1}),
+        )
+    )
+    client.get_dimension_values.return_value = ["a", "b", "c"]
+
+    values = fetch_dimension_values_batch(
+        client, "revenue", ["country", "region"], max_values=2
+    )
+
+    assert values == {"country": ["a", "b"], "region": ["a", "b"]}
+    client.sql_client.query.assert_not_called()
+
+
+def test_fetch_dimension_values_batch_rejects_invalid_names():
+    client = sqlite_client_mock()
+
+    with pytest.raises(MetricFlowFailureException, match="Invalid"):
+        fetch_dimension_values_batch(
+            client, "revenue", ["country", "country; DROP TABLE revenue --"]
+        )
+
+    client.sql_client.query.assert_not_called()
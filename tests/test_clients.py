@@ -0,0 +1,255 @@
+from unittest import mock
+
+import pytest
+from yaml import dump
+
+from prefect_metricflow.clients import (
+    InMemoryConfigHandler,
+    MetricFlowClientPool,
+    build_client_from_config,
+    clear_client_pool,
+    compute_client_fingerprint,
+    get_client_pool,
+    get_metricflow_client,
+    lease_metricflow_client,
+    read_config_file,
+)
+from prefect_metricflow.exceptions import MetricFlowFailureException
+
+CONFIG = {
+    "dwh_dialect": "redshift",
+    "dwh_host": "localhost",
+    "dwh_port": 5439,
+    "dwh_user": "foo",
+    "dwh_password": "foo",
+    "dwh_database": "db",
+    "dwh_schema": "foo",
+    "model_path": "models",
+}
+
+
+class SqlClientMock:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ClientMock:
+    def __init__(self):
+        self.sql_client = SqlClientMock()
+
+
+def test_fingerprint_changes_with_config(fs):
+    config = {"dwh_schema": "foo", "model_path": "models"}
+    other_config = {"dwh_schema": "bar", "model_path": "models"}
+
+    assert compute_client_fingerprint(config) == compute_client_fingerprint(
+        dict(config)
+    )
+    assert compute_client_fingerprint(config) != compute_client_fingerprint(
+        other_config
+    )
+
+
+def test_fingerprint_changes_with_model_files(fs):
+    config = {"dwh_schema": "foo", "model_path": "models"}
+    fs.create_file("models/metrics.yaml", contents="metric: {}")
+    fingerprint = compute_client_fingerprint(config, ttl=0)
+
+    fs.create_file("models/data_sources.yaml", contents="data_source: {}")
+
+    assert compute_client_fingerprint(config, ttl=0) != fingerprint
+
+
+def test_fingerprint_is_reused_for_ttl(fs):
+    config = {"dwh_schema": "foo", "model_path": "models"}
+    fs.create_file("models/metrics.yaml", contents="metric: {}")
+    fingerprint = compute_client_fingerprint(config)
+
+    fs.create_file("models/data_sources.yaml", contents="data_source: {}")
+    with mock.patch("prefect_metricflow.clients.get_model_dir_state") as get_state:
+        assert compute_client_fingerprint(dict(config)) == fingerprint
+    get_state.assert_not_called()
+
+    clear_client_pool()
+    assert compute_client_fingerprint(config) != fingerprint
+
+
+def test_fingerprint_ignores_hidden_model_files(fs):
+    config = {"dwh_schema": "foo", "model_path": "models"}
+    fs.create_file("models/metrics.yaml", contents="metric: {}")
+    fingerprint = compute_client_fingerprint(config)
+
+    fs.create_file("models/.hidden.yaml", contents="metric: {}")
+
+    assert compute_client_fingerprint(config) == fingerprint
+
+
+def test_read_invalid_config_file_raises(fs):
+    fs.create_file("mf_config_dir/config.yaml", contents="root:\n  - a\n b: c")
+
+    msg_match = "Error while parsing MetricFlow config file"
+    with pytest.raises(MetricFlowFailureException, match=msg_match):
+        read_config_file("mf_config_dir/config.yaml")
+
+
+def test_pool_reuses_client():
+    pool = MetricFlowClientPool()
+    factory = mock.Mock(side_effect=ClientMock)
+
+    client = pool.get("foo", factory)
+
+    assert pool.get("foo", factory) is client
+    assert factory.call_count == 1
+
+
+def test_pool_evicts_least_recently_used_client():
+    pool = MetricFlowClientPool(max_size=2)
+    foo = pool.get("foo", ClientMock)
+    pool.get("bar", ClientMock)
+    pool.get("foo", ClientMock)
+
+    baz = pool.get("baz", ClientMock)
+
+    assert len(pool) == 2
+    assert "bar" not in pool
+    assert pool.get("foo", ClientMock) is foo
+    assert pool.get("baz", ClientMock) is baz
+
+
+def test_pool_evicts_idle_client():
+    pool = MetricFlowClientPool(max_idle_time=60)
+
+    with mock.patch("prefect_metricflow.clients.time.monotonic", return_value=0):
+        foo = pool.get("foo", ClientMock)
+
+    with mock.patch("prefect_metricflow.clients.time.monotonic", return_value=61):
+        assert pool.get("foo", ClientMock) is not foo
+
+    assert foo.sql_client.closed is True
+
+
+def test_pool_defers_closing_evicted_client_until_checkin():
+    pool = MetricFlowClientPool(max_size=1)
+
+    with pool.lease("foo", ClientMock) as foo:
+        pool.get("bar", ClientMock)
+
+        assert "foo" not in pool
+        assert foo.sql_client.closed is False
+
+    assert foo.sql_client.closed is True
+
+
+def test_pool_never_evicts_checked_out_client_for_being_idle():
+    pool = MetricFlowClientPool(max_idle_time=60)
+
+    with mock.patch("prefect_metricflow.clients.time.monotonic", return_value=0):
+        foo = pool.checkout("foo", ClientMock)
+
+    with mock.patch("prefect_metricflow.clients.time.monotonic", return_value=61):
+        assert pool.get("foo", ClientMock) is foo
+        pool.checkin(foo)
+
+    with mock.patch("prefect_metricflow.clients.time.monotonic", return_value=122):
+        assert pool.get("foo", ClientMock) is not foo
+
+    assert foo.sql_client.closed is True
+
+
+def test_pool_clear_closes_clients():
+    pool = MetricFlowClientPool()
+    foo = pool.get("foo", ClientMock)
+
+    pool.clear()
+
+    assert len(pool) == 0
+    assert foo.sql_client.closed is True
+
+
+def test_in_memory_config_handler():
+    handler = InMemoryConfigHandler(config={"dwh_schema": "foo"})
+
+    handler.set_value("model_path", "models")
+    handler.remove_value("dwh_schema")
+
+    assert handler.get_value("model_path") == "models"
+    assert handler.get_value("dwh_schema") is None
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_build_client_from_config_without_file_system(mf_client_mock):
+    with mock.patch("builtins.open") as open_mock:
+        build_client_from_config(config=CONFIG)
+
+    open_mock.assert_not_called()
+    assert mf_client_mock.call_args.kwargs["system_schema"] == "foo"
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_get_metricflow_client_from_yaml_config(mf_client_mock, tmp_path, monkeypatch):
+    mf_client_mock.side_effect = lambda **kwargs: ClientMock()
+    monkeypatch.chdir(tmp_path)
+
+    get_metricflow_client(config=dump(CONFIG))
+
+    assert mf_client_mock.call_args.kwargs["system_schema"] == "foo"
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_get_metricflow_client_reuses_pooled_client(
+    mf_client_mock, tmp_path, monkeypatch
+):
+    mf_client_mock.side_effect = lambda **kwargs: ClientMock()
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mf_config_dir").mkdir()
+    (tmp_path / "mf_config_dir" / "config.yaml").write_text(dump(CONFIG))
+
+    client = get_metricflow_client(config_file_path="mf_config_dir/config.yaml")
+
+    assert get_metricflow_client(config_file_path="mf_config_dir/config.yaml") is (
+        client
+    )
+    assert mf_client_mock.call_count == 1
+    assert len(get_client_pool()) == 1
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_lease_metricflow_client_holds_pooled_client(mf_client_mock):
+    mf_client_mock.side_effect = lambda **kwargs: ClientMock()
+    config = CONFIG
+
+    with lease_metricflow_client(config=config) as client:
+        clear_client_pool()
+        assert client.sql_client.closed is False
+
+    assert client.sql_client.closed is True
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_get_metricflow_client_without_reuse(mf_client_mock):
+    mf_client_mock.side_effect = lambda **kwargs: ClientMock()
+    config = CONFIG
+
+    client = get_metricflow_client(config=config, reuse_client=False)
+
+    assert get_metricflow_client(config=config, reuse_client=False) is not client
+    assert len(get_client_pool()) == 0
+
+
+@mock.patch("prefect_metricflow.model_cache.load_user_configured_model")
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_build_client_from_config_with_model_cache(mf_client_mock, load_model_mock):
+    load_model_mock.return_value = {"foo": "bar"}
+
+    build_client_from_config(
+        config=CONFIG,
+        model_cache_dir="mf_config_dir",
+    )
+
+    load_model_mock.assert_called_once_with(
+        model_path="models", cache_dir="mf_config_dir"
+    )
+    assert mf_client_mock.call_args.kwargs["user_configured_model"] == {"foo": "bar"}
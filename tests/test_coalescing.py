@@ -0,0 +1,180 @@
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+import pytest
+from metricflow.model.objects.metric import MetricInputMeasure
+
+from prefect_metricflow.coalescing import (
+    QueryCoalescer,
+    get_coalescing_key,
+    get_metric_data_sources,
+    query_coalesced,
+    split_result,
+)
+from prefect_metricflow.queries import normalize_query_spec
+
+
+def metric_mock(name, metric_type="measure_proxy", measure=None, constraint=None):
+    return SimpleNamespace(
+        name=name,
+        type=metric_type,
+        constraint=constraint,
+        type_params=SimpleNamespace(
+            measure=MetricInputMeasure(name=measure or name),
+            measures=None,
+            numerator=None,
+            denominator=None,
+        ),
+    )
+
+
+def data_source_mock(name, measures):
+    return SimpleNamespace(
+        name=name, measures=[SimpleNamespace(name=measure) for measure in measures]
+    )
+
+
+def coalescing_client_mock():
+    def query(metrics, dimensions, **kwargs):
+        rows = {"metric_time": ["2022-01-01", "2022-01-02"]}
+        values = {"revenue": [1.0, None], "orders": [None, 2.0], "visits": [3.0, 4.0]}
+        for metric in metrics:
+            if metric == "broken":
+                raise ValueError("Unknown metric!")
+            rows[metric] = values[metric]
+        return SimpleNamespace(result_df=pd.DataFrame(rows))
+
+    client = mock.Mock()
+    client.query.side_effect = query
+    client.user_configured_model.metrics = [
+        metric_mock("revenue"),
+        metric_mock("orders"),
+        metric_mock("broken", measure="revenue"),
+        metric_mock("visits"),
+    ]
+    client.user_configured_model.data_sources = [
+        data_source_mock("transactions", ["revenue", "orders"]),
+        data_source_mock("sessions", ["visits"]),
+    ]
+    return client
+
+
+def test_get_metric_data_sources():
+    client = mock.Mock()
+    client.user_configured_model.metrics = [
+        metric_mock("Revenue", measure="revenue"),
+        metric_mock("cumulative_revenue", "cumulative", measure="revenue"),
+        metric_mock("it_revenue", measure="revenue", constraint="country = 'IT'"),
+        metric_mock("unknown"),
+    ]
+    client.user_configured_model.data_sources = [
+        data_source_mock("transactions", ["revenue"])
+    ]
+
+    assert get_metric_data_sources(client) == {"revenue": "transactions"}
+
+
+def test_get_coalescing_key():
+    data_sources = {"revenue": "transactions", "a": "transactions", "b": "sessions"}
+    spec = normalize_query_spec(metrics=["revenue"], dimensions=["metric_time"])
+
+    def key(**kwargs):
+        return get_coalescing_key({**spec, **kwargs}, data_sources)
+
+    assert key() == key(metrics=["a"])
+    assert key() != key(where="country = 'IT'")
+    assert key(order=["-metric_time"]) is not None
+    assert key(order=["-revenue"]) is None
+    assert key(limit=10) is None
+    assert key(metrics=["b"]) not in (None, key())
+    assert key(metrics=["revenue", "b"]) is None
+    assert key(metrics=["unknown"]) is None
+
+
+def test_split_result_keeps_rows_with_null_metrics():
+    result = pd.DataFrame(
+        {"metric_time": ["a", "b"], "revenue": [1.0, None], "orders": [None, 2.0]}
+    )
+
+    split = split_result(result, ["revenue"], ["revenue", "orders"])
+
+    assert split.fillna(0).to_dict("list") == {
+        "metric_time": ["a", "b"],
+        "revenue": [1.0, 0.0],
+    }
+
+
+def test_query_coalesced_merges_compatible_queries():
+    client = coalescing_client_mock()
+    specs = [
+        normalize_query_spec(metrics=["revenue"], dimensions=["metric_time"]),
+        normalize_query_spec(metrics=["orders"], dimensions=["metric_time"]),
+        normalize_query_spec(metrics=["visits"], dimensions=["metric_time"], limit=1),
+        normalize_query_spec(
+            metrics=["broken"], dimensions=["metric_time"], where="country = 'IT'"
+        ),
+    ]
+
+    results = query_coalesced(client, specs)
+
+    assert client.query.call_count == 3
+    assert ["revenue", "orders"] in [
+        call.kwargs["metrics"] for call in client.query.call_args_list
+    ]
+    assert results[0]["revenue"].fillna(0).tolist() == [1.0, 0.0]
+    assert results[1]["orders"].fillna(0).tolist() == [0.0, 2.0]
+    assert results[2]["visits"].tolist() == [3.0, 4.0]
+    assert isinstance(results[3], ValueError)
+
+
+def test_query_coalesced_runs_queries_on_their_own_when_merged_query_fails():
+    client = coalescing_client_mock()
+    specs = [
+        normalize_query_spec(metrics=["revenue"], dimensions=["metric_time"]),
+        normalize_query_spec(metrics=["broken"], dimensions=["metric_time"]),
+    ]
+
+    results = query_coalesced(client, specs)
+
+    assert [call.kwargs["metrics"] for call in client.query.call_args_list] == [
+        ["revenue", "broken"],
+        ["revenue"],
+        ["broken"],
+    ]
+    assert results[0]["revenue"].fillna(0).tolist() == [1.0, 0.0]
+    assert isinstance(results[1], ValueError)
+
+
+def test_query_coalescer_merges_queries_submitted_within_window():
+    client = coalescing_client_mock()
+    coalescer = QueryCoalescer()
+    metrics = ["revenue", "orders"]
+    futures = {}
+
+    def submit(metric):
+        spec = normalize_query_spec(metrics=[metric], dimensions=["metric_time"])
+        futures[metric] = coalescer.submit(client, spec, window=0.2)
+
+    threads = [threading.Thread(target=submit, args=(m,)) for m in metrics]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {metric: future.result(timeout=5) for metric, future in futures.items()}
+
+    client.query.assert_called_once()
+    assert sorted(client.query.call_args.kwargs["metrics"]) == sorted(metrics)
+    assert results["orders"]["orders"].fillna(0).tolist() == [0.0, 2.0]
+
+
+def test_query_coalescer_propagates_errors():
+    client = coalescing_client_mock()
+    spec = normalize_query_spec(metrics=["broken"])
+
+    future = QueryCoalescer().submit(client, spec, window=0)
+
+    with pytest.raises(ValueError, match="Unknown metric!"):
+        future.result(timeout=5)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+from prefect_metricflow.concurrency import (
+    get_capacity_limiter,
+    get_process_semaphore,
+    run_sync_in_thread,
+)
+
+
+async def test_limiter_is_shared_per_max_concurrency():
+    assert get_capacity_limiter(2) is get_capacity_limiter(2)
+    assert get_capacity_limiter(2) is not get_capacity_limiter(3)
+
+
+async def test_run_sync_in_thread_bounds_concurrency():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def blocking_call(value):
+        with lock:
+            running.append(value)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(value)
+        return value
+
+    results = await asyncio.gather(
+        *[run_sync_in_thread(blocking_call, i, max_concurrency=2) for i in range(8)]
+    )
+
+    assert results == list(range(8))
+    assert max(max_running) == 2
+
+
+def test_semaphore_is_shared_per_max_concurrency():
+    assert get_process_semaphore(2) is get_process_semaphore(2)
+    assert get_process_semaphore(2) is not get_process_semaphore(3)
+
+
+def test_run_sync_in_thread_bounds_concurrency_across_event_loops():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def blocking_call(value):
+        with lock:
+            running.append(value)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(value)
+        return value
+
+    async def run_calls():
+        return await asyncio.gather(
+            *[run_sync_in_thread(blocking_call, i, max_concurrency=2) for i in range(4)]
+        )
+
+    threads = [
+        threading.Thread(target=asyncio.run, args=(run_calls(),)) for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(max_running) == 8
+    assert max(max_running) == 2
+
+
+async def test_run_sync_in_thread_passes_keyword_arguments():
+    def blocking_call(value, suffix=""):
+        return f"{value}{suffix}"
+
+    assert await run_sync_in_thread(blocking_call, "foo", suffix="bar") == "foobar"
@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+IMPORT_CHECK = """
+import json
+import subprocess
+import sys
+import time
+
+
+popen = subprocess.Popen
+
+
+def popen_without_git(args, *popen_args, **popen_kwargs):
+    command = args[0] if isinstance(args, (list, tuple)) else args
+    if "git" in str(command):
+        raise AssertionError(f"Unexpected git call: {args}")
+    return popen(args, *popen_args, **popen_kwargs)
+
+
+subprocess.Popen = popen_without_git
+
+start = time.perf_counter()
+import prefect
+
+baseline = time.perf_counter() - start
+start = time.perf_counter()
+import prefect_metricflow
+import prefect_metricflow.tasks
+
+elapsed = time.perf_counter() - start
+print(
+    json.dumps(
+        {"baseline": baseline, "elapsed": elapsed, "modules": sorted(sys.modules)}
+    )
+)
+"""
+
+
+def run_import_check():
+    process = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_metricflow():
+    result = run_import_check()
+
+    assert not [module for module in result["modules"] if module == "metricflow"]
+    assert "prefect_metricflow._version" not in result["modules"]
+
+
+def test_import_is_cheap_compared_to_prefect():
+    result = run_import_check()
+
+    # Importing the tasks on top of Prefect should cost a fraction of
+    # importing Prefect itself, as MetricFlow is only loaded when used
+    assert result["elapsed"] < max(result["baseline"], 1.0)
+
+
+def test_version_is_resolved_on_first_access():
+    import prefect_metricflow
+
+    assert isinstance(prefect_metricflow.__version__, str)
@@ -0,0 +1,512 @@
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from metricflow.dataflow.sql_table import SqlTable
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.materializations import (
+    drop_materialization_tables,
+    get_partition_table,
+    materialize_concurrently,
+    materialize_incremental,
+    materialize_partitioned,
+    merge_partitions,
+    normalize_materialization_request,
+)
+from prefect_metricflow.watermarks import WatermarkStore
+
+
+@pytest.fixture(autouse=True)
+def run_id():
+    with mock.patch(
+        "prefect_metricflow.materializations.new_run_id", return_value="r1"
+    ):
+        yield "r1"
+
+
+class MetricFlowClientMock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def materialize(self, materialization_name, start_time=None, end_time=None):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        if materialization_name == "broken":
+            raise ValueError("Cannot build materialization!")
+        return (materialization_name, start_time, end_time)
+
+
+def test_normalize_materialization_name():
+    assert normalize_materialization_request("foo") == {
+        "materialization_name": "foo",
+        "start_time": None,
+        "end_time": None,
+    }
+
+
+def test_normalize_materialization_dict():
+    request = {"materialization_name": "foo", "start_time": "2022-01-01"}
+
+    assert normalize_materialization_request(request) == {
+        "materialization_name": "foo",
+        "start_time": "2022-01-01",
+        "end_time": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "request_", [{}, {"start_time": "2022-01-01"}, {"name": "foo"}, 42]
+)
+def test_normalize_invalid_materialization_raises(request_):
+    with pytest.raises(MetricFlowFailureException, match="Invalid materialization"):
+        normalize_materialization_request(request_)
+
+
+def test_materialize_concurrently_returns_results_and_errors_in_order():
+    client = MetricFlowClientMock()
+    requests = [
+        normalize_materialization_request(name) for name in ("foo", "broken", "bar")
+    ]
+
+    results = materialize_concurrently(client, requests, max_parallelism=2)
+
+    assert results[0] == ("foo", None, None)
+    assert isinstance(results[1], ValueError)
+    assert results[2] == ("bar", None, None)
+
+
+def test_materialize_concurrently_bounds_parallelism():
+    client = MetricFlowClientMock()
+    requests = [normalize_materialization_request(str(i)) for i in range(8)]
+
+    materialize_concurrently(client, requests, max_parallelism=3)
+
+    assert client.max_running <= 3
+
+
+def partitioned_client_mock(failing_start_time=None):
+    def query(metrics, dimensions, start_time, end_time, as_table):
+        if start_time == failing_start_time:
+            raise ValueError("Query timed out!")
+
+    client = mock.Mock(system_schema="mf")
+    client.list_materializations.return_value = [
+        SimpleNamespace(
+            name="foo",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+    client.user_configured_model.metrics = [
+        SimpleNamespace(name="revenue", type="measure_proxy"),
+        SimpleNamespace(name="cumulative_revenue", type="cumulative"),
+    ]
+    client.query.side_effect = query
+    return client
+
+
+def test_get_partition_table():
+    table = SqlTable(schema_name="mf", table_name="foo")
+
+    assert get_partition_table(table, "2022-01-01T00:00:00").sql == "mf.foo__p20220101"
+    assert (
+        get_partition_table(table, "2022-01-01T12:00:00").sql
+        == "mf.foo__p20220101120000000000"
+    )
+    assert (
+        get_partition_table(table, "2022-01-01T00:00:00", run_id="r1").sql
+        == "mf.foo__p20220101_r1"
+    )
+
+
+def test_materialize_partitioned_merges_partitions():
+    client = partitioned_client_mock()
+
+    table = materialize_partitioned(
+        client,
+        materialization_name="foo",
+        start_time="2022-01-01",
+        end_time="2022-01-03",
+        partition_grain="day",
+        max_workers=2,
+    )
+
+    assert table.sql == "mf.foo"
+    assert sorted(call.kwargs["as_table"] for call in client.query.call_args_list) == [
+        "mf.foo__p20220101_r1",
+        "mf.foo__p20220102_r1",
+        "mf.foo__p20220103_r1",
+    ]
+    assert client.sql_client.create_table_as_select.call_args_list == [
+        mock.call(
+            SqlTable(schema_name="mf", table_name="foo__merge_r1"),
+            select_query="SELECT * FROM mf.foo__p20220101_r1\nUNION ALL\n"
+            "SELECT * FROM mf.foo__p20220102_r1\nUNION ALL\n"
+            "SELECT * FROM mf.foo__p20220103_r1",
+        ),
+        mock.call(table, select_query="SELECT * FROM mf.foo__merge_r1"),
+    ]
+    client.sql_client.drop_table.assert_any_call(
+        SqlTable(schema_name="mf", table_name="foo__p20220103_r1")
+    )
+
+
+def test_materialize_partitioned_merge_failure_keeps_table():
+    client = partitioned_client_mock()
+    client.sql_client.create_table_as_select.side_effect = ValueError("Disk full!")
+
+    with pytest.raises(ValueError, match="Disk full!"):
+        materialize_partitioned(
+            client,
+            materialization_name="foo",
+            start_time="2022-01-01",
+            end_time="2022-01-03",
+            partition_grain="day",
+        )
+
+    dropped_tables = [call.args[0] for call in client.sql_client.drop_table.mock_calls]
+    assert SqlTable(schema_name="mf", table_name="foo") not in dropped_tables
+    assert SqlTable(schema_name="mf", table_name="foo__merge_r1") in dropped_tables
+    assert SqlTable(schema_name="mf", table_name="foo__p20220101_r1") in dropped_tables
+
+
+def test_merge_partitions_keeps_staging_table_if_table_cannot_be_created():
+    client = mock.MagicMock()
+    client.sql_client.create_table_as_select.side_effect = [
+        None,
+        ValueError("Disk full!"),
+    ]
+    table = SqlTable(schema_name="mf", table_name="foo")
+    partition_tables = [SqlTable(schema_name="mf", table_name="foo__p20220101_r1")]
+
+    with pytest.raises(MetricFlowFailureException, match="mf.foo__merge_r1"):
+        merge_partitions(client, table, partition_tables, run_id="r1")
+
+    client.sql_client.drop_table.assert_called_once_with(table)
+
+
+def test_materialize_partitioned_uses_tables_of_its_own_run():
+    client = partitioned_client_mock()
+    with mock.patch(
+        "prefect_metricflow.materializations.new_run_id", side_effect=["r1", "r2"]
+    ):
+        for _ in range(2):
+            materialize_partitioned(
+                client,
+                materialization_name="foo",
+                start_time="2022-01-01",
+                end_time="2022-01-01",
+                partition_grain="day",
+            )
+
+    assert [call.kwargs["as_table"] for call in client.query.call_args_list] == [
+        "mf.foo__p20220101_r1",
+        "mf.foo__p20220101_r2",
+    ]
+
+
+@pytest.mark.parametrize(
+    "metrics, dimensions, partition_grain",
+    [
+        (["revenue"], ["country"], "day"),
+        (["revenue"], ["metric_time__week"], "month"),
+        (["revenue"], ["metric_time__month"], "week"),
+        (["cumulative_revenue"], ["metric_time__day"], "day"),
+    ],
+)
+def test_materialize_partitioned_unpartitionable_materialization_raises(
+    metrics, dimensions, partition_grain
+):
+    client = partitioned_client_mock()
+    client.list_materializations.return_value[0].metrics = metrics
+    client.list_materializations.return_value[0].dimensions = dimensions
+
+    with pytest.raises(MetricFlowFailureException, match="cannot be built in"):
+        materialize_partitioned(
+            client,
+            materialization_name="foo",
+            start_time="2022-01-01",
+            end_time="2022-03-01",
+            partition_grain=partition_grain,
+        )
+
+    client.query.assert_not_called()
+
+
+def test_materialize_partitioned_failure_drops_partitions():
+    client = partitioned_client_mock(failing_start_time="2022-01-02T00:00:00")
+
+    with pytest.raises(MetricFlowFailureException, match="1 of 3 partitions"):
+        materialize_partitioned(
+            client,
+            materialization_name="foo",
+            start_time="2022-01-01",
+            end_time="2022-01-03",
+            partition_grain="day",
+        )
+
+    client.sql_client.create_table_as_select.assert_not_called()
+    assert client.sql_client.drop_table.call_count == 3
+
+
+def test_materialize_partitioned_unknown_materialization_raises():
+    client = partitioned_client_mock()
+
+    with pytest.raises(MetricFlowFailureException, match="Unable to find"):
+        materialize_partitioned(
+            client,
+            materialization_name="bar",
+            start_time="2022-01-01",
+            end_time="2022-01-03",
+            partition_grain="day",
+        )
+
+
+class InMemoryWatermarkStore(WatermarkStore):
+    def __init__(self, watermarks=None):
+        self.watermarks = dict(watermarks or {})
+
+    def get(self, key):
+        return self.watermarks.get(key)
+
+    def set(self, key, watermark):
+        self.watermarks[key] = watermark
+
+    def delete(self, key):
+        return self.watermarks.pop(key, None) is not None
+
+
+def test_materialize_incremental_first_run_builds_everything():
+    client = partitioned_client_mock()
+    client.materialize.return_value = SqlTable(schema_name="mf", table_name="foo")
+    store = InMemoryWatermarkStore()
+
+    table = materialize_incremental(
+        client,
+        materialization_name="foo",
+        watermark_store=store,
+        watermark_key="foo:key",
+        start_time="2022-01-01",
+        end_time="2022-01-03",
+    )
+
+    assert table.sql == "mf.foo"
+    client.materialize.assert_called_once_with(
+        materialization_name="foo",
+        start_time="2022-01-01",
+        end_time="2022-01-03T00:00:00",
+    )
+    assert store.get("foo:key") == "2022-01-03T00:00:00"
+
+
+def test_materialize_incremental_builds_from_watermark():
+    client = partitioned_client_mock()
+    client.sql_client.table_exists.return_value = True
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-03T00:00:00"})
+
+    table = materialize_incremental(
+        client,
+        materialization_name="foo",
+        watermark_store=store,
+        watermark_key="foo:key",
+        end_time="2022-01-05",
+        lookback=timedelta(days=1),
+    )
+
+    assert table.sql == "mf.foo"
+    client.materialize.assert_not_called()
+    client.query.assert_called_once_with(
+        metrics=["revenue"],
+        dimensions=["metric_time"],
+        start_time="2022-01-02T00:00:00",
+        end_time="2022-01-05T00:00:00",
+        as_table="mf.foo__incremental_r1",
+    )
+    assert [call.args[0] for call in client.sql_client.execute.call_args_list] == [
+        "DELETE FROM mf.foo WHERE metric_time >= '2022-01-02 00:00:00'",
+        "INSERT INTO mf.foo SELECT * FROM mf.foo__incremental_r1",
+    ]
+    client.sql_client.drop_table.assert_called_with(
+        SqlTable(schema_name="mf", table_name="foo__incremental_r1")
+    )
+    assert store.get("foo:key") == "2022-01-05T00:00:00"
+
+
+def sqlite_monthly_client_mock():
+    import sqlite3
+
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.executescript(
+        """
+        CREATE TABLE facts (ds TEXT, revenue REAL);
+        INSERT INTO facts VALUES ('2022-01-10', 1.0), ('2022-01-20', 2.0),
+            ('2022-02-10', 3.0), ('2022-03-10', 4.0);
+        CREATE TABLE foo AS
+        SELECT '2022-01-01 00:00:00' AS metric_time__month, 3.0 AS revenue;
+        """
+    )
+
+    def query(metrics, dimensions, start_time, end_time, as_table):
+        # Like MetricFlow, the time range is widened to whole months
+        connection.execute(
+            f"CREATE TABLE {as_table.split('.')[-1]} AS "
+            "SELECT strftime('%Y-%m-01 00:00:00', ds) AS metric_time__month, "
+            "SUM(revenue) AS revenue FROM facts "
+            "WHERE ds >= strftime('%Y-%m-01', ?) AND ds <= ? "
+            "GROUP BY 1",
+            (start_time, end_time),
+        )
+
+    def execute(sql):
+        connection.execute(sql.replace("mf.", ""))
+
+    client = partitioned_client_mock()
+    client.list_materializations.return_value[0].dimensions = ["metric_time__month"]
+    client.query.side_effect = query
+    client.sql_client.table_exists.return_value = True
+    client.sql_client.execute.side_effect = execute
+    client.sql_client.drop_table.side_effect = lambda table: connection.execute(
+        f"DROP TABLE IF EXISTS {table.table_name}"
+    )
+    return client, connection
+
+
+def test_materialize_incremental_replaces_period_of_unaligned_watermark():
+    client, connection = sqlite_monthly_client_mock()
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-15T06:00:00"})
+
+    materialize_incremental(
+        client,
+        materialization_name="foo",
+        watermark_store=store,
+        watermark_key="foo:key",
+        end_time="2022-03-31",
+        time_column="metric_time__month",
+    )
+
+    assert client.query.call_args.kwargs["start_time"] == "2022-01-01T00:00:00"
+    assert connection.execute(
+        "SELECT metric_time__month, revenue FROM foo ORDER BY 1"
+    ).fetchall() == [
+        ("2022-01-01 00:00:00", 3.0),
+        ("2022-02-01 00:00:00", 3.0),
+        ("2022-03-01 00:00:00", 4.0),
+    ]
+
+
+def test_materialize_incremental_unsupported_time_grain_raises():
+    client = partitioned_client_mock()
+    client.list_materializations.return_value[0].dimensions = ["metric_time__quarter"]
+    client.sql_client.table_exists.return_value = True
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-03T00:00:00"})
+
+    with pytest.raises(MetricFlowFailureException, match="incrementally"):
+        materialize_incremental(
+            client,
+            materialization_name="foo",
+            watermark_store=store,
+            watermark_key="foo:key",
+            end_time="2022-06-30",
+        )
+
+    client.query.assert_not_called()
+
+
+def test_materialize_incremental_end_before_watermark_raises():
+    client = partitioned_client_mock()
+    client.sql_client.table_exists.return_value = True
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-03T00:00:00"})
+
+    with pytest.raises(MetricFlowFailureException, match="before its watermark"):
+        materialize_incremental(
+            client,
+            materialization_name="foo",
+            watermark_store=store,
+            watermark_key="foo:key",
+            end_time="2022-01-02",
+        )
+
+    client.query.assert_not_called()
+    client.sql_client.execute.assert_not_called()
+    assert store.get("foo:key") == "2022-01-03T00:00:00"
+
+
+def test_materialize_incremental_failure_keeps_watermark():
+    client = partitioned_client_mock(failing_start_time="2022-01-03T00:00:00")
+    client.sql_client.table_exists.return_value = True
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-03T00:00:00"})
+
+    with pytest.raises(ValueError, match="Query timed out!"):
+        materialize_incremental(
+            client,
+            materialization_name="foo",
+            watermark_store=store,
+            watermark_key="foo:key",
+            end_time="2022-01-05",
+        )
+
+    client.sql_client.execute.assert_not_called()
+    assert store.get("foo:key") == "2022-01-03T00:00:00"
+
+
+def test_materialize_incremental_rebuilds_missing_table():
+    client = partitioned_client_mock()
+    client.sql_client.table_exists.return_value = False
+    store = InMemoryWatermarkStore({"foo:key": "2022-01-03T00:00:00"})
+
+    materialize_incremental(
+        client,
+        materialization_name="foo",
+        watermark_store=store,
+        watermark_key="foo:key",
+        start_time="2022-01-01",
+        end_time="2022-01-05",
+    )
+
+    client.materialize.assert_called_once()
+    client.sql_client.execute.assert_not_called()
+    assert store.get("foo:key") == "2022-01-05T00:00:00"
+
+
+def test_drop_materialization_tables():
+    client = partitioned_client_mock()
+    client.list_materializations.return_value.append(
+        SimpleNamespace(
+            name="bar",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=SqlTable(schema_name="dst", table_name="bar"),
+        )
+    )
+
+    dropped = drop_materialization_tables(client, ["foo", "bar", "foo"], 2)
+
+    assert dropped == {
+        "foo": SqlTable(schema_name="mf", table_name="foo"),
+        "bar": SqlTable(schema_name="dst", table_name="bar"),
+    }
+    client.list_materializations.assert_called_once()
+    client.sql_client.table_exists.assert_not_called()
+    assert sorted(
+        call.args[0].sql for call in client.sql_client.drop_table.call_args_list
+    ) == ["dst.bar", "mf.foo"]
+
+
+def test_drop_materialization_tables_unknown_name_drops_nothing():
+    client = partitioned_client_mock()
+
+    with pytest.raises(MetricFlowFailureException, match=r"\['bar'\]"):
+        drop_materialization_tables(client, ["foo", "bar"])
+
+    client.sql_client.drop_table.assert_not_called()
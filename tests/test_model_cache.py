@@ -0,0 +1,208 @@
+import os
+from unittest import mock
+
+import pytest
+from metricflow.engine.utils import build_user_configured_model_from_config
+from metricflow.errors.errors import ModelCreationException
+
+from prefect_metricflow.clients import InMemoryConfigHandler
+from prefect_metricflow.model_cache import (
+    MODEL_CACHE_FILE_NAME,
+    IncrementalModelLoader,
+    build_model_manifest,
+    get_manifest_digest,
+    iter_model_files,
+    load_user_configured_model,
+    parse_model_file,
+)
+
+DATA_SOURCE_YAML = """
+data_source:
+  name: transactions
+  sql_table: demo.transactions
+  measures:
+    - name: revenue
+      expr: amount
+      agg: sum
+  dimensions:
+    - name: ds
+      type: time
+      type_params:
+        is_primary: true
+        time_granularity: day
+  identifiers:
+    - name: transaction
+      type: primary
+      expr: id
+  mutability:
+    type: immutable
+"""
+
+METRIC_YAML = """
+metric:
+  name: revenue
+  type: measure_proxy
+  type_params:
+    measure: revenue
+"""
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    model_path = tmp_path / "models"
+    (model_path / "metrics").mkdir(parents=True)
+    (model_path / "metrics" / "revenue.yaml").write_text(METRIC_YAML)
+    (model_path / "data_sources.yml").write_text(DATA_SOURCE_YAML)
+    (model_path / ".hidden.yaml").write_text("metric: {}")
+    (model_path / "README.md").write_text("# Models")
+    return model_path
+
+
+def test_iter_model_files_skips_hidden_and_non_yaml_files(model_path):
+    relative_paths = [path for path, _ in iter_model_files(str(model_path))]
+
+    assert relative_paths == [
+        "data_sources.yml",
+        os.path.join("metrics", "revenue.yaml"),
+    ]
+
+
+def test_manifest_digest_ignores_mtime(model_path):
+    manifest = build_model_manifest(str(model_path))
+    os.utime(model_path / "data_sources.yml", (0, 0))
+
+    touched_manifest = build_model_manifest(str(model_path))
+
+    assert touched_manifest != manifest
+    assert get_manifest_digest(touched_manifest) == get_manifest_digest(manifest)
+
+
+def test_manifest_reuses_hash_of_unchanged_files(model_path):
+    manifest = build_model_manifest(str(model_path))
+    manifest["data_sources.yml"]["sha256"] = "foo"
+
+    new_manifest = build_model_manifest(str(model_path), previous_manifest=manifest)
+
+    assert new_manifest["data_sources.yml"]["sha256"] == "foo"
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file", wraps=parse_model_file)
+def test_load_model_uses_cache(parse_mock, model_path, tmp_path):
+    cache_dir = str(tmp_path / "mf_config_dir")
+
+    model = IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+
+    assert os.path.isfile(os.path.join(cache_dir, MODEL_CACHE_FILE_NAME))
+    assert IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load() == model
+    assert parse_mock.call_count == 2
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file", wraps=parse_model_file)
+def test_load_model_parses_only_changed_files(parse_mock, model_path):
+    loader = IncrementalModelLoader(str(model_path))
+    loader.load()
+
+    (model_path / "data_sources.yml").write_text(
+        DATA_SOURCE_YAML.replace("demo.transactions", "demo.sales")
+    )
+    loader.load()
+
+    assert parse_mock.call_count == 3
+    parse_mock.assert_called_with(str(model_path / "data_sources.yml"))
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file", wraps=parse_model_file)
+def test_load_model_reuses_parse_results_from_disk(parse_mock, model_path, tmp_path):
+    cache_dir = str(tmp_path / "mf_config_dir")
+    IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+
+    (model_path / "metrics" / "revenue.yaml").write_text(
+        METRIC_YAML.replace("name: revenue", "name: sales")
+    )
+    IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+
+    assert parse_mock.call_count == 3
+    parse_mock.assert_called_with(str(model_path / "metrics" / "revenue.yaml"))
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file", wraps=parse_model_file)
+def test_load_model_rebuilds_on_corrupted_cache(parse_mock, model_path, tmp_path):
+    cache_dir = tmp_path / "mf_config_dir"
+    cache_dir.mkdir()
+    (cache_dir / MODEL_CACHE_FILE_NAME).write_bytes(b"not a pickle")
+
+    load_user_configured_model(str(model_path), str(cache_dir))
+
+    assert parse_mock.call_count == 2
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file", wraps=parse_model_file)
+def test_load_model_ignores_cache_writable_by_other_users(
+    parse_mock, model_path, tmp_path
+):
+    cache_dir = str(tmp_path / "mf_config_dir")
+    IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+    os.chmod(os.path.join(cache_dir, MODEL_CACHE_FILE_NAME), 0o666)
+
+    with mock.patch("prefect_metricflow.model_cache.pickle.load") as load_mock:
+        IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+
+    load_mock.assert_not_called()
+    assert parse_mock.call_count == 4
+
+
+@mock.patch("prefect_metricflow.model_cache.parse_model_file")
+def test_load_model_raises_on_invalid_file(parse_mock, model_path):
+    parse_mock.side_effect = ValueError("Invalid model file")
+
+    with pytest.raises(ModelCreationException):
+        IncrementalModelLoader(str(model_path)).load()
+
+
+def test_load_model_matches_metricflow(model_path, tmp_path):
+    cache_dir = str(tmp_path / "mf_config_dir")
+    handler = InMemoryConfigHandler(config={"model_path": str(model_path)})
+
+    model = IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load()
+
+    assert model == build_user_configured_model_from_config(handler)
+    assert [metric.name for metric in model.metrics] == ["revenue"]
+    assert IncrementalModelLoader(str(model_path), cache_dir=cache_dir).load() == (
+        model
+    )
+
+
+def test_load_model_raises_on_parse_issues(model_path):
+    (model_path / "metrics" / "revenue.yaml").write_text("metric:\n  name: [revenue")
+
+    with pytest.raises(ModelCreationException):
+        IncrementalModelLoader(str(model_path)).load()
+
+
+def test_load_model_raises_on_validation_issues(model_path):
+    (model_path / "metrics" / "revenue.yaml").write_text(
+        METRIC_YAML.replace("measure: revenue", "measure: unknown")
+    )
+
+    with pytest.raises(ModelCreationException):
+        IncrementalModelLoader(str(model_path)).load()
+
+
+def test_load_model_keeps_cache_on_invalid_edit(model_path, tmp_path):
+    cache_dir = str(tmp_path / "mf_config_dir")
+    cache_file_path = os.path.join(cache_dir, MODEL_CACHE_FILE_NAME)
+    loader = IncrementalModelLoader(str(model_path), cache_dir=cache_dir)
+    model = loader.load()
+    with open(cache_file_path, "rb") as f:
+        cache_content = f.read()
+
+    (model_path / "metrics" / "revenue.yaml").write_text(
+        METRIC_YAML.replace("measure: revenue", "measure: unknown")
+    )
+    with pytest.raises(ModelCreationException):
+        loader.load()
+
+    with open(cache_file_path, "rb") as f:
+        assert f.read() == cache_content
+    (model_path / "metrics" / "revenue.yaml").write_text(METRIC_YAML)
+    assert loader.load() == model
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.partitions import parse_time, split_time_range
+
+
+def test_split_time_range_by_day():
+    assert split_time_range("2022-01-30", "2022-02-01", "day") == [
+        ("2022-01-30T00:00:00", "2022-01-30T23:59:59.999999"),
+        ("2022-01-31T00:00:00", "2022-01-31T23:59:59.999999"),
+        ("2022-02-01T00:00:00", "2022-02-01T00:00:00"),
+    ]
+
+
+def test_split_time_range_by_week_aligns_on_monday():
+    assert split_time_range("2022-01-05", "2022-01-12T12:00:00", "week") == [
+        ("2022-01-05T00:00:00", "2022-01-09T23:59:59.999999"),
+        ("2022-01-10T00:00:00", "2022-01-12T12:00:00"),
+    ]
+
+
+def test_split_time_range_by_month_across_years():
+    assert split_time_range("2021-12-15", "2022-02-10", "month") == [
+        ("2021-12-15T00:00:00", "2021-12-31T23:59:59.999999"),
+        ("2022-01-01T00:00:00", "2022-01-31T23:59:59.999999"),
+        ("2022-02-01T00:00:00", "2022-02-10T00:00:00"),
+    ]
+
+
+def test_split_time_range_with_invalid_grain_raises():
+    with pytest.raises(MetricFlowFailureException, match="Invalid partition grain"):
+        split_time_range("2022-01-01", "2022-02-01", "year")
+
+
+def test_split_time_range_with_invalid_timestamp_raises():
+    with pytest.raises(MetricFlowFailureException, match="not a valid iso8601"):
+        split_time_range("yesterday", "2022-02-01", "day")
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2022-01-01T12:00:00Z", "2022-01-01T14:00:00+02:00", "20220101T120000"],
+)
+def test_parse_time_accepts_iso8601_forms(value):
+    assert parse_time(value) == datetime(2022, 1, 1, 12)
+
+
+def test_split_time_range_with_inverted_range_raises():
+    with pytest.raises(MetricFlowFailureException, match="Invalid time range"):
+        split_time_range("2022-02-01", "2022-01-01", "day")
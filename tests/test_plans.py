@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.plans import (
+    get_query_plan,
+    has_cumulative_metric,
+    run_planned_query,
+)
+from prefect_metricflow.queries import normalize_query_spec
+
+
+def plan_client_mock():
+    client = mock.Mock()
+    client.explain.side_effect = lambda **kwargs: SimpleNamespace(
+        rendered_sql=SimpleNamespace(
+            sql_query=f"SELECT {', '.join(kwargs['metrics'])}",
+            bind_parameters="params",
+        )
+    )
+    client.user_configured_model.metrics = [
+        SimpleNamespace(name="revenue", type=SimpleNamespace(value="measure_proxy")),
+        SimpleNamespace(name="revenue_mtd", type=SimpleNamespace(value="CUMULATIVE")),
+    ]
+    return client
+
+
+def test_has_cumulative_metric():
+    client = plan_client_mock()
+
+    assert not has_cumulative_metric(client, normalize_query_spec(metrics=["revenue"]))
+    assert has_cumulative_metric(
+        client, normalize_query_spec(metrics=["revenue", "Revenue_MTD"])
+    )
+
+
+def test_get_query_plan_plans_once_per_key():
+    client = plan_client_mock()
+    cache = QueryResultCache()
+    spec = normalize_query_spec(metrics=["revenue"])
+
+    first = get_query_plan(client, spec, "key", cache)
+    second = get_query_plan(client, spec, "key", cache)
+    get_query_plan(client, spec, "other", cache)
+
+    assert first.sql_query == "SELECT revenue"
+    assert second is first
+    assert client.explain.call_count == 2
+
+
+def test_run_planned_query_executes_cached_sql():
+    client = plan_client_mock()
+    cache = QueryResultCache()
+    spec = normalize_query_spec(metrics=["revenue"])
+
+    run_planned_query(client, spec, "key", cache)
+    result = run_planned_query(client, spec, "key", cache)
+
+    assert result is client.sql_client.query.return_value
+    client.explain.assert_called_once()
+    client.query.assert_not_called()
+    client.sql_client.query.assert_called_with(
+        "SELECT revenue", sql_bind_parameters="params"
+    )
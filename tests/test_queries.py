@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from prefect_metricflow.caching import DiskQueryResultCache
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.queries import (
+    get_query_key,
+    normalize_query_spec,
+    run_cached_query,
+)
+
+
+def query_client_mock():
+    client = mock.Mock()
+    client.query.side_effect = lambda **kwargs: SimpleNamespace(
+        result_df=pd.DataFrame({"revenue": [client.query.call_count]})
+    )
+    return client
+
+
+def test_normalize_query_spec():
+    spec = normalize_query_spec(
+        metrics=[" Revenue "],
+        dimensions=["metric_time"],
+        start_time="2022-01-01",
+        where=" country = 'IT' ",
+    )
+
+    assert spec == {
+        "metrics": ["revenue"],
+        "dimensions": ["metric_time"],
+        "limit": None,
+        "start_time": "2022-01-01T00:00:00",
+        "end_time": None,
+        "where": "country = 'IT'",
+        "order": [],
+    }
+    assert get_query_key(spec, "fingerprint") == get_query_key(
+        normalize_query_spec(
+            metrics=["revenue"],
+            dimensions=["METRIC_TIME"],
+            start_time="2022-01-01T00:00:00",
+            where="country = 'IT'",
+        ),
+        "fingerprint",
+    )
+    assert get_query_key(spec, "fingerprint") != get_query_key(spec, "other")
+
+
+def test_normalize_query_spec_with_invalid_time_raises():
+    with pytest.raises(MetricFlowFailureException, match="not a valid iso8601"):
+        normalize_query_spec(metrics=["revenue"], end_time="tomorrow")
+
+
+def test_run_cached_query_in_memory():
+    client = query_client_mock()
+    spec = normalize_query_spec(metrics=["revenue"])
+
+    first = run_cached_query(client, spec, key="foo", ttl=60)
+    second = run_cached_query(client, spec, key="foo", ttl=60)
+    uncached = run_cached_query(client, spec, key="foo", ttl=0)
+
+    assert first["revenue"].tolist() == second["revenue"].tolist() == [1]
+    assert uncached["revenue"].tolist() == [2]
+    client.query.assert_called_with(
+        metrics=["revenue"],
+        dimensions=[],
+        limit=None,
+        start_time=None,
+        end_time=None,
+        where=None,
+        order=None,
+    )
+
+
+def test_run_cached_query_on_disk(tmp_path):
+    spec = normalize_query_spec(metrics=["revenue"])
+    disk_cache = DiskQueryResultCache(str(tmp_path))
+    run_cached_query(
+        query_client_mock(), spec, key="foo", ttl=0, disk_cache=disk_cache, disk_ttl=60
+    )
+
+    client = query_client_mock()
+    result = run_cached_query(
+        client, spec, key="foo", ttl=60, disk_cache=disk_cache, disk_ttl=60
+    )
+
+    assert result["revenue"].tolist() == [1]
+    client.query.assert_not_called()
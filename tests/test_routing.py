@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from metricflow.dataflow.sql_table import SqlTable
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.queries import normalize_query_spec
+from prefect_metricflow.routing import (
+    SQLiteMaterializationRegistry,
+    covers_query,
+    get_routed_sql,
+    run_routed_query,
+)
+
+
+def make_build(**kwargs):
+    return {
+        "materialization_name": "daily_revenue",
+        "table_name": "foo.daily_revenue",
+        "metrics": ["revenue", "orders"],
+        "dimensions": ["metric_time", "country"],
+        "start_time": "2022-01-01T00:00:00",
+        "end_time": "2022-12-31T00:00:00",
+        "built_at": datetime.utcnow().isoformat(),
+        **kwargs,
+    }
+
+
+def make_spec(**kwargs):
+    return normalize_query_spec(
+        **{
+            "metrics": ["revenue"],
+            "dimensions": ["country", "metric_time"],
+            "start_time": "2022-03-01",
+            "end_time": "2022-03-31",
+            **kwargs,
+        }
+    )
+
+
+def test_sqlite_materialization_registry(tmp_path):
+    registry = SQLiteMaterializationRegistry(str(tmp_path / "materializations.db"))
+    materialization = SimpleNamespace(
+        name="daily_revenue", metrics=["Revenue"], dimensions=["metric_time"]
+    )
+
+    registry.record(
+        "fp",
+        materialization,
+        SqlTable(schema_name="foo", table_name="bar"),
+        "2022-01-01",
+        "2022-02-01",
+    )
+
+    build = registry.get("fp", "daily_revenue")
+    assert build["table_name"] == "foo.bar"
+    assert build["metrics"] == ["revenue"]
+    assert build["start_time"] == "2022-01-01T00:00:00"
+    assert registry.get("other", "daily_revenue") is None
+    assert registry.delete("fp", "daily_revenue") is True
+    assert registry.list("fp") == []
+
+
+def test_covers_query():
+    assert covers_query(make_build(), make_spec())
+    assert covers_query(make_build(start_time=None, end_time=None), make_spec())
+    assert covers_query(make_build(), make_spec(metrics=["orders", "revenue"]))
+    # MetricFlow widens the start to the start of the day
+    assert covers_query(make_build(), make_spec(start_time="2022-01-01T12:00:00"))
+
+    assert not covers_query(make_build(), make_spec(metrics=["visits"]))
+    assert not covers_query(make_build(), make_spec(dimensions=["metric_time"]))
+    assert not covers_query(make_build(), make_spec(start_time="2021-12-31"))
+    assert not covers_query(make_build(), make_spec(end_time="2023-01-01"))
+    assert not covers_query(make_build(), make_spec(end_time=None))
+    assert not covers_query(make_build(), make_spec(where="country = 'IT'"))
+    assert not covers_query(make_build(), make_spec(order=["-orders"]))
+    assert not covers_query(
+        make_build(built_at="2022-01-01T00:00:00"),
+        make_spec(),
+        max_age=timedelta(hours=1),
+    )
+
+
+def test_get_routed_sql():
+    spec = make_spec(
+        dimensions=["metric_time__month"],
+        start_time="2022-03-15",
+        order=["-revenue"],
+        limit=10,
+    )
+
+    assert get_routed_sql(spec, SqlTable(schema_name="foo", table_name="bar")) == (
+        "SELECT metric_time__month, revenue FROM foo.bar "
+        "WHERE metric_time__month >= '2022-03-01 00:00:00' "
+        "AND metric_time__month <= '2022-03-31 00:00:00' "
+        "ORDER BY revenue DESC LIMIT 10"
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"metrics": ["revenue; DROP TABLE foo.bar"]},
+        {"dimensions": ["metric_time", "country)"]},
+        {"order": ["-revenue--"]},
+    ],
+)
+def test_get_routed_sql_rejects_invalid_names(kwargs):
+    with pytest.raises(MetricFlowFailureException, match="Invalid"):
+        get_routed_sql(
+            make_spec(**kwargs), SqlTable(schema_name="foo", table_name="bar")
+        )
+
+
+def test_run_routed_query_skips_dropped_tables():
+    client = mock.Mock()
+    client.sql_client.table_exists.side_effect = lambda table: (
+        table.table_name == "old_revenue"
+    )
+    builds = [
+        make_build(table_name="foo.new_revenue"),
+        make_build(table_name="foo.old_revenue"),
+    ]
+
+    result = run_routed_query(client, make_spec(), builds)
+
+    assert result is client.sql_client.query.return_value
+    assert "FROM foo.old_revenue" in client.sql_client.query.call_args.args[0]
+    assert run_routed_query(client, make_spec(metrics=["visits"]), builds) is None
@@ -0,0 +1,146 @@
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from metricflow.model.objects.metric import MetricInputMeasure
+
+from prefect_metricflow.scheduling import (
+    get_conflicts,
+    get_materialization_inputs,
+    materialize_grouped,
+    run_without_conflicts,
+)
+
+
+def input_measure(name):
+    return MetricInputMeasure(name=name) if name else None
+
+
+def metric(name, measure=None, measures=None, numerator=None, denominator=None):
+    return SimpleNamespace(
+        name=name,
+        type_params=SimpleNamespace(
+            measure=input_measure(measure),
+            measures=[input_measure(m) for m in measures] if measures else None,
+            numerator=input_measure(numerator),
+            denominator=input_measure(denominator),
+        ),
+    )
+
+
+def data_source(name, measures):
+    return SimpleNamespace(
+        name=name, measures=[SimpleNamespace(name=measure) for measure in measures]
+    )
+
+
+def materialization(name, metrics):
+    return SimpleNamespace(
+        name=name, metrics=metrics, dimensions=["metric_time"], destination_table=None
+    )
+
+
+def scheduling_client_mock():
+    client = mock.Mock()
+    client.user_configured_model = SimpleNamespace(
+        metrics=[
+            metric("revenue", measure="revenue"),
+            metric("orders", measure="orders"),
+            metric("aov", numerator="revenue", denominator="orders"),
+            metric("visits", measures=["visits"]),
+        ],
+        data_sources=[
+            data_source("transactions", ["revenue", "orders"]),
+            data_source("sessions", ["visits"]),
+        ],
+    )
+    client.list_materializations.return_value = [
+        materialization("revenue_daily", ["revenue"]),
+        materialization("orders_daily", ["orders"]),
+        materialization("aov_daily", ["aov"]),
+        materialization("visits_daily", ["visits"]),
+    ]
+    return client
+
+
+def test_get_materialization_inputs():
+    inputs = get_materialization_inputs(
+        scheduling_client_mock(), ["aov_daily", "visits_daily", "unknown"]
+    )
+
+    assert inputs == {
+        "aov_daily": {
+            "measure:revenue",
+            "measure:orders",
+            "data_source:transactions",
+        },
+        "visits_daily": {"measure:visits", "data_source:sessions"},
+        "unknown": set(),
+    }
+
+
+def test_get_conflicts():
+    conflicts = get_conflicts(
+        [
+            {"measure:a", "data_source:x"},
+            {"measure:c", "data_source:y"},
+            {"measure:a", "measure:b", "data_source:x"},
+            {"measure:b", "data_source:x"},
+            set(),
+        ]
+    )
+
+    assert conflicts == [{2, 3}, set(), {0, 3}, {0, 2}, set()]
+
+
+def test_run_without_conflicts_runs_chain_ends_concurrently():
+    # A shares an input with B, and B with C, but A and C share nothing
+    inputs = [{"measure:a"}, {"measure:a", "measure:b"}, {"measure:b"}]
+    barrier = threading.Barrier(2, timeout=5)
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+
+    def run(index):
+        with lock:
+            overlaps.extend((index, other) for other in running)
+            running.add(index)
+        if index != 1:
+            # Only passes if A and C run at the same time
+            barrier.wait()
+        with lock:
+            running.discard(index)
+
+    run_without_conflicts(inputs, run, max_parallelism=2)
+
+    assert sorted(tuple(sorted(pair)) for pair in overlaps) == [(0, 2)]
+
+
+def test_materialize_grouped_builds_groups_back_to_back():
+    client = scheduling_client_mock()
+    builds = []
+    lock = threading.Lock()
+
+    def materialize(materialization_name, start_time=None, end_time=None):
+        with lock:
+            builds.append((threading.get_ident(), materialization_name))
+        if materialization_name == "unknown":
+            raise ValueError("Unable to find materialization!")
+        return materialization_name
+
+    client.materialize.side_effect = materialize
+    requests = [
+        {"materialization_name": name, "start_time": None, "end_time": None}
+        for name in ["revenue_daily", "visits_daily", "aov_daily", "unknown"]
+    ]
+
+    results = materialize_grouped(client, requests, max_parallelism=2)
+
+    assert results[:3] == ["revenue_daily", "visits_daily", "aov_daily"]
+    assert isinstance(results[3], ValueError)
+    threads = {name: ident for ident, name in builds}
+    transactions = [
+        name for _, name in builds if name in {"revenue_daily", "aov_daily"}
+    ]
+    assert transactions == ["aov_daily", "revenue_daily"]
+    assert threads["aov_daily"] == threads["revenue_daily"]
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from prefect_metricflow.caching import DiskQueryResultCache
+from prefect_metricflow.singleflight import SingleFlight, get_call_key
+
+
+def run_concurrently(fns):
+    results = [None] * len(fns)
+
+    def run(index):
+        try:
+            results[index] = fns[index]()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(fns))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_get_call_key():
+    key = get_call_key(call="materialize", materialization_name="foo")
+
+    assert key == get_call_key(materialization_name="foo", call="materialize")
+    assert key != get_call_key(call="materialize", materialization_name="bar")
+
+
+def test_single_flight_shares_concurrent_calls():
+    single_flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["result"]
+
+    results = run_concurrently([lambda: single_flight.do("foo", fn)] * 5)
+
+    assert len(calls) == 1
+    assert results == [["result"]] * 5
+    # Waiting callers receive a copy of the result
+    assert len({id(result) for result in results}) == 5
+
+
+def test_single_flight_shares_exceptions():
+    single_flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("Query timed out!")
+
+    results = run_concurrently([lambda: single_flight.do("foo", fn)] * 3)
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_single_flight_runs_sequential_calls_again():
+    single_flight = SingleFlight()
+    calls = []
+
+    single_flight.do("foo", lambda: calls.append(1))
+    single_flight.do("foo", lambda: calls.append(1))
+    single_flight.do("bar", lambda: calls.append(1))
+
+    assert len(calls) == 3
+
+
+def test_single_flight_with_file_lock_serializes_registries(tmp_path):
+    pytest.importorskip("fcntl")
+    running = []
+    overlaps = []
+
+    def fn():
+        running.append(1)
+        overlaps.append(len(running))
+        time.sleep(0.1)
+        running.pop()
+        return "result"
+
+    # Distinct registries behave like distinct processes
+    results = run_concurrently(
+        [lambda: SingleFlight().do("foo", fn, lock_dir=str(tmp_path)) for _ in range(3)]
+    )
+
+    assert results == ["result"] * 3
+    assert overlaps == [1, 1, 1]
+    assert (tmp_path / "foo.lock").exists()
+
+
+def test_single_flight_with_file_lock_shares_results(tmp_path):
+    pytest.importorskip("fcntl")
+    shared_results = DiskQueryResultCache(str(tmp_path / "results"))
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return ["result"]
+
+    def do():
+        return SingleFlight().do(
+            "foo", fn, lock_dir=str(tmp_path), shared_results=shared_results
+        )
+
+    # Calls of other processes waiting for the lock get the result of the first one
+    results = run_concurrently([do] * 3)
+
+    assert len(calls) == 1
+    assert results == [["result"]] * 3
+
+    # Later calls run again
+    assert do() == ["result"]
+    assert len(calls) == 2
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+import sqlalchemy
+
+from prefect_metricflow.exceptions import MetricFlowFailureException
+from prefect_metricflow.queries import normalize_query_spec
+from prefect_metricflow.streaming import iter_query_batches
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'dwh.db'}")
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("CREATE TABLE revenue (day INT, value INT)"))
+        connection.execute(
+            sqlalchemy.text("INSERT INTO revenue VALUES (:day, :value)"),
+            [{"day": day, "value": day * 10} for day in range(5)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_iter_query_batches(engine):
+    client = mock.Mock()
+    client.sql_client._engine = engine
+    client.explain.return_value = SimpleNamespace(
+        rendered_sql=SimpleNamespace(
+            sql_query="SELECT day, value FROM revenue WHERE day >= :min_day",
+            bind_parameters=SimpleNamespace(param_dict={"min_day": 1}),
+        )
+    )
+    spec = normalize_query_spec(metrics=["revenue"], dimensions=["metric_time"])
+
+    batches = list(iter_query_batches(client, spec, batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert list(batches[0].columns) == ["day", "value"]
+    assert batches[1]["value"].tolist() == [40]
+    client.explain.assert_called_once_with(
+        metrics=["revenue"],
+        dimensions=["metric_time"],
+        limit=None,
+        start_time=None,
+        end_time=None,
+        where=None,
+        order=None,
+    )
+
+
+def test_iter_query_batches_without_sqlalchemy_raises():
+    client = mock.Mock()
+    client.sql_client = object()
+    spec = normalize_query_spec(metrics=["revenue"])
+
+    with pytest.raises(MetricFlowFailureException, match="Streaming is not supported"):
+        next(iter_query_batches(client, spec))
@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from prefect_metricflow.caching import QueryResultCache
+from prefect_metricflow.queries import normalize_query_spec
+from prefect_metricflow.subsumption import (
+    get_range_key,
+    is_subsumable,
+    run_subsumed_query,
+)
+
+
+def daily_runner():
+    calls = []
+
+    def run(spec):
+        calls.append((spec["start_time"], spec["end_time"]))
+        # MetricFlow widens the time constraint to whole days
+        start = date.fromisoformat(spec["start_time"][:10])
+        end = date.fromisoformat(spec["end_time"][:10])
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return pd.DataFrame(
+            {
+                "metric_time__day": pd.to_datetime(days),
+                "revenue": [float(day.day) for day in days],
+            }
+        )
+
+    return run, calls
+
+
+def daily_spec(start_time, end_time):
+    return normalize_query_spec(
+        metrics=["revenue"],
+        dimensions=["metric_time__day"],
+        start_time=start_time,
+        end_time=end_time,
+        order=["metric_time__day"],
+    )
+
+
+def test_is_subsumable():
+    assert is_subsumable(daily_spec("2022-01-01", "2022-01-10"))
+    assert is_subsumable(daily_spec(None, "2022-01-10"))
+    assert not is_subsumable(daily_spec("2022-01-01T12:00:00", "2022-01-10"))
+    assert not is_subsumable({**daily_spec("2022-01-01", "2022-01-10"), "limit": 5})
+    assert not is_subsumable(
+        normalize_query_spec(metrics=["revenue"], dimensions=["metric_time"])
+    )
+
+
+def test_get_range_key_ignores_time_range():
+    assert get_range_key(daily_spec("2022-01-01", "2022-01-10"), "fp") == (
+        get_range_key(daily_spec("2022-01-05", "2022-01-06"), "fp")
+    )
+    assert get_range_key(daily_spec("2022-01-01", "2022-01-10"), "fp") != (
+        get_range_key(daily_spec("2022-01-01", "2022-01-10"), "other")
+    )
+
+
+def test_run_subsumed_query_slices_wider_result():
+    run, calls = daily_runner()
+    cache = QueryResultCache()
+    wide = daily_spec("2022-01-01", "2022-01-31")
+    narrow = daily_spec("2022-01-10", "2022-01-12")
+
+    run_subsumed_query(wide, get_range_key(wide, "fp"), cache, 60, run)
+    result = run_subsumed_query(narrow, get_range_key(narrow, "fp"), cache, 60, run)
+
+    assert len(calls) == 1
+    assert result["revenue"].tolist() == [10.0, 11.0, 12.0]
+    assert result.index.tolist() == [0, 1, 2]
+
+
+def test_run_subsumed_query_only_queries_missing_edges():
+    run, calls = daily_runner()
+    cache = QueryResultCache()
+    first = daily_spec("2022-01-10", "2022-01-20")
+    second = daily_spec("2022-01-05", "2022-01-25")
+
+    run_subsumed_query(first, get_range_key(first, "fp"), cache, 60, run)
+    result = run_subsumed_query(second, get_range_key(second, "fp"), cache, 60, run)
+
+    assert calls[1:] == [
+        ("2022-01-05T00:00:00", "2022-01-09T23:59:59.999999"),
+        ("2022-01-20T00:00:00.000001", "2022-01-25T00:00:00"),
+    ]
+    # The days repeated by the widened edges are not duplicated
+    assert result["revenue"].tolist() == [float(day) for day in range(5, 26)]
+
+    third = daily_spec("2022-01-07", "2022-01-22")
+    run_subsumed_query(third, get_range_key(third, "fp"), cache, 60, run)
+    assert len(calls) == 3
+
+
+def test_run_subsumed_query_runs_disjoint_ranges():
+    run, calls = daily_runner()
+    cache = QueryResultCache()
+    first = daily_spec("2022-01-01", "2022-01-05")
+    second = daily_spec("2022-02-01", "2022-02-03")
+
+    run_subsumed_query(first, get_range_key(first, "fp"), cache, 60, run)
+    result = run_subsumed_query(second, get_range_key(second, "fp"), cache, 60, run)
+
+    assert calls[1] == ("2022-02-01T00:00:00", "2022-02-03T00:00:00")
+    assert result["revenue"].tolist() == [1.0, 2.0, 3.0]
@@ -1,13 +1,37 @@
+import asyncio
 import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
 from typing import Dict, Optional, Union
 from unittest import mock
 
 import pytest
 from metricflow.dataflow.sql_table import SqlTable
+from metricflow.model.objects.metric import MetricInputMeasure
 from prefect import flow
 
+from prefect_metricflow.arrow import read_arrow_file
+from prefect_metricflow.clients import read_config_file
 from prefect_metricflow.exceptions import MetricFlowFailureException
-from prefect_metricflow.tasks import drop_materialization, materialize
+from prefect_metricflow.tasks import (
+    backfill,
+    drop_materialization,
+    drop_materialization_async,
+    drop_materializations,
+    explain,
+    export_materialization,
+    get_dimension_values,
+    get_dimension_values_batch,
+    list_dimensions,
+    list_metrics,
+    materialize,
+    materialize_async,
+    materialize_many,
+    query,
+    query_many,
+)
+from prefect_metricflow.utils import get_config_file_path
 
 
 class MetricFlowClientMock:
@@ -205,3 +229,832 @@ def test_drop_materialization_failure(mf_client_mock):
 
     response = test_flow()
     assert response is False
+
+
+@mock.patch.dict(
+    os.environ, {"MF_CONFIG_DIR": "/tmp/task_materialize/mf_config_dir/write_config"}
+)
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_writes_config_file_when_requested(mf_client_mock):
+
+    mf_client_mock.return_value = MetricFlowClientMock
+
+    config_file_path = get_config_file_path()
+    if os.path.exists(config_file_path):
+        os.remove(config_file_path)
+
+    @flow(name="test_flow_7")
+    def test_flow():
+        return materialize(
+            materialization_name="foo",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            write_config_file=True,
+        )
+
+    response = test_flow()
+    assert response == SqlTable(db_name="foo", schema_name="foo", table_name="foo")
+    assert os.path.isfile(config_file_path)
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_with_isolated_config(mf_client_mock, tmp_path):
+
+    mf_client_mock.return_value = MetricFlowClientMock
+
+    @flow(name="test_flow_8")
+    def test_flow():
+        return materialize(
+            materialization_name="foo",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            isolate_config=True,
+            cache_root=str(tmp_path),
+        )
+
+    with mock.patch(
+        "prefect_metricflow.clients.read_config_file", wraps=read_config_file
+    ) as read_config_file_mock:
+        response = test_flow()
+    assert response == SqlTable(db_name="foo", schema_name="foo", table_name="foo")
+    (config_dir,) = os.listdir(tmp_path / "configs")
+    config_file_path = str(tmp_path / "configs" / config_dir / "config.yml")
+    assert os.stat(os.path.dirname(config_file_path)).st_mode & 0o777 == 0o700
+    # The client is built from the isolated config file
+    read_config_file_mock.assert_called_once_with(config_file_path)
+    assert mf_client_mock.call_args.kwargs["system_schema"] == "foo"
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_async(mf_client_mock):
+
+    mf_client_mock.return_value = MetricFlowClientMock
+
+    @flow(name="test_flow_9")
+    async def test_flow():
+        return await materialize_async(
+            materialization_name="foo",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            max_concurrency=2,
+        )
+
+    response = asyncio.run(test_flow())
+    assert response == SqlTable(db_name="foo", schema_name="foo", table_name="foo")
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_drop_materialization_async(mf_client_mock):
+
+    mf_client_mock.return_value.drop_materialization.return_value = True
+
+    @flow(name="test_flow_10")
+    async def test_flow():
+        return await drop_materialization_async(
+            materialization_name="foo",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+        )
+
+    response = asyncio.run(test_flow())
+    assert response is True
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_many(mf_client_mock):
+    def materialize(materialization_name, start_time=None, end_time=None):
+        if materialization_name == "broken":
+            raise MetricFlowFailureException("Cannot build materialization!")
+        return SqlTable(
+            db_name="foo", schema_name="foo", table_name=materialization_name
+        )
+
+    mf_client_mock.return_value.materialize.side_effect = materialize
+
+    @flow(name="test_flow_11")
+    def test_flow():
+        return materialize_many(
+            materializations=[
+                "foo",
+                {"materialization_name": "bar", "start_time": "2022-01-01"},
+                "broken",
+            ],
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            max_parallelism=2,
+        )
+
+    response = test_flow()
+    assert response[0] == SqlTable(db_name="foo", schema_name="foo", table_name="foo")
+    assert response[1] == SqlTable(db_name="foo", schema_name="foo", table_name="bar")
+    assert isinstance(response[2], MetricFlowFailureException)
+    assert mf_client_mock.call_count == 1
+
+
+def test_materialize_partitioned_without_time_range_raises():
+    @flow(name="test_flow_12")
+    def test_flow():
+        return materialize(
+            materialization_name="foo",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            partition_grain="day",
+        )
+
+    with pytest.raises(MetricFlowFailureException, match="start_time and end_time"):
+        test_flow()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_incremental(mf_client_mock, tmp_path):
+
+    mfc = mf_client_mock.return_value
+    mfc.system_schema = "foo"
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(
+            name="foo",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+    mfc.materialize.return_value = SqlTable(schema_name="foo", table_name="foo")
+    mfc.sql_client.table_exists.return_value = True
+
+    @flow(name="test_flow_13")
+    def test_flow(end_time):
+        return materialize(
+            materialization_name="foo",
+            end_time=end_time,
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            incremental=True,
+            cache_root=str(tmp_path),
+        )
+
+    assert test_flow("2022-01-01") == SqlTable(schema_name="foo", table_name="foo")
+    mfc.materialize.assert_called_once()
+    mfc.query.assert_not_called()
+
+    assert test_flow("2022-01-02") == SqlTable(schema_name="foo", table_name="foo")
+    mfc.materialize.assert_called_once()
+    assert mfc.query.call_args.kwargs["start_time"] == "2022-01-01T00:00:00"
+    assert mfc.query.call_args.kwargs["end_time"] == "2022-01-02T00:00:00"
+    assert os.path.isfile(tmp_path / "watermarks.db")
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_backfill(mf_client_mock, tmp_path):
+
+    mfc = mf_client_mock.return_value
+    mfc.system_schema = "foo"
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(
+            name="foo",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+
+    @flow(name="test_flow_14")
+    def test_flow():
+        return backfill(
+            materialization_name="foo",
+            start_time="2022-01-01",
+            end_time="2022-01-07",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            cache_root=str(tmp_path),
+        )
+
+    assert test_flow() == SqlTable(schema_name="foo", table_name="foo")
+    assert mfc.query.call_count == 7
+    assert os.path.isfile(tmp_path / "backfills.db")
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_many_grouped_by_inputs(mf_client_mock):
+
+    mfc = mf_client_mock.return_value
+    mfc.user_configured_model = SimpleNamespace(metrics=[], data_sources=[])
+    mfc.list_materializations.return_value = []
+    mfc.materialize.side_effect = lambda materialization_name, **kwargs: SqlTable(
+        schema_name="foo", table_name=materialization_name
+    )
+
+    @flow(name="test_flow_15")
+    def test_flow():
+        return materialize_many(
+            materializations=["foo", "bar"],
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            group_by_inputs=True,
+        )
+
+    assert test_flow() == [
+        SqlTable(schema_name="foo", table_name="foo"),
+        SqlTable(schema_name="foo", table_name="bar"),
+    ]
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_drop_materializations(mf_client_mock):
+
+    mfc = mf_client_mock.return_value
+    mfc.system_schema = "foo"
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(name=name, destination_table=None) for name in ["foo", "bar"]
+    ]
+
+    @flow(name="test_flow_16")
+    def test_flow():
+        return drop_materializations(
+            materialization_names=["foo", "bar"],
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+        )
+
+    assert test_flow() == {
+        "foo": SqlTable(schema_name="foo", table_name="foo"),
+        "bar": SqlTable(schema_name="foo", table_name="bar"),
+    }
+    assert mfc.sql_client.drop_table.call_count == 2
+    assert mf_client_mock.call_count == 1
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_with_cache(mf_client_mock, tmp_path):
+
+    mfc = mf_client_mock.return_value
+    mfc.query.return_value = SimpleNamespace(result_df="result")
+
+    @flow(name="test_flow_17")
+    def test_flow():
+        return [
+            query(
+                metrics=["revenue"],
+                dimensions=["metric_time"],
+                config={
+                    "dwh_dialect": "redshift",
+                    "dwh_host": "localhost",
+                    "dwh_port": 5439,
+                    "dwh_user": "foo",
+                    "dwh_password": "foo",
+                    "dwh_database": "db",
+                    "dwh_schema": "foo",
+                    "model_path": "foo",
+                },
+                cache_root=str(tmp_path),
+                disk_cache_ttl=60,
+            )
+            for _ in range(2)
+        ]
+
+    assert test_flow() == ["result", "result"]
+    mfc.query.assert_called_once()
+    assert len(os.listdir(tmp_path / "query_results")) == 1
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_with_arrow_result(mf_client_mock, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pd = pytest.importorskip("pandas")
+
+    mfc = mf_client_mock.return_value
+    mfc.query.return_value = SimpleNamespace(
+        result_df=pd.DataFrame({"revenue": [1, 2]})
+    )
+    output_path = str(tmp_path / "result.parquet")
+
+    @flow(name="test_flow_18")
+    def test_flow():
+        config = {
+            "dwh_dialect": "redshift",
+            "dwh_host": "localhost",
+            "dwh_port": 5439,
+            "dwh_user": "foo",
+            "dwh_password": "foo",
+            "dwh_database": "db",
+            "dwh_schema": "foo",
+            "model_path": "foo",
+        }
+        return (
+            query(metrics=["revenue"], config=config, result_format="arrow"),
+            query(metrics=["revenue"], config=config, output_path=output_path),
+        )
+
+    table, path = test_flow()
+    assert isinstance(table, pa.Table)
+    assert table.column("revenue").to_pylist() == [1, 2]
+    assert path == output_path
+    assert os.path.isfile(output_path)
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_export_materialization(mf_client_mock, tmp_path):
+    pytest.importorskip("pyarrow")
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+
+    engine = sqlalchemy.create_engine(
+        f"sqlite:///{tmp_path / 'dwh.db'}",
+        connect_args={"check_same_thread": False},
+    )
+
+    @sqlalchemy.event.listens_for(engine, "connect")
+    def attach_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{tmp_path / 'foo.db'}' AS foo")
+
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("CREATE TABLE foo.foo (revenue INT)"))
+        connection.execute(sqlalchemy.text("INSERT INTO foo.foo VALUES (1), (2)"))
+
+    mfc = mf_client_mock.return_value
+    mfc.system_schema = "foo"
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(name="foo", destination_table=None)
+    ]
+    mfc.sql_client._engine = engine
+    output_path = str(tmp_path / "foo.arrow")
+
+    @flow(name="test_flow_19")
+    def test_flow():
+        return export_materialization(
+            materialization_name="foo",
+            output_path=output_path,
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            batch_size=1,
+        )
+
+    assert test_flow() == output_path
+    assert read_arrow_file(output_path).column("revenue").to_pylist() == [1, 2]
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_many(mf_client_mock):
+    pd = pytest.importorskip("pandas")
+
+    mfc = mf_client_mock.return_value
+    mfc.query.side_effect = lambda metrics, **kwargs: SimpleNamespace(
+        result_df=pd.DataFrame({metric: [1] for metric in metrics})
+    )
+    mfc.user_configured_model.metrics = [
+        SimpleNamespace(
+            name=name,
+            type="measure_proxy",
+            constraint=None,
+            type_params=SimpleNamespace(
+                measure=MetricInputMeasure(name=name),
+                measures=None,
+                numerator=None,
+                denominator=None,
+            ),
+        )
+        for name in ["revenue", "orders"]
+    ]
+    mfc.user_configured_model.data_sources = [
+        SimpleNamespace(
+            name="transactions",
+            measures=[SimpleNamespace(name="revenue"), SimpleNamespace(name="orders")],
+        )
+    ]
+
+    @flow(name="test_flow_20")
+    def test_flow():
+        return query_many(
+            queries=[{"metrics": ["revenue"]}, {"metrics": ["orders"]}],
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+        )
+
+    revenue, orders = test_flow()
+    assert list(revenue.columns) == ["revenue"]
+    assert list(orders.columns) == ["orders"]
+    mfc.query.assert_called_once()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_shares_identical_concurrent_builds(mf_client_mock):
+    def materialize(materialization_name, start_time=None, end_time=None):
+        time.sleep(0.2)
+        return SqlTable(schema_name="foo", table_name=materialization_name)
+
+    mfc = mf_client_mock.return_value
+    mfc.materialize.side_effect = materialize
+
+    @flow(name="test_flow_21")
+    async def test_flow():
+        return await asyncio.gather(
+            *[
+                materialize_async(
+                    materialization_name="foo",
+                    config={
+                        "dwh_dialect": "redshift",
+                        "dwh_host": "localhost",
+                        "dwh_port": 5439,
+                        "dwh_user": "foo",
+                        "dwh_password": "foo",
+                        "dwh_database": "db",
+                        "dwh_schema": "foo",
+                        "model_path": "foo",
+                    },
+                    single_flight=True,
+                )
+                for _ in range(3)
+            ]
+        )
+
+    response = asyncio.run(test_flow())
+    assert response == [SqlTable(schema_name="foo", table_name="foo")] * 3
+    mfc.materialize.assert_called_once()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_answers_narrower_time_range_from_cache(mf_client_mock):
+    pd = pytest.importorskip("pandas")
+
+    mfc = mf_client_mock.return_value
+    mfc.query.return_value = SimpleNamespace(
+        result_df=pd.DataFrame(
+            {
+                "metric_time__month": pd.to_datetime(
+                    ["2022-01-01", "2022-02-01", "2022-03-01"]
+                ),
+                "revenue": [1.0, 2.0, 3.0],
+            }
+        )
+    )
+
+    @flow(name="test_flow_22")
+    def test_flow(start_time, end_time):
+        return query(
+            metrics=["revenue"],
+            dimensions=["metric_time__month"],
+            start_time=start_time,
+            end_time=end_time,
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            subsume_time_ranges=True,
+        )
+
+    test_flow("2022-01-01", "2022-03-31")
+    result = test_flow("2022-02-01", "2022-02-28")
+    assert result["revenue"].tolist() == [2.0]
+    mfc.query.assert_called_once()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_reads_registered_materialization(mf_client_mock, tmp_path):
+    mfc = mf_client_mock.return_value
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(
+            name="daily_revenue",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+    mfc.materialize.return_value = SqlTable(
+        schema_name="foo", table_name="daily_revenue"
+    )
+    mfc.sql_client.table_exists.return_value = True
+    mfc.sql_client.query.return_value = "routed"
+    config = {
+        "dwh_dialect": "redshift",
+        "dwh_host": "localhost",
+        "dwh_port": 5439,
+        "dwh_user": "foo",
+        "dwh_password": "foo",
+        "dwh_database": "db",
+        "dwh_schema": "foo",
+        "model_path": "foo",
+    }
+
+    @flow(name="test_flow_23")
+    def test_flow():
+        materialize(
+            materialization_name="daily_revenue",
+            start_time="2022-01-01",
+            end_time="2022-12-31",
+            config=config,
+            cache_root=str(tmp_path),
+            register=True,
+        )
+        return query(
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            start_time="2022-03-01",
+            end_time="2022-03-31",
+            config=config,
+            cache_root=str(tmp_path),
+            use_materializations=True,
+        )
+
+    assert test_flow() == "routed"
+    mfc.query.assert_not_called()
+    assert "FROM foo.daily_revenue" in mfc.sql_client.query.call_args.args[0]
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_explain_materialization(mf_client_mock):
+    mfc = mf_client_mock.return_value
+    mfc.list_materializations.return_value = [
+        SimpleNamespace(
+            name="foo",
+            metrics=["revenue"],
+            dimensions=["metric_time"],
+            destination_table=None,
+        )
+    ]
+    mfc.system_schema = "bar"
+    mfc.engine.explain.return_value = SimpleNamespace(
+        rendered_sql=SimpleNamespace(
+            sql_query="CREATE TABLE bar.foo AS (SELECT 1)", bind_parameters=None
+        )
+    )
+
+    @flow(name="test_flow_24")
+    def test_flow():
+        return explain(
+            materialization_name="foo",
+            start_time="2022-01-01",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+        )
+
+    assert test_flow() == "CREATE TABLE bar.foo AS (SELECT 1)"
+    mfc.explain.assert_not_called()
+    mf_request = mfc.engine.explain.call_args.kwargs["mf_request"]
+    assert mf_request.metric_names == ["revenue"]
+    assert mf_request.group_by_names == ["metric_time"]
+    assert mf_request.time_constraint_start == datetime(2022, 1, 1)
+    assert mf_request.time_constraint_end is None
+    assert mf_request.output_table == "bar.foo"
+
+
+def test_explain_requires_metrics_or_materialization():
+    @flow(name="test_flow_25")
+    def test_flow():
+        return explain(metrics=["revenue"], materialization_name="foo")
+
+    with pytest.raises(MetricFlowFailureException, match="Exactly one of"):
+        test_flow()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_query_with_cached_plan(mf_client_mock):
+    mfc = mf_client_mock.return_value
+    mfc.user_configured_model.metrics = []
+    mfc.explain.return_value = SimpleNamespace(
+        rendered_sql=SimpleNamespace(sql_query="SELECT 1", bind_parameters=None)
+    )
+    mfc.sql_client.query.return_value = "result"
+
+    @flow(name="test_flow_26")
+    def test_flow():
+        return [
+            query(
+                metrics=["revenue"],
+                config={
+                    "dwh_dialect": "redshift",
+                    "dwh_host": "localhost",
+                    "dwh_port": 5439,
+                    "dwh_user": "foo",
+                    "dwh_password": "foo",
+                    "dwh_database": "db",
+                    "dwh_schema": "foo",
+                    "model_path": "foo",
+                },
+                cache_ttl=0,
+                cache_plans=True,
+            )
+            for _ in range(2)
+        ]
+
+    assert test_flow() == ["result", "result"]
+    mfc.explain.assert_called_once()
+    mfc.query.assert_not_called()
+    assert mfc.sql_client.query.call_count == 2
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_catalog_tasks(mf_client_mock):
+    mfc = mf_client_mock.return_value
+    mfc.list_metrics.return_value = [
+        SimpleNamespace(name="revenue", dimensions=["metric_time", "country"]),
+        SimpleNamespace(name="orders", dimensions=["metric_time"]),
+    ]
+    mfc.get_dimension_values.return_value = ["FR", "IT"]
+    config = {
+        "dwh_dialect": "redshift",
+        "dwh_host": "localhost",
+        "dwh_port": 5439,
+        "dwh_user": "foo",
+        "dwh_password": "foo",
+        "dwh_database": "db",
+        "dwh_schema": "foo",
+        "model_path": "foo",
+    }
+
+    @flow(name="test_flow_27")
+    def test_flow():
+        return (
+            list_metrics(dimension="country", config=config),
+            list_metrics(prefix="o", config=config),
+            list_dimensions(metrics=["revenue", "orders"], config=config),
+            get_dimension_values("revenue", "country", config=config),
+            get_dimension_values("Revenue", "Country", config=config),
+        )
+
+    assert test_flow() == (
+        ["revenue"],
+        ["orders"],
+        ["metric_time"],
+        ["FR", "IT"],
+        ["FR", "IT"],
+    )
+    mfc.list_metrics.assert_called_once()
+    mfc.get_dimension_values.assert_called_once()
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_get_dimension_values_batch(mf_client_mock):
+    pd = pytest.importorskip("pandas")
+
+    mfc = mf_client_mock.return_value
+    mfc.explain.return_value = SimpleNamespace(
+        rendered_sql=SimpleNamespace(
+            sql_query="SELECT 1", bind_parameters=SimpleNamespace(param_dict={})
+        )
+    )
+    mfc.sql_client.query.return_value = pd.DataFrame(
+        {"dimension_index": [0, 0, 1], "value": ["FR", "IT", "EMEA"]}
+    )
+    config = {
+        "dwh_dialect": "redshift",
+        "dwh_host": "localhost",
+        "dwh_port": 5439,
+        "dwh_user": "foo",
+        "dwh_password": "foo",
+        "dwh_database": "db",
+        "dwh_schema": "foo",
+        "model_path": "foo",
+    }
+
+    @flow(name="test_flow_28")
+    def test_flow():
+        return [
+            get_dimension_values_batch(
+                "revenue",
+                ["country", "region"],
+                max_values={" Country": 10},
+                config=config,
+            )
+            for _ in range(2)
+        ]
+
+    assert test_flow() == [{"country": ["FR", "IT"], "region": ["EMEA"]}] * 2
+    mfc.sql_client.query.assert_called_once()
+    sql = mfc.sql_client.query.call_args.args[0]
+    assert "CAST(country AS VARCHAR) AS value" in sql
+    assert sql.count("LIMIT 10") == 1
+
+
+@mock.patch("metricflow.api.metricflow_client.MetricFlowClient")
+def test_materialize_reports_phase_durations(mf_client_mock, caplog):
+    mfc = mf_client_mock.return_value
+    mfc.materialize.return_value = SqlTable(schema_name="foo", table_name="bar")
+
+    @flow(name="test_flow_29")
+    def test_flow():
+        return materialize(
+            materialization_name="bar",
+            config={
+                "dwh_dialect": "redshift",
+                "dwh_host": "localhost",
+                "dwh_port": 5439,
+                "dwh_user": "foo",
+                "dwh_password": "foo",
+                "dwh_database": "db",
+                "dwh_schema": "foo",
+                "model_path": "foo",
+            },
+            reuse_client=False,
+            single_flight=False,
+            timing_artifact=True,
+        )
+
+    test_flow()
+    (record,) = [r for r in caplog.records if hasattr(r, "phase_durations")]
+    assert record.task_name == "materialize"
+    assert {"sql_client_setup", "model_parse", "sql_planning"} <= set(
+        record.phase_durations
+    )
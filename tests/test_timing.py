@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from prefect_metricflow.timing import (
+    PhaseTimer,
+    instrument_sql_client,
+    report_phase_durations,
+    reports_phases,
+    run_in_current_context,
+    timed_phase,
+)
+
+
+def test_phase_timer_excludes_nested_phases():
+    timer = PhaseTimer()
+
+    with timer.activate():
+        with timed_phase("sql_planning"):
+            time.sleep(0.05)
+            with timed_phase("warehouse_execution"):
+                time.sleep(0.1)
+        with timed_phase("sql_planning"):
+            pass
+
+    durations = timer.durations
+    assert list(durations) == ["warehouse_execution", "sql_planning"]
+    assert 0.1 <= durations["warehouse_execution"] < 0.15
+    assert 0.05 <= durations["sql_planning"] < 0.1
+
+
+def test_timed_phase_without_active_timer():
+    timer = PhaseTimer()
+
+    with timed_phase("sql_planning"):
+        pass
+
+    assert timer.durations == {}
+
+
+def test_run_in_current_context_records_worker_threads():
+    timer = PhaseTimer()
+
+    def work():
+        with timed_phase("warehouse_execution"):
+            time.sleep(0.05)
+
+    with timer.activate():
+        threads = [
+            threading.Thread(target=run_in_current_context(work)) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert timer.durations["warehouse_execution"] >= 0.1
+
+
+def test_instrument_sql_client():
+    sql_client = instrument_sql_client(
+        SimpleNamespace(query=lambda sql: f"result of {sql}", name="redshift")
+    )
+    timer = PhaseTimer()
+
+    with timer.activate():
+        assert sql_client.query("SELECT 1") == "result of SELECT 1"
+
+    assert sql_client.name == "redshift"
+    assert list(timer.durations) == ["warehouse_execution"]
+
+
+class RecordsHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_report_phase_durations():
+    timer = PhaseTimer()
+    with timer.activate(), timed_phase("persist_config"):
+        pass
+
+    # Importing Prefect configures its logging, which `caplog` does not capture
+    logger = logging.getLogger("prefect_metricflow")
+    handler = RecordsHandler()
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        report_phase_durations("materialize", timer)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+    (record,) = handler.records
+    assert record.task_name == "materialize"
+    assert list(record.phase_durations) == ["persist_config"]
+    assert record.total_duration >= record.phase_durations["persist_config"]
+    assert "persist_config=" in record.getMessage()
+
+
+def test_reports_phases_reads_artifact_argument():
+    @reports_phases("materialize")
+    def materialize(name, timing_artifact=False):
+        with timed_phase("sql_planning"):
+            return name
+
+    with mock.patch("prefect_metricflow.timing.report_phase_durations") as report:
+        assert materialize("foo") == "foo"
+        assert materialize("bar", True) == "bar"
+
+    assert [call.kwargs["create_artifact"] for call in report.call_args_list] == [
+        False,
+        True,
+    ]
+    assert list(report.call_args.args[1].durations) == ["sql_planning"]
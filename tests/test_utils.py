@@ -5,7 +5,14 @@ import pytest
 from yaml import safe_load
 
 from prefect_metricflow.exceptions import MetricFlowFailureException
-from prefect_metricflow.utils import get_config_file_path, persist_config
+from prefect_metricflow.utils import (
+    get_cache_root,
+    get_config_file_path,
+    get_isolated_config_file_path,
+    parse_config,
+    persist_config,
+    prune_isolated_config_dirs,
+)
 
 
 def test_invalid_yaml_builder_raises(fs):
@@ -93,3 +100,117 @@ def test_builder_persist_config_on_file(fs):
         config = safe_load(config_file)
 
     assert config == doc
+
+
+def test_parse_yaml_config():
+    doc = """
+    root:
+        leaf: foo
+    """
+
+    assert parse_config(config=doc) == {"root": {"leaf": "foo"}}
+
+
+def test_parse_dict_config():
+    doc = {"root": {"leaf": "foo"}}
+
+    assert parse_config(config=doc) is doc
+
+
+def test_persist_config_skips_unchanged_file(fs):
+    doc = {"root": {"leaf": "foo"}}
+    fs.create_dir("mf_config_dir")
+    file_path = "mf_config_dir/config.yaml"
+
+    assert persist_config(config=doc, file_path=file_path) is True
+    assert persist_config(config=doc, file_path=file_path) is False
+    assert persist_config(config={"root": "bar"}, file_path=file_path) is True
+
+    with open(file_path, "r") as config_file:
+        config = safe_load(config_file)
+
+    assert config == {"root": "bar"}
+
+
+def test_persist_config_leaves_no_temporary_file(fs):
+    doc = {"root": {"leaf": "foo"}}
+    fs.create_file("mf_config_dir/config.yaml", contents="root: bar")
+
+    persist_config(config=doc, file_path="mf_config_dir/config.yaml")
+
+    assert os.listdir("mf_config_dir") == ["config.yaml"]
+
+
+def test_persist_config_keeps_file_on_failed_write(fs):
+    doc = {"root": {"leaf": "foo"}}
+    fs.create_file("mf_config_dir/config.yaml", contents="root: bar")
+
+    with patch("prefect_metricflow.utils.os.replace", side_effect=OSError("boom")):
+        with pytest.raises(OSError, match="boom"):
+            persist_config(config=doc, file_path="mf_config_dir/config.yaml")
+
+    assert os.listdir("mf_config_dir") == ["config.yaml"]
+    with open("mf_config_dir/config.yaml", "r") as config_file:
+        assert safe_load(config_file) == {"root": "bar"}
+
+
+@patch.dict(os.environ, {"PREFECT_METRICFLOW_CACHE_DIR": "mf_cache_dir"})
+def test_get_cache_root_from_environment():
+    assert get_cache_root() == "mf_cache_dir"
+    assert get_cache_root(cache_root="other_cache_dir") == "other_cache_dir"
+
+
+def test_isolated_config_file_path_is_content_addressed(fs):
+    foo_path = get_isolated_config_file_path(
+        config={"dwh_schema": "foo"}, cache_root="/mf_cache_dir"
+    )
+    bar_path = get_isolated_config_file_path(
+        config="dwh_schema: bar", cache_root="/mf_cache_dir"
+    )
+
+    assert foo_path != bar_path
+    assert foo_path == get_isolated_config_file_path(
+        config="dwh_schema: foo", cache_root="/mf_cache_dir"
+    )
+    assert os.path.isdir(os.path.dirname(foo_path))
+    assert os.path.isdir(os.path.dirname(bar_path))
+
+
+def test_isolated_config_dirs_are_private(fs):
+    fs.create_dir("/mf_cache_dir", perm_bits=0o777)
+
+    config_file_path = get_isolated_config_file_path(
+        config={"dwh_schema": "foo"}, cache_root="/mf_cache_dir"
+    )
+
+    assert os.stat("/mf_cache_dir").st_mode & 0o777 == 0o700
+    assert os.stat(os.path.dirname(config_file_path)).st_mode & 0o777 == 0o700
+
+
+def test_isolated_config_dir_owned_by_another_user_raises(fs):
+    fs.create_dir("/mf_cache_dir")
+    os.chown("/mf_cache_dir", os.getuid() + 1, -1)
+
+    with pytest.raises(MetricFlowFailureException, match="owned by another user"):
+        get_isolated_config_file_path(
+            config={"dwh_schema": "foo"}, cache_root="/mf_cache_dir"
+        )
+
+
+def test_prune_isolated_config_dirs_removes_least_recently_used(fs):
+    config_dirs = [
+        os.path.dirname(
+            get_isolated_config_file_path(
+                config={"dwh_schema": schema}, cache_root="/mf_cache_dir"
+            )
+        )
+        for schema in ("foo", "bar", "baz")
+    ]
+    for mtime, config_dir in enumerate(config_dirs):
+        os.utime(config_dir, (mtime, mtime))
+
+    removed = prune_isolated_config_dirs(cache_root="/mf_cache_dir", max_dirs=2)
+
+    assert removed == [config_dirs[0]]
+    assert not os.path.exists(config_dirs[0])
+    assert all(os.path.isdir(config_dir) for config_dir in config_dirs[1:])
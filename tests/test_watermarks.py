@@ -0,0 +1,38 @@
+import os
+
+from prefect_metricflow.utils import CACHE_ROOT_ENV_VAR
+from prefect_metricflow.watermarks import SQLiteWatermarkStore, get_watermark_key
+
+
+def test_get_watermark_key_depends_on_config():
+    key = get_watermark_key("foo", {"dwh_schema": "foo"})
+
+    assert key.startswith("foo:")
+    assert key == get_watermark_key("foo", {"dwh_schema": "foo"})
+    assert key != get_watermark_key("foo", {"dwh_schema": "bar"})
+    assert key != get_watermark_key("bar", {"dwh_schema": "foo"})
+
+
+def test_sqlite_watermark_store(tmp_path):
+    store = SQLiteWatermarkStore(str(tmp_path / "watermarks.db"))
+
+    assert store.get("foo") is None
+
+    store.set("foo", "2022-01-01T00:00:00")
+    store.set("foo", "2022-01-02T00:00:00")
+
+    assert store.get("foo") == "2022-01-02T00:00:00"
+    assert SQLiteWatermarkStore(store.path).get("foo") == "2022-01-02T00:00:00"
+    assert store.delete("foo") is True
+    assert store.delete("foo") is False
+    assert store.get("foo") is None
+
+
+def test_sqlite_watermark_store_default_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ROOT_ENV_VAR, str(tmp_path))
+
+    store = SQLiteWatermarkStore()
+    store.set("foo", "2022-01-01T00:00:00")
+
+    assert store.path == os.path.join(str(tmp_path), "watermarks.db")
+    assert os.path.exists(store.path)